@@ -38,15 +38,22 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
+    'rest_framework',
+    'knox',
+    'notifications',
     'task_management_system_app',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'task_management_system_app.querystats.QueryStatsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'task_management_system_app.roles.RoleMiddleware',
+    'task_management_system_app.replicas.ReplicaPinMiddleware',
+    'task_management_system_app.activity.ActivityActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,6 +71,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'task_management_system_app.inbox.unread_badge',
             ],
         },
     },
@@ -93,6 +101,53 @@ DATABASES = {
     }
 }
 
+# Read replicas for the listing / search / dashboard / export reads (see
+# replicas.py): add them to DATABASES and list their aliases here, e.g.
+#   DATABASES['replica'] = {**DATABASES['default'], 'HOST': 'db-replica', 'TEST': {'MIRROR': 'default'}}
+#   DATABASE_REPLICAS = ['replica']
+# Two SQLite files (db.sqlite3 and a copy of it) work for local testing.
+DATABASE_ROUTERS = ['task_management_system_app.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+# Seconds a session reads from the primary after it wrote something
+REPLICA_PIN_SECONDS = 15
+# Replicas further behind than this are skipped; lag is re-measured per
+# process at most every REPLICA_LAG_CHECK_SECONDS from a heartbeat row that
+# Celery beat stamps every REPLICA_HEARTBEAT_SECONDS
+REPLICA_MAX_LAG_SECONDS = 10
+REPLICA_LAG_CHECK_SECONDS = 5
+REPLICA_HEARTBEAT_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 'fragments' holds rendered task table rows; use a shared backend
+# (Redis / Memcached) in production so all workers see the same rows.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'task-rows',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    # Rate-limit counters must be shared by every worker in production
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rate-limits',
+    },
+    # Roles and group ids must be shared by every worker in production,
+    # or a role change only reaches the worker that made it
+    'roles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'roles',
+    },
+}
+
+TASK_ROW_CACHE = 'fragments'
+TASK_ROW_CACHE_TIMEOUT = 24 * 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -133,6 +188,11 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# How permission-checked task files are delivered: 'x-accel' (nginx),
+# 'x-sendfile' (Apache / lighttpd) or 'python' (FileResponse, no proxy)
+MEDIA_DELIVERY = 'python'
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -152,7 +212,156 @@ CELERY_BEAT_SCHEDULE = {}
 
 CELERY_BEAT_SCHEDULE = {
     "send-weekly-summary": {
-        "task": "tasks.tasks.send_weekly_summary_email",
+        "task": "task_management_system_app.tasks.send_weekly_summary_email",
         "schedule": crontab(hour=10, minute=0, day_of_week="monday"),
     },
+    # Safety net: emails are normally sent right after the request commits
+    "deliver-outbox": {
+        "task": "task_management_system_app.tasks.deliver_outbox",
+        "schedule": 60.0,
+    },
+    "purge-task-tombstones": {
+        "task": "task_management_system_app.tasks.purge_task_tombstones",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "sweep-expired-tokens": {
+        "task": "task_management_system_app.tasks.sweep_expired_tokens",
+        "schedule": crontab(minute=15),
+    },
+    "purge-stale-uploads": {
+        "task": "task_management_system_app.tasks.purge_stale_uploads",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "send-due-reminders": {
+        "task": "task_management_system_app.tasks.send_due_reminders",
+        "schedule": crontab(minute="*/15"),
+    },
+    "replication-heartbeat": {
+        "task": "task_management_system_app.tasks.replication_heartbeat",
+        "schedule": REPLICA_HEARTBEAT_SECONDS,
+    },
+    "archive-completed-tasks": {
+        "task": "task_management_system_app.tasks.archive_completed_tasks",
+        "schedule": crontab(hour=2, minute=30),
+    },
+}
+
+# Email outbox delivery
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_LEASE_SECONDS = 300
+
+# Weekly digest: students per Celery subtask / tasks listed per email
+DIGEST_CHUNK_SIZE = 500
+DIGEST_MAX_ITEMS = 50
+
+# Rows per page / per infinite-scroll fetch on the task tables
+TASK_PAGE_SIZE = 25
+
+# Full-text search backend for task search. Chosen from the database vendor
+# when unset (MySQL FULLTEXT / SQLite FTS5), e.g.:
+# TASK_SEARCH_BACKEND = 'task_management_system_app.search.IcontainsSearchBackend'
+
+# Seconds a user's resolved Teacher/Student role stays cached
+ROLE_CACHE = 'roles'
+ROLE_CACHE_TIMEOUT = 300
+
+# In-app notifications (inbox.py): rows per inbox page and seconds a user's
+# unread count stays cached for the navbar badge
+INBOX_PAGE_SIZE = 20
+INBOX_UNREAD_CACHE_TIMEOUT = 300
+
+# Rows per bulk_create batch for task imports and mass assignment
+BULK_BATCH_SIZE = 500
+
+# Rows per keyset page read by the streaming task export (/export/)
+EXPORT_BATCH_SIZE = 1000
+
+# Resumable uploads: largest file, largest accepted chunk, chunk size the
+# browser sends, and how long an idle unfinished upload is kept (seconds)
+UPLOAD_MAX_BYTES = 500 * 1024 * 1024
+UPLOAD_CHUNK_MAX_BYTES = 8 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# Read-only JSON API (/api/v1/): knox tokens for apps, the session for the browser
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'knox.auth.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
+    'ALLOWED_VERSIONS': ['v1'],
+}
+
+# Largest ?page_size= the API accepts
+API_MAX_PAGE_SIZE = 200
+# Delta sync holds back rows younger than this many seconds (uncommitted writes)
+API_SYNC_LAG_SECONDS = 2
+# Days tombstones are kept; older `since` values must do a full sync
+API_TOMBSTONE_DAYS = 30
+
+# Per-request query count / DB time: always logged to the
+# 'task_management_system_app.queries' logger (duplicates as warnings),
+# and sent as X-DB-Queries / Server-Timing headers when this is on.
+QUERY_STATS_HEADERS = DEBUG
+
+# Expired token sweeper: rows per delete transaction, pause between batches,
+# and how long an unverified registration is kept after its link expired
+TOKEN_SWEEP_BATCH_SIZE = 500
+TOKEN_SWEEP_PAUSE_SECONDS = 0.05
+UNVERIFIED_USER_GRACE_SECONDS = 24 * 60 * 60
+
+# Due-date reminders (reminders.py): {window name: hours before the end of
+# the due date}, how many days late a task still gets an overdue reminder,
+# students per transaction and tasks listed per email
+REMINDER_WINDOWS = {'48h': 48, '2h': 2}
+REMINDER_OVERDUE_DAYS = 7
+REMINDER_BATCH_SIZE = 500
+REMINDER_MAX_ITEMS = 20
+
+# Task activity log (activity.py): rows per INSERT, and buffered rows that
+# are written at once instead of waiting for the end of the request
+ACTIVITY_BATCH_SIZE = 500
+ACTIVITY_BUFFER_LIMIT = 5000
+ACTIVITY_PAGE_SIZE = 50
+
+# Archival (archive.py): completed tasks untouched this many days move to the
+# archive table, this many per transaction, with a pause between batches
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_PAUSE_SECONDS = 0.05
+
+# Attempts per client IP and per submitted username / email, as
+# (limit, seconds) in a sliding window. Checked before any password hashing
+# or email is queued; see task_management_system_app/ratelimit.py.
+RATE_LIMIT_CACHE = 'ratelimit'
+RATE_LIMITS = {
+    'login': {'ip': (30, 60), 'username': (10, 300)},
+    'register': {'ip': (10, 3600), 'email': (3, 3600)},
+    'forgot_password': {'ip': (10, 3600), 'email': (3, 3600)},
 }
+# Header holding the client address when behind a trusted proxy, e.g.
+# RATE_LIMIT_IP_HEADER = 'HTTP_X_FORWARDED_FOR'
+# Proxies in front of the app that append to that header; the client is the
+# entry this many places from the right
+RATE_LIMIT_TRUSTED_PROXIES = 1
+
+# Async views (served by task_management.asgi): threads that may hash
+# passwords at once, about one per CPU. Further logins / registrations wait
+# for a free thread instead of each taking a CPU.
+PASSWORD_HASH_WORKERS = 4
+
+# Live task updates (/events/tasks/, served under ASGI only): the pub/sub
+# backend that fans events out ('...events.RedisBroker' when running more
+# than one worker), events queued per slow client, keep-alive interval,
+# how long one stream lasts and the browser's reconnect delay
+TASK_EVENTS_BACKEND = 'task_management_system_app.events.InMemoryBroker'
+TASK_EVENTS_REDIS_URL = CELERY_BROKER_URL
+TASK_EVENTS_QUEUE_SIZE = 100
+TASK_EVENTS_HEARTBEAT_SECONDS = 15
+TASK_EVENTS_MAX_SECONDS = 300
+TASK_EVENTS_RETRY_MS = 3000
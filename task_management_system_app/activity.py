@@ -0,0 +1,143 @@
+"""
+Append-only task activity log (``TaskActivity``).
+
+Who created or deleted a task, changed its status, (un)assigned students
+or uploaded a file, and when. The handlers in ``signals.py`` record Task,
+assignment and ``TaskFile`` changes; ``bulk.py`` records its imports and
+mass assignments itself. The acting user is the request's user
+(``ActivityActorMiddleware``); work outside a request is logged without
+one.
+
+Writing does not add to the request:
+
+* ``record()`` only builds the row and hands it to ``on_commit``, so rows
+  of a rolled-back transaction are never logged.
+* Committed rows wait in a per-process buffer, which is written
+  ``ACTIVITY_BATCH_SIZE`` rows per INSERT when the request has finished
+  (after the response went out), after each Celery task and at exit. A
+  buffer that reaches ``ACTIVITY_BUFFER_LIMIT`` is written straight away.
+* A process that is killed loses the rows still in its buffer (at most one
+  request's worth for a web worker).
+
+Entries are never updated or deleted. Timelines per task and per acting
+user are read newest first on ``activity_task_idx`` / ``activity_actor_idx``.
+"""
+import atexit
+import logging
+import threading
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+
+from .models import TaskActivity
+
+logger = logging.getLogger(__name__)
+
+# Newest first; ids grow with time
+ORDERING = ('-id',)
+
+# The user whose request is running (None outside requests)
+_actor = ContextVar('activity_actor', default=None)
+
+_buffer = []
+_lock = threading.Lock()
+
+
+def actor_id():
+    user = _actor.get()
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def entry(task_id, action, **detail):
+    return TaskActivity(task_id=task_id, actor_id=actor_id(), action=action, detail=detail)
+
+
+def record(task_id, action, **detail):
+    """Log `action` on `task_id` once the current transaction commits."""
+    record_many([entry(task_id, action, **detail)])
+
+
+def record_many(entries):
+    if entries:
+        transaction.on_commit(partial(_committed, entries))
+
+
+def _committed(entries):
+    with _lock:
+        _buffer.extend(entries)
+        full = len(_buffer) >= settings.ACTIVITY_BUFFER_LIMIT
+    if full:
+        flush()
+
+
+def flush():
+    """Write every buffered row, ACTIVITY_BATCH_SIZE per INSERT; returns how many were written."""
+    with _lock:
+        entries = _buffer[:]
+        del _buffer[:]
+    batch_size = settings.ACTIVITY_BATCH_SIZE
+    written = 0
+    try:
+        for start in range(0, len(entries), batch_size):
+            TaskActivity.objects.bulk_create(entries[start:start + batch_size])
+            written += len(entries[start:start + batch_size])
+    except DatabaseError:
+        logger.exception("Could not write %s task activity rows; kept for the next flush", len(entries) - written)
+        with _lock:
+            _buffer[:0] = entries[written:]
+    return written
+
+
+atexit.register(flush)
+
+
+# 🕑 Timelines
+
+def task_timeline(task_id):
+    return TaskActivity.objects.filter(task_id=task_id).select_related('actor')
+
+
+def user_timeline(user_id):
+    return TaskActivity.objects.filter(actor_id=user_id).select_related('actor')
+
+
+def with_usernames(entries):
+    """Set ``entry.students`` to the usernames behind a page of (un)assignment entries (one query)."""
+    ids = {pk for e in entries for pk in e.detail.get('students', ())}
+    names = dict(User.objects.filter(pk__in=ids).values_list('id', 'username')) if ids else {}
+    for e in entries:
+        e.students = [names.get(pk, f"#{pk}") for pk in e.detail.get('students', ())]
+    return entries
+
+
+class ActivityActorMiddleware:
+    """Make the request's user the actor of what it logs (after AuthenticationMiddleware)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _actor.set(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            _actor.reset(token)
+
+    async def __acall__(self, request):
+        # request.user stays lazy; it is only loaded when something is logged
+        token = _actor.set(request.user)
+        try:
+            return await self.get_response(request)
+        finally:
+            _actor.reset(token)
@@ -7,3 +7,9 @@ admin.site.register(Task)
 class EmailVerificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'is_verified', 'expires_at', 'is_expired')
     list_filter = ('is_verified',)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
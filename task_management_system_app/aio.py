@@ -0,0 +1,80 @@
+"""
+Helpers for the async views.
+
+Under ASGI an async view holds no thread while it waits on the database or a
+slow client. Two kinds of work still need care:
+
+* Password hashing (PBKDF2) is pure CPU. It runs in ``hash_pool``, a thread
+  pool of ``settings.PASSWORD_HASH_WORKERS`` threads, so a login burst
+  queues there instead of starting one hashing thread per request. Logins
+  run all of ``django.contrib.auth.authenticate`` there (backends, signals
+  and the user lookup included), on the pool thread's own DB connection.
+* Other sync work (templates, the cache, transactions, the outbox) runs
+  through ``sync_to_async``, on the request's own thread and off the event loop.
+  Email itself is only queued (see ``outbox.py``); Celery sends it.
+
+``login_required`` and ``rate_limited`` in 4.2 do not await the view, so
+``login_required`` here does, and ``ratelimit.rate_limited`` handles both kinds.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import REDIRECT_FIELD_NAME
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.shortcuts import render
+
+hash_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+
+arender = sync_to_async(render)
+
+
+async def run_hashing(func, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(hash_pool, partial(func, *args, **kwargs))
+
+
+async def hash_password(raw_password):
+    return await run_hashing(make_password, raw_password)
+
+
+async def authenticate(request, username, password):
+    """``django.contrib.auth.authenticate`` in ``hash_pool``."""
+    return await run_hashing(_authenticate, request, username=username, password=password)
+
+
+def _authenticate(request, **credentials):
+    # Pool threads are not request threads: drop connections that are past
+    # CONN_MAX_AGE or broken, as request_started / request_finished would
+    close_old_connections()
+    try:
+        return auth.authenticate(request, **credentials)
+    finally:
+        close_old_connections()
+
+
+async def iterate_in_thread(iterable):
+    """
+    Async iteration over a sync iterator that queries or blocks, one item
+    per ``sync_to_async`` call. Under ASGI Django 4.2 would otherwise read a
+    sync ``StreamingHttpResponse`` iterator into a list before sending it.
+    """
+    iterator = iter(iterable)
+    done = object()
+    while (item := await sync_to_async(next)(iterator, done)) is not done:
+        yield item
+
+
+def login_required(view):
+    """``django.contrib.auth.decorators.login_required`` for async views."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # RoleMiddleware has already loaded request.user
+        if request.user.is_authenticated:
+            return await view(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path(), settings.LOGIN_URL, REDIRECT_FIELD_NAME)
+    return wrapper
@@ -0,0 +1,234 @@
+"""
+Read-only JSON task API (``/api/v1/``).
+
+* ``GET tasks/``          – the same task set and filters as ``task_list``
+  (``search``, ``status``, ``due_date``), keyset paginated with ``cursor``.
+* ``GET tasks/<id>/``     – one task.
+* ``GET tasks/changes/``  – delta sync. Without ``since`` it walks the whole
+  set (``full_sync``); afterwards pass back ``next_since`` to receive only
+  tasks whose ``updated_at`` moved plus ids in ``deleted`` (tombstones for
+  deleted or unassigned tasks). Keep calling while ``has_more`` is true.
+
+Every endpoint accepts ``fields=id,title,...``; only the matching columns
+are read, and assignees are only loaded when ``assigned_to`` is asked for.
+Clients authenticate with a knox token (``POST auth/login/`` with HTTP Basic)
+or the browser session.
+"""
+import base64
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from knox import views as knox_views
+from rest_framework import generics, status
+from rest_framework.authentication import BasicAuthentication, get_authorization_header
+from rest_framework.exceptions import APIException, Throttled, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from . import ratelimit
+from .models import Task, TaskTombstone, assignees_prefetch
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .replicas import replica_reads
+from .roles import STUDENT, TEACHER, get_role
+from .serializers import TaskSerializer
+from .views import filter_tasks, listed_tasks
+
+# Oldest change first; `id` orders rows saved in the same instant
+SYNC_ORDERING = ('updated_at', 'id')
+TASK_COLUMNS = {field.name for field in Task._meta.concrete_fields}
+
+
+class SyncExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "This sync point is older than the tombstone history; start a full sync."
+    default_code = 'sync_expired'
+
+
+# knox's views do not take URL kwargs; drop the `version` captured by the API prefix
+class LoginView(knox_views.LoginView):
+    """Exchange HTTP Basic credentials for a knox token."""
+    authentication_classes = [BasicAuthentication]
+
+    def initial(self, request, *args, **kwargs):
+        # Same limits as login_view, checked before BasicAuthentication hashes anything
+        wait = ratelimit.hit('login', {'ip': ratelimit.client_ip(request), 'username': basic_username(request)})
+        if wait:
+            raise Throttled(wait)
+        super().initial(request, *args, **kwargs)
+
+    def post(self, request, format=None, **kwargs):
+        return super().post(request, format)
+
+
+class LogoutView(knox_views.LogoutView):
+    def post(self, request, format=None, **kwargs):
+        return super().post(request, format)
+
+
+class LogoutAllView(knox_views.LogoutAllView):
+    def post(self, request, format=None, **kwargs):
+        return super().post(request, format)
+
+
+def basic_username(request):
+    try:
+        auth = get_authorization_header(request).split()
+        if len(auth) == 2 and auth[0].lower() == b'basic':
+            return base64.b64decode(auth[1]).decode().partition(':')[0]
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return ''
+
+
+class KeysetPagination(BasePagination):
+    """DRF wrapper around ``keyset_paginate``; the view sets ``ordering``."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = keyset_paginate(
+            queryset, request.query_params.get('cursor'), page_size(request),
+            request.query_params, view.ordering,
+        )
+        return list(self.page)
+
+    def get_next_link(self):
+        if not self.page.has_next:
+            return None
+        return self.request.build_absolute_uri(f"{self.request.path}?{self.page.next_querystring()}")
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+def page_size(request):
+    try:
+        size = int(request.query_params.get('page_size', settings.TASK_PAGE_SIZE))
+    except ValueError:
+        size = settings.TASK_PAGE_SIZE
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def requested_fields(request):
+    """Field names from ``?fields=``, or None for all of them."""
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(names) - TaskSerializer.COLUMNS.keys())
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}."})
+    return names
+
+
+def project(tasks, fields, ordering):
+    """Load only what the requested fields (and the keyset ordering) need."""
+    names = TaskSerializer.COLUMNS.keys() if fields is None else fields
+    # Keyset values are read off the rows; annotations (search_rank) come along anyway
+    columns = {key.lstrip('-') for key in ordering} & TASK_COLUMNS
+    for name in names:
+        columns.update(TaskSerializer.COLUMNS[name])
+    if 'created_by' in names:
+        tasks = tasks.select_related('created_by')
+    if 'assigned_to' in names:
+        tasks = tasks.prefetch_related(assignees_prefetch())
+    return tasks.only(*columns)
+
+
+class TaskAPIMixin:
+    ordering = SYNC_ORDERING
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Token users skip RoleMiddleware; resolve the role here
+        request.user.role = get_role(request.user)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'fields': requested_fields(self.request)}
+
+
+class ReplicaReadsMixin:
+    # Delta sync stays on the primary: its horizon assumes rows older than
+    # API_SYNC_LAG_SECONDS are visible, which a lagging replica breaks.
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return replica_reads(super().as_view(**initkwargs))
+
+
+class TaskListView(ReplicaReadsMixin, TaskAPIMixin, generics.ListAPIView):
+    serializer_class = TaskSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        tasks, self.ordering = filter_tasks(listed_tasks(self.request.user), self.request.query_params)
+        return project(tasks, requested_fields(self.request), self.ordering)
+
+
+class TaskDetailView(ReplicaReadsMixin, TaskAPIMixin, generics.RetrieveAPIView):
+    serializer_class = TaskSerializer
+
+    def get_queryset(self):
+        return project(listed_tasks(self.request.user), requested_fields(self.request), ())
+
+
+class TaskChangesView(TaskAPIMixin, generics.GenericAPIView):
+    serializer_class = TaskSerializer
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        since = self.since_position(request.query_params.get('since'))
+        # Rows saved in the last few seconds may belong to transactions that
+        # have not committed yet; leave them for the next call.
+        horizon = timezone.now() - timedelta(seconds=settings.API_SYNC_LAG_SECONDS)
+
+        tasks = listed_tasks(user).filter(updated_at__lt=horizon)
+        page = keyset_paginate(
+            project(tasks, requested_fields(request), SYNC_ORDERING),
+            encode_cursor(since) if since else None, page_size(request), ordering=SYNC_ORDERING,
+        )
+        until = page.object_list[-1].updated_at if page.has_next else horizon
+        next_since = page.next_cursor if page.has_next else encode_cursor([horizon, 0])
+
+        return Response({
+            'full_sync': since is None,
+            'changed': self.get_serializer(page.object_list, many=True).data,
+            'deleted': self.deleted_ids(user, since, until) if since else [],
+            'next_since': next_since,
+            'has_more': page.has_next,
+        })
+
+    def since_position(self, since):
+        """(updated_at, id) to continue from: a ``next_since`` token or an ISO datetime."""
+        if not since:
+            return None
+        position = decode_cursor(since, len(SYNC_ORDERING))
+        if not (position and isinstance(position[0], str) and isinstance(position[1], int)):
+            position = [since, 0]
+        try:
+            moment = parse_datetime(position[0])
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValidationError({'since': "Expected a next_since token or an ISO 8601 datetime."})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, dt_timezone.utc)
+        if moment < timezone.now() - timedelta(days=settings.API_TOMBSTONE_DAYS):
+            raise SyncExpired()
+        return [moment, position[1]]
+
+    def deleted_ids(self, user, since, until):
+        """Ids of tasks that left the user's set in [since, until) and are still gone."""
+        if user.role == TEACHER:
+            tombstones = TaskTombstone.objects.filter(user=None)
+        elif user.role == STUDENT:
+            tombstones = TaskTombstone.objects.filter(user=user)
+        else:
+            return []
+        ids = set(
+            tombstones.filter(deleted_at__gte=since[0], deleted_at__lt=until).values_list('task_id', flat=True)
+        )
+        # A task that was unassigned and later assigned again is still visible
+        ids -= set(listed_tasks(user).filter(pk__in=ids).values_list('id', flat=True))
+        return sorted(ids)
@@ -0,0 +1,144 @@
+"""
+Hot/cold archival of completed tasks.
+
+Tasks that are ``completed`` and have not changed for
+``settings.ARCHIVE_AFTER_DAYS`` are moved to ``ArchivedTask`` together with
+their assignment rows and ``TaskFile`` metadata (``ArchivedTaskFile``; the
+stored bytes stay where they are). The active table then only holds live
+work and its indexes stay small.
+
+* Rows are picked by primary key a batch at a time (a range scan on
+  ``task_status_updated_idx``) and each batch moves in its own short
+  transaction, like ``sweeper.py``. The copy is an ``INSERT ... SELECT``
+  inside the database; no task is loaded into Python.
+* The move bypasses the Task signals on purpose: archived tasks keep their
+  id, so the SQLite FTS entry stays valid, and they still count in the
+  per-user status counters (``counters.actual_counts`` reads both tables).
+* API clients see an archived task as gone (tombstones, as for a delete);
+  a restored one comes back with a fresh ``updated_at``, so delta sync
+  picks it up and it is not archived again the same night.
+* Unfinished upload sessions and the due-date reminder log of an archived
+  task are dropped.
+
+Archived tasks are read-only. ``task_list?archived=1`` lists them next to
+the active ones, and ``restore()`` moves them back.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import uploads
+from .models import ArchivedTask, ArchivedTaskFile, Task, TaskFile, TaskReminder, TaskTombstone, UploadSession
+
+Assignment = Task.assigned_to.through
+ArchivedAssignment = ArchivedTask.assigned_to.through
+
+# (active table column, archive table column) per table pair
+TASK_COLUMNS = [(f.column, f.column) for f in Task._meta.concrete_fields]
+ASSIGNMENT_COLUMNS = [('id', 'id'), ('task_id', 'archivedtask_id'), ('user_id', 'user_id')]
+FILE_COLUMNS = [(f.column, f.column) for f in TaskFile._meta.concrete_fields]
+
+
+def copy_rows(source, target, columns, key, ids, values=()):
+    """
+    ``INSERT INTO target (...) SELECT ... FROM source WHERE key IN ids``.
+    `columns` are (source column, target column) pairs; `values` are
+    (target column, value) pairs written as the same constant on every row.
+    """
+    qn = connection.ops.quote_name
+    targets = [qn(t) for _, t in columns] + [qn(t) for t, _ in values]
+    selects = [qn(s) for s, _ in columns] + ['%s'] * len(values)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(target._meta.db_table)} ({', '.join(targets)}) "
+            f"SELECT {', '.join(selects)} FROM {qn(source._meta.db_table)} WHERE {qn(key)} IN ({placeholders})",
+            [value for _, value in values] + list(ids),
+        )
+
+
+def delete_rows(model, key, ids):
+    """Plain DELETE: no collector, no signals (the rows live on in the other table)."""
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(key)} IN ({placeholders})", list(ids))
+
+
+def db_datetime(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def flipped(columns):
+    return [(target, source) for source, target in columns]
+
+
+def archive_batch(ids, cutoff):
+    """Move the tasks in `ids` that still qualify; returns how many moved."""
+    with transaction.atomic():
+        # Re-apply the conditions: a task may have been reopened since it was selected
+        ids = list(
+            Task.objects.select_for_update()
+            .filter(pk__in=ids, status='completed', updated_at__lt=cutoff)
+            .values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+        assignments = list(Assignment.objects.filter(task_id__in=ids).values_list('task_id', 'user_id'))
+        uploads.discard_sessions(UploadSession.objects.filter(task_id__in=ids))
+
+        copy_rows(Task, ArchivedTask, TASK_COLUMNS, 'id', ids, [('archived_at', db_datetime(timezone.now()))])
+        copy_rows(Assignment, ArchivedAssignment, ASSIGNMENT_COLUMNS, 'task_id', ids)
+        copy_rows(TaskFile, ArchivedTaskFile, FILE_COLUMNS, 'task_id', ids)
+        delete_rows(TaskFile, 'task_id', ids)
+        delete_rows(TaskReminder, 'task_id', ids)
+        delete_rows(Assignment, 'task_id', ids)
+        delete_rows(Task, 'id', ids)
+
+        TaskTombstone.objects.bulk_create(
+            [TaskTombstone(task_id=task_id) for task_id in ids]
+            + [TaskTombstone(task_id=task_id, user_id=user_id) for task_id, user_id in assignments]
+        )
+    return len(ids)
+
+
+def archive_completed(older_than_days=None, batch_size=None, pause=None):
+    """Archive every completed task untouched for `older_than_days`; returns how many moved."""
+    days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    pause = settings.ARCHIVE_PAUSE_SECONDS if pause is None else pause
+    cutoff = timezone.now() - timedelta(days=days)
+    candidates = Task.objects.filter(status='completed', updated_at__lt=cutoff).order_by('updated_at', 'id')
+
+    moved = 0
+    while True:
+        # Whatever moved (or no longer qualifies) has left `candidates`
+        ids = list(candidates.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return moved
+        moved += archive_batch(ids, cutoff)
+        if len(ids) < batch_size:
+            return moved
+        if pause:
+            time.sleep(pause)
+
+
+def restore(task_ids):
+    """Move archived tasks back to the active table; returns the ids restored."""
+    with transaction.atomic():
+        ids = list(ArchivedTask.objects.select_for_update().filter(pk__in=task_ids).values_list('pk', flat=True))
+        if not ids:
+            return []
+        now = db_datetime(timezone.now())
+        task_columns = [(a, t) for a, t in flipped(TASK_COLUMNS) if t != 'updated_at']
+        copy_rows(ArchivedTask, Task, task_columns, 'id', ids, [('updated_at', now)])
+        copy_rows(ArchivedAssignment, Assignment, flipped(ASSIGNMENT_COLUMNS), 'archivedtask_id', ids)
+        copy_rows(ArchivedTaskFile, TaskFile, flipped(FILE_COLUMNS), 'task_id', ids)
+        delete_rows(ArchivedTaskFile, 'task_id', ids)
+        delete_rows(ArchivedAssignment, 'archivedtask_id', ids)
+        delete_rows(ArchivedTask, 'id', ids)
+    return ids
+
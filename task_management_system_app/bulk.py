@@ -0,0 +1,221 @@
+"""
+Bulk task import and mass assignment.
+
+Rows are read lazily from CSV, JSON Lines or a JSON array, validated with
+``BulkTaskRowForm`` and written ``batch_size`` at a time with bulk_create
+for both the tasks and the assigned_to rows. bulk_create sends no model
+signals, so the search index, the status counters and the activity log
+are updated here directly. Invalid rows are reported by row number and never stop the import.
+"""
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import activity, counters
+from .forms import BulkTaskRowForm
+from .models import Task, TaskActivity
+from .roles import STUDENT, users_with_role
+from .search import get_search_backend
+
+Assignment = Task.assigned_to.through
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def detect_format(filename, declared=None):
+    fmt = (declared or filename.rsplit('.', 1)[-1]).lower()
+    if fmt not in FORMATS:
+        raise BulkImportError(f"Unsupported format {fmt!r}; use one of {', '.join(FORMATS)}.")
+    return fmt
+
+
+def iter_rows(stream, fmt):
+    """
+    Yield row dicts from a binary stream without reading it all up front
+    (except JSON arrays). A file that turns out not to be UTF-8 or valid CSV
+    part-way through ends with an error row; nothing after it is read.
+    """
+    try:
+        yield from _read_rows(stream, fmt)
+    except UnicodeDecodeError:
+        yield {'__error__': "The file is not valid UTF-8 from here on; the rest was not read."}
+    except csv.Error as e:
+        yield {'__error__': f"Malformed CSV ({e}); the rest of the file was not read."}
+
+
+def _read_rows(stream, fmt):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for row in csv.DictReader(text):
+            # CSV lists assignees as "alice;bob"
+            row['assigned_to'] = [u.strip() for u in (row.get('assigned_to') or '').split(';') if u.strip()]
+            yield row
+    elif fmt == 'jsonl':
+        for line in text:
+            if line.strip():
+                yield parse_json_row(line)
+    else:
+        try:
+            rows = json.load(text)
+        except ValueError as e:
+            raise BulkImportError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise BulkImportError("Expected a JSON array of task objects.")
+        yield from rows
+
+
+def parse_json_row(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return {'__error__': f"Invalid JSON: {e}"}
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def student_ids_by_username(usernames):
+    return dict(users_with_role(STUDENT).filter(username__in=usernames).values_list('username', 'id'))
+
+
+def validate_batch(numbered_rows):
+    """Split a batch into (valid [(Task, [student ids])], errors [(row number, messages)])."""
+    usernames = set()
+    for _, row in numbered_rows:
+        if isinstance(row, dict) and isinstance(row.get('assigned_to'), list):
+            usernames.update(str(u) for u in row['assigned_to'])
+    students = student_ids_by_username(usernames)
+
+    valid, errors = [], []
+    for number, row in numbered_rows:
+        if not isinstance(row, dict):
+            errors.append((number, ["Row must be an object."]))
+            continue
+        if '__error__' in row:
+            errors.append((number, [row['__error__']]))
+            continue
+        form = BulkTaskRowForm(row)
+        problems = [f"{field}: {' '.join(msgs)}" for field, msgs in form.errors.items()]
+        assignees = row.get('assigned_to') or []
+        if not isinstance(assignees, list):
+            problems.append("assigned_to: must be a list of usernames.")
+            assignees = []
+        unknown = sorted({str(u) for u in assignees} - students.keys())
+        if unknown:
+            problems.append(f"assigned_to: unknown student(s) {', '.join(unknown)}.")
+        if problems:
+            errors.append((number, problems))
+            continue
+        valid.append((Task(**form.cleaned_data), sorted({students[str(u)] for u in assignees})))
+    return valid, errors
+
+
+def insert_tasks(tasks, created_by):
+    """bulk_create `tasks` and make sure each has its primary key."""
+    for task in tasks:
+        task.created_by = created_by
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Task.objects.bulk_create(tasks)
+    return insert_consecutive(tasks)
+
+
+def insert_consecutive(tasks):
+    """
+    bulk_create for MySQL, which does not return ids from a multi-row INSERT.
+    LAST_INSERT_ID() is the first id of this connection's last INSERT, and
+    InnoDB gives a multi-row ``INSERT ... VALUES`` one consecutive block of
+    ids (every ``innodb_autoinc_lock_mode``), ``auto_increment_increment``
+    apart. The block is checked before the ids are used.
+    """
+    if not tasks:
+        return tasks
+    # One statement, so the block covers every row
+    Task.objects.bulk_create(tasks, batch_size=len(tasks))
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT LAST_INSERT_ID(), @@auto_increment_increment")
+        first, step = cursor.fetchone()
+    ids = range(first, first + step * len(tasks), step)
+    if Task.objects.filter(id__gte=ids[0], id__lte=ids[-1]).count() != len(tasks):
+        raise BulkImportError("Could not read back the ids of an imported batch; that batch was not imported.")
+    for task, pk in zip(tasks, ids):
+        task.pk = pk
+    return tasks
+
+
+def import_tasks(rows, created_by, batch_size=500):
+    """Create tasks (and their assignments) from row dicts. Returns (created, errors)."""
+    created = 0
+    errors = []
+    for batch in chunked(enumerate(rows, start=1), batch_size):
+        valid, batch_errors = validate_batch(batch)
+        errors.extend(batch_errors)
+        if not valid:
+            continue
+        with transaction.atomic():
+            tasks = insert_tasks([task for task, _ in valid], created_by)
+            links = [
+                Assignment(task_id=task.pk, user_id=user_id)
+                for task, (_, user_ids) in zip(tasks, valid)
+                for user_id in user_ids
+            ]
+            Assignment.objects.bulk_create(links, batch_size=batch_size)
+            get_search_backend().index_many(tasks)
+
+            deltas = Counter((created_by.pk, counters.CREATED, task.status) for task in tasks)
+            for task, (_, user_ids) in zip(tasks, valid):
+                for user_id in user_ids:
+                    deltas[user_id, counters.ASSIGNED, task.status] += 1
+            counters.apply(deltas)
+            activity.record_many(
+                [activity.entry(task.pk, TaskActivity.CREATED, title=task.title, status=task.status) for task in tasks]
+                + [
+                    activity.entry(task.pk, TaskActivity.ASSIGNED, students=user_ids)
+                    for task, (_, user_ids) in zip(tasks, valid) if user_ids
+                ]
+            )
+        created += len(tasks)
+    return created, errors
+
+
+def assign_students(task, student_ids, batch_size=1000):
+    """Assign `task` to many students at once. Returns the number of new assignments."""
+    added = 0
+    for batch in chunked(student_ids, batch_size):
+        with transaction.atomic():
+            existing = set(
+                Assignment.objects.filter(task_id=task.pk, user_id__in=batch).values_list('user_id', flat=True)
+            )
+            new_ids = [user_id for user_id in set(batch) if user_id not in existing]
+            Assignment.objects.bulk_create(
+                [Assignment(task_id=task.pk, user_id=user_id) for user_id in new_ids],
+                ignore_conflicts=True,
+            )
+            counters.apply({(user_id, counters.ASSIGNED, task.status): 1 for user_id in new_ids})
+            if new_ids:
+                activity.record(task.pk, TaskActivity.ASSIGNED, students=sorted(new_ids))
+        added += len(new_ids)
+    if added:
+        # Same version bump the m2m_changed handler makes for cached rows
+        Task.objects.filter(pk=task.pk).update(updated_at=timezone.now())
+    return added
+
+
+def all_student_ids():
+    """Every student id, read in id order without loading user rows."""
+    return (
+        users_with_role(STUDENT)
+        .order_by('id')
+        .values_list('id', flat=True)
+        .iterator(chunk_size=2000)
+    )
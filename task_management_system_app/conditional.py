@@ -0,0 +1,123 @@
+"""
+Conditional GET for the task listings.
+
+A listing's validators are ``MAX(updated_at)`` over the viewer's visible
+task set (unfiltered), read off ``task_updated_idx`` /
+``task_creator_updated_idx``, and the viewer's newest ``TaskTombstone``.
+Creates and edits bump ``updated_at`` (assignment changes too, see
+``signals.py``); deletes, archiving and unassignments write a tombstone
+(``user=None`` for teachers' listings, one per student it leaves). Both
+are index lookups, so revalidating stays flat however many tasks there
+are, and the ETag moves whenever any visible row could have.
+The query string, the viewer, today's date (overdue stats), the viewer's
+unread inbox count (the navbar badge, read from its cache) and whether the
+request is an infinite-scroll fragment are folded into the ETag as well.
+
+``Last-Modified`` is the newest ``updated_at``; it cannot see a delete on its
+own, but clients that send ``If-None-Match`` are judged on the ETag only.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.db.models import Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import inbox
+from .models import TaskTombstone
+from .roles import STUDENT
+
+
+def listing_state(request, visible_tasks):
+    """(etag, last_modified) for this request, computed once."""
+    state = getattr(request, '_listing_state', None)
+    if state is not None:
+        return state
+
+    if len(messages.get_messages(request)):
+        # A flash message is waiting to be shown: always render
+        state = (None, None)
+    else:
+        user = request.user
+        last, removal = validators(user, visible_tasks(user))
+        parts = [
+            user.pk,
+            user.role,
+            removal,
+            last.isoformat() if last else '',
+            sorted(request.GET.lists()),
+            request.headers.get('x-requested-with', ''),
+            timezone.localdate().isoformat(),
+            inbox.unread_count(user),
+        ]
+        etag = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+        state = (f'"{etag}"', last)
+    request._listing_state = state
+    return state
+
+
+def validators(user, tasks):
+    """
+    (newest ``updated_at`` in `tasks`, id of the newest tombstone for tasks
+    leaving `user`'s listings) in one query; each is an index lookup.
+    """
+    newest = tasks.order_by('-updated_at').values('updated_at')[:1]
+    removals = TaskTombstone.objects.filter(user=user if user.role == STUDENT else None)
+    newest_removal = removals.order_by('-deleted_at', '-id').values('id')[:1]
+    return (
+        User.objects.filter(pk=user.pk)
+        .annotate(last=Subquery(newest), removal=Subquery(newest_removal))
+        .values_list('last', 'removal')
+        .get()
+    )
+
+
+def conditional_listing(visible_tasks):
+    """
+    Answer unchanged listings with 304 before the view runs.
+    `visible_tasks(user)` returns the user's unfiltered task queryset.
+    Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                etag, last_modified = await sync_to_async(listing_state)(request, visible_tasks)
+                response = not_modified(request, etag, last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return finish(request, response, etag, last_modified)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                etag, last_modified = listing_state(request, visible_tasks)
+                response = not_modified(request, etag, last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                return finish(request, response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+# What django.views.decorators.http.condition() does, split around the view
+def not_modified(request, etag, last_modified):
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def finish(request, response, etag, last_modified):
+    if request.method in ('GET', 'HEAD'):
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    # Let the browser keep the page but check back on every load
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['X-Requested-With'])
+    return response
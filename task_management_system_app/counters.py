@@ -0,0 +1,135 @@
+"""
+Per-user task status counters.
+
+``TaskStatusCounter`` holds one row per (user, scope, status): how many
+tasks a teacher created and how many a student is assigned, by status.
+The handlers in ``signals.py`` call into this module on every Task save,
+delete and ``assigned_to`` change, so the counts move in the same
+transaction as the rows they describe. ``rebuild_task_counters`` recomputes
+them from the task tables (writes through ``QuerySet.update()`` bypass the
+signals). Archived tasks still count: ``archive.py`` moves rows between
+tables without touching the counters.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import ArchivedTask, Task, TaskStatusCounter
+
+CREATED = TaskStatusCounter.CREATED
+ASSIGNED = TaskStatusCounter.ASSIGNED
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+Assignment = Task.assigned_to.through
+ArchivedAssignment = ArchivedTask.assigned_to.through
+
+
+def apply(deltas):
+    """Add {(user_id, scope, status): delta} to the counter table."""
+    deltas = {key: delta for key, delta in deltas.items() if delta and key[0]}
+    if not deltas:
+        return
+    TaskStatusCounter.objects.bulk_create(
+        [TaskStatusCounter(user_id=u, scope=scope, status=status) for u, scope, status in deltas],
+        ignore_conflicts=True,
+    )
+    # One UPDATE per (scope, status, delta) instead of one per user
+    groups = defaultdict(list)
+    for (user_id, scope, status), delta in deltas.items():
+        groups[scope, status, delta].append(user_id)
+    for (scope, status, delta), user_ids in groups.items():
+        TaskStatusCounter.objects.filter(scope=scope, status=status, user_id__in=user_ids).update(
+            count=F('count') + delta
+        )
+
+
+def assigned_user_ids(task):
+    return list(Assignment.objects.filter(task_id=task.pk).values_list('user_id', flat=True))
+
+
+def task_saved(task, created, old_status, old_created_by_id):
+    deltas = Counter()
+    if created:
+        deltas[task.created_by_id, CREATED, task.status] += 1
+    else:
+        if (old_status, old_created_by_id) == (task.status, task.created_by_id):
+            return
+        deltas[old_created_by_id, CREATED, old_status] -= 1
+        deltas[task.created_by_id, CREATED, task.status] += 1
+        if old_status != task.status:
+            for user_id in assigned_user_ids(task):
+                deltas[user_id, ASSIGNED, old_status] -= 1
+                deltas[user_id, ASSIGNED, task.status] += 1
+    apply(deltas)
+
+
+def task_deleted(task):
+    deltas = Counter({(task.created_by_id, CREATED, task.status): -1})
+    for user_id in assigned_user_ids(task):
+        deltas[user_id, ASSIGNED, task.status] -= 1
+    apply(deltas)
+
+
+def assignments_changed(sign, task_ids=None, user_ids=None, task=None, user_id=None):
+    """
+    `sign` is +1 for added rows and -1 for removed rows. Either one task and
+    a set of user ids changed (``task.assigned_to``) or one user and a set
+    of task ids (``user.tasks_assigned``).
+    """
+    deltas = Counter()
+    if task is not None:
+        for uid in user_ids:
+            deltas[uid, ASSIGNED, task.status] += sign
+    else:
+        for status in Task.objects.filter(pk__in=task_ids).values_list('status', flat=True):
+            deltas[user_id, ASSIGNED, status] += sign
+    apply(deltas)
+
+
+def summary(user, scope):
+    """Totals, per-status counts, overdue count and completion percentage."""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(
+        TaskStatusCounter.objects.filter(user=user, scope=scope).values_list('status', 'count')
+    )
+    total = sum(counts.values())
+    # Overdue depends on today's date, so it cannot be kept as a counter;
+    # it is one COUNT over the user's open tasks with a due date in the past.
+    tasks = Task.objects.filter(created_by=user) if scope == CREATED else Task.objects.filter(assigned_to=user)
+    overdue = tasks.filter(due_date__lt=timezone.localdate()).exclude(status='completed').count()
+    return {
+        'total': total,
+        'counts': counts,
+        'overdue': overdue,
+        'completion_pct': round(100 * counts['completed'] / total) if total else 0,
+    }
+
+
+def actual_counts():
+    """{(user_id, scope, status): count} computed from the task tables."""
+    actual = Counter()
+    for model in (Task, ArchivedTask):
+        created = model.objects.exclude(created_by=None).values('created_by_id', 'status').annotate(n=Count('id'))
+        for row in created.order_by():
+            actual[row['created_by_id'], CREATED, row['status']] += row['n']
+    for through, task in ((Assignment, 'task'), (ArchivedAssignment, 'archivedtask')):
+        assigned = through.objects.values('user_id', f'{task}__status').annotate(n=Count('id'))
+        for row in assigned.order_by():
+            actual[row['user_id'], ASSIGNED, row[f'{task}__status']] += row['n']
+    return dict(actual)
+
+
+def stored_counts():
+    return {
+        (row.user_id, row.scope, row.status): row.count
+        for row in TaskStatusCounter.objects.exclude(count=0).iterator()
+    }
+
+
+def rebuild(batch_size=1000):
+    TaskStatusCounter.objects.all().delete()
+    TaskStatusCounter.objects.bulk_create(
+        (TaskStatusCounter(user_id=u, scope=scope, status=status, count=n)
+         for (u, scope, status), n in actual_counts().items()),
+        batch_size=batch_size,
+    )
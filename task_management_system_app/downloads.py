@@ -0,0 +1,166 @@
+"""
+Permission-checked delivery of uploaded task files.
+
+After the access check the bytes are handed off without passing through
+Python whenever possible, depending on ``settings.MEDIA_DELIVERY``:
+
+* ``'x-accel'``   – nginx serves ``MEDIA_ACCEL_PREFIX + name`` from an
+  ``internal`` location, e.g.::
+
+      location /protected-media/ { internal; alias /srv/task_management/media/; }
+
+* ``'x-sendfile'`` – Apache mod_xsendfile / lighttpd serve the absolute path.
+* ``'python'``    – no proxy: a ``FileResponse`` positioned at the requested
+  range. WSGI servers with a sendfile-capable ``wsgi.file_wrapper``
+  (gunicorn, uWSGI) use ``os.sendfile`` on its file descriptor, so the bytes
+  never enter userspace; ``Range``, ``If-Range`` and ``If-None-Match`` are
+  handled here.
+
+Student uploads are untrusted: only images and PDFs are shown inline, and
+everything else (HTML, SVG, ...) is sent as an attachment. Every response
+carries ``X-Content-Type-Options: nosniff`` so browsers never guess a type
+that would run on this origin.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+from .roles import TEACHER
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Types a browser can show inline without running anything (not SVG)
+INLINE_TYPES = {'application/pdf', 'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'image/bmp'}
+
+
+class RangeFile:
+    """
+    A file positioned at `start` that reads at most `length` bytes. It keeps
+    ``fileno()`` so sendfile-based file wrappers still work; they send
+    Content-Length bytes from the current offset.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def can_download(user, task_file):
+    task = task_file.task
+    return (
+        user.role == TEACHER
+        or task.created_by_id == user.pk
+        or task.assigned_to.filter(pk=user.pk).exists()
+    )
+
+
+def file_etag(task_file, stat):
+    if task_file.blob_id:
+        # Content-addressed: the hash is the strongest validator there is
+        return quote_etag(task_file.blob.sha256)
+    return quote_etag(f"{stat.st_size:x}-{int(stat.st_mtime):x}")
+
+
+def parse_range(header, size):
+    """(start, end) of one byte range; None to send the whole file; False if unsatisfiable."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None  # no Range, or a form we do not support (e.g. several ranges)
+    first, last = match.groups()
+    if not first and not last:
+        return False
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def serve(request, task_file):
+    name = task_file.file.name
+    path = task_file.file.storage.path(name)
+    mode = settings.MEDIA_DELIVERY
+    filename = os.path.basename(task_file.display_name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if mode == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        # nginx decodes the URI; unquoted spaces, ?, # or % would point elsewhere
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+    elif mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = serve_file(request, task_file, path, content_type, filename)
+        response.headers.setdefault('X-Content-Type-Options', 'nosniff')  # 304 / 416 too
+        return response
+
+    return protect(response, content_type, filename)
+
+
+def protect(response, content_type, filename):
+    """Send what could run in the browser as an attachment, and forbid type sniffing."""
+    response['Content-Disposition'] = content_disposition_header(content_type not in INLINE_TYPES, filename)
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def serve_file(request, task_file, path, content_type, filename):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found")
+    size = stat.st_size
+    etag = file_etag(task_file, stat)
+    last_modified = http_date(stat.st_mtime)
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and if_range not in (etag, last_modified):
+        byte_range = None  # file changed since the client's partial copy
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    file = open(path, 'rb')
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(file, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    else:
+        length = size
+        response = FileResponse(file, content_type=content_type)
+
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return protect(response, content_type, filename)
@@ -0,0 +1,272 @@
+"""
+Live task updates over Server-Sent Events.
+
+Saves, deletes and assignment changes are collected per thread and sent
+once the transaction commits: the task's teacher (``created_by``) and its
+assigned students each get ``created`` / ``updated`` / ``deleted`` events
+on their own channel, carrying the row HTML for their role so
+``tasks.html`` can patch the table in place. The flush re-reads the
+committed rows, so a rolled-back change that is still queued is dropped.
+Bulk imports and mass assignment (``bulk.py``) and archival (``archive.py``)
+do not send per-row signals and are not pushed.
+
+Fan-out goes through the broker in ``settings.TASK_EVENTS_BACKEND``:
+
+* ``InMemoryBroker`` – one process (a single ASGI worker, tests).
+* ``RedisBroker`` – Redis pub/sub, for several workers or hosts
+  (needs the ``redis`` package).
+
+The stream is an async response, so it is only served under ASGI; under
+WSGI the endpoint answers 204, which tells ``EventSource`` not to
+reconnect, and the page behaves as it did before.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import fragments
+from .models import Task
+from .roles import STUDENT, TEACHER
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+# Sent instead of the events a slow client had no room for: reload the rows
+RESYNC = 'resync'
+
+_local = threading.local()
+
+
+def user_channel(user_id):
+    return f"task-events:user:{user_id}"
+
+
+class InMemoryBroker:
+    """Per-process fan-out; subscribers may live on any event loop."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    async def subscribe(self, channels):
+        subscription = InMemorySubscription(self, channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].discard(subscription)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+    def has_listeners(self):
+        return bool(self._subscribers)
+
+    def listening(self, channels):
+        """The channels somebody is subscribed to (nothing else is worth rendering)."""
+        with self._lock:
+            return {channel for channel in channels if channel in self._subscribers}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+class InMemorySubscription:
+
+    def __init__(self, broker, channels, loop):
+        self.broker = broker
+        self.channels = list(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.TASK_EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The subscriber's loop is gone; it will be unsubscribed on close
+            pass
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next message, or None after `timeout` seconds."""
+        if self.overflowed:
+            # Whatever is queued is incomplete; the client reloads its rows instead
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return json.dumps({'type': RESYNC})
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class RedisBroker:
+    """Redis pub/sub; publishing is sync (it runs in on_commit callbacks)."""
+
+    def __init__(self):
+        import redis
+        import redis.asyncio
+
+        url = settings.TASK_EVENTS_REDIS_URL
+        self._publisher = redis.Redis.from_url(url)
+        self._async_client = redis.asyncio.Redis.from_url(url)
+
+    async def subscribe(self, channels):
+        pubsub = self._async_client.pubsub()
+        await pubsub.subscribe(*channels)
+        return RedisSubscription(pubsub)
+
+    def has_listeners(self):
+        # Subscribers may be on any worker; let Redis drop unheard messages
+        return True
+
+    def listening(self, channels):
+        return set(channels)
+
+    def publish(self, channel, message):
+        self._publisher.publish(channel, message)
+
+
+class RedisSubscription:
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return message['data'].decode() if message else None
+
+    async def close(self):
+        await self.pubsub.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.TASK_EVENTS_BACKEND)()
+
+
+# 📣 Collecting changes (called from signals.py)
+
+def _pending():
+    if not hasattr(_local, 'pending'):
+        _local.pending = {}
+    return _local.pending
+
+
+def task_changed(task_id, created=False, added=(), removed=()):
+    if not get_broker().has_listeners():
+        return
+    change = _pending().setdefault(task_id, {'created': False, 'added': set(), 'removed': set(), 'deleted': None})
+    change['created'] |= created
+    change['added'].update(added)
+    change['removed'].update(removed)
+    transaction.on_commit(flush)
+
+
+def task_deleted(task):
+    """Call before the delete: the recipients are read from the task's rows."""
+    if not get_broker().has_listeners():
+        return
+    task_changed(task.pk)
+    assignees = Task.assigned_to.through.objects.filter(task_id=task.pk).values_list('user_id', flat=True)
+    _pending()[task.pk]['deleted'] = {task.created_by_id, *assignees} - {None}
+
+
+def flush():
+    """Publish everything queued on this thread (once per commit, later calls find nothing)."""
+    pending, _local.pending = _pending(), {}
+    if not pending:
+        return
+
+    broker = get_broker()
+    tasks = Task.objects.for_listing().in_bulk(pending.keys())
+    assignees = defaultdict(set)
+    for task_id, user_id in Task.assigned_to.through.objects.filter(task_id__in=tasks).values_list('task_id', 'user_id'):
+        assignees[task_id].add(user_id)
+
+    # (recipient, event type, task id, role the row is rendered for)
+    messages = []
+    for task_id, change in pending.items():
+        task = tasks.get(task_id)
+        if task is None:
+            # Deleted (or created and rolled back, in which case there is nobody to tell)
+            for user_id in change['deleted'] or ():
+                messages.append((user_id, DELETED, task_id, None))
+            continue
+        if change['deleted'] is not None:
+            # The delete was rolled back
+            continue
+
+        new = CREATED if change['created'] else UPDATED
+        if task.created_by_id:
+            messages.append((task.created_by_id, new, task_id, TEACHER))
+        for user_id in assignees[task_id]:
+            messages.append((user_id, CREATED if user_id in change['added'] else new, task_id, STUDENT))
+        for user_id in change['removed'] - assignees[task_id]:
+            messages.append((user_id, DELETED, task_id, None))
+
+    heard = broker.listening({user_channel(user_id) for user_id, *_ in messages})
+    messages = [message for message in messages if user_channel(message[0]) in heard]
+
+    rows = {}
+    for role in (TEACHER, STUDENT):
+        listed = {task_id: tasks[task_id] for _, _, task_id, r in messages if r == role}
+        if listed:
+            rows[role] = dict(zip(listed, fragments.render_rows(listed.values(), 'list', role)))
+
+    for user_id, kind, task_id, role in messages:
+        payload = {'type': kind, 'id': task_id}
+        if role is not None:
+            payload['html'] = str(rows[role][task_id])
+        broker.publish(user_channel(user_id), json.dumps(payload))
+
+
+# 📡 The stream itself
+
+def format_event(event, data):
+    # json.dumps() output is a single line, so one data: field is enough
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def stream(subscription, max_seconds=None):
+    """
+    SSE lines for one client: events as they arrive, a comment every
+    ``TASK_EVENTS_HEARTBEAT_SECONDS`` to keep proxies from closing the
+    connection, and a clean end after ``max_seconds`` (Django 4.2 does not
+    notice disconnected clients, so this is what frees the slot; the browser
+    reconnects after ``TASK_EVENTS_RETRY_MS``).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + (max_seconds or settings.TASK_EVENTS_MAX_SECONDS)
+    try:
+        yield f"retry: {settings.TASK_EVENTS_RETRY_MS}\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            message = await subscription.get(min(settings.TASK_EVENTS_HEARTBEAT_SECONDS, remaining))
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(f"task.{json.loads(message)['type']}", message)
+    finally:
+        await subscription.close()
@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.hashers import make_password
 from .models import *
+from .roles import STUDENT, users_with_role
 
 class RegisterForm(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -15,8 +17,11 @@ class RegisterForm(UserCreationForm):
         model = User
         fields = ['username', 'email', 'password1', 'password2', 'group']
 
-    def save(self, commit=True):
-        user = super().save(commit=False)
+    def save(self, commit=True, password_hash=None):
+        # Skip UserCreationForm.save(): it would hash password1 again when
+        # the async register view already did it off the event loop
+        user = forms.ModelForm.save(self, commit=False)
+        user.password = password_hash or make_password(self.cleaned_data['password1'])
         user.email = self.cleaned_data['email']
         if commit:
             user.save()
@@ -55,8 +60,7 @@ class TaskForm(forms.ModelForm):
         }
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        student_group = Group.objects.get(name="student")
-        self.fields['assigned_to'].queryset = User.objects.filter(groups=student_group)
+        self.fields['assigned_to'].queryset = users_with_role(STUDENT)
         
 class StudentTaskForm(forms.ModelForm):
     class Meta:
@@ -68,6 +72,16 @@ class StudentTaskForm(forms.ModelForm):
             }),
         }
 
+class BulkTaskRowForm(forms.Form):
+    """One row of a bulk task import (assignees are resolved separately)."""
+    title = forms.CharField(max_length=255)
+    description = forms.CharField(required=False)
+    status = forms.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    due_date = forms.DateField(required=False)
+
+    def clean_status(self):
+        return self.cleaned_data['status'] or 'pending'
+
 class TaskFileForm(forms.ModelForm):
     class Meta:
         model = TaskFile
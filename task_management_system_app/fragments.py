@@ -0,0 +1,61 @@
+"""
+Row-level fragment cache for the task tables.
+
+Each rendered ``<tr>`` is cached under the task's pk, its ``updated_at``
+and the viewer's role, so any save produces a new key and stale rows are
+never read. Assignment changes do not save the task, so the m2m handler in
+``signals.py`` bumps ``updated_at`` instead; that keeps every key computable
+from the row itself and a whole page is fetched with one ``get_many``.
+
+Archived tasks (``task_list?archived=1``) always get the read-only
+``archived`` row, whatever kind of table they are listed in.
+
+The cache alias is ``settings.TASK_ROW_CACHE`` (locmem by default; point it
+at Redis / Memcached in production, or a file-based cache in tests).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import ArchivedTask, assignees_prefetch
+
+ROW_TEMPLATES = {
+    'list': 'partials/task_row.html',
+    'dashboard': 'partials/dashboard_row.html',
+    'archived': 'partials/archived_task_row.html',
+}
+# Bump when a row template changes so rows cached by the old one are not served
+ROW_VERSION = 2
+
+
+def row_cache():
+    return caches[settings.TASK_ROW_CACHE]
+
+
+def row_key(kind, role, task):
+    return f"task-row:v{ROW_VERSION}:{kind}:{role or 'none'}:{task.pk}:{task.updated_at.timestamp()}"
+
+
+def render_rows(tasks, kind, role):
+    """HTML for each task row: one cache round trip, rendering only the misses."""
+    tasks = list(tasks)
+    kinds = ['archived' if isinstance(task, ArchivedTask) else kind for task in tasks]
+    cache = row_cache()
+    keys = [row_key(k, role, task) for k, task in zip(kinds, tasks)]
+    cached = cache.get_many(keys)
+
+    misses = [(k, task, key) for k, task, key in zip(kinds, tasks, keys) if key not in cached]
+    if misses:
+        # Assignee usernames are only needed for rows we actually render
+        for model in {type(task) for _, task, _ in misses}:
+            prefetch_related_objects([task for _, task, _ in misses if type(task) is model], assignees_prefetch())
+        fresh = {
+            key: render_to_string(ROW_TEMPLATES[k], {'task': task, 'role': role})
+            for k, task, key in misses
+        }
+        cache.set_many(fresh, settings.TASK_ROW_CACHE_TIMEOUT)
+        cached.update(fresh)
+
+    return [mark_safe(cached[key]) for key in keys]
@@ -0,0 +1,120 @@
+"""
+In-app notifications (``django-notifications-hq``'s ``Notification``).
+
+* Fan-out on write: when a teacher saves a ``TaskForm``, ``notify_task``
+  writes one inbox row per affected student in a single bulk insert
+  (``notify.send()`` would save them one at a time). The row carries the
+  task title in ``description`` and the task id as its target, so reading
+  the inbox joins nothing.
+* Unread counts: ``InboxCounter`` holds one row per user, moved by ``F()``
+  updates in the same transaction as the notifications (as ``counters.py``
+  does for task statuses). The navbar badge reads it through the Django
+  cache; a change drops the cached values after commit, so a page costs
+  no query until the count changes.
+* Reads are keyset pages on the recipient index (newest first), and
+  ``mark_all_read`` is one UPDATE.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from notifications.models import Notification
+
+from .models import InboxCounter, Task
+
+ASSIGNED = 'assigned you'
+UPDATED = 'updated'
+# Newest first; ids grow with time and `id` alone keeps the page on the recipient index
+ORDERING = ('-id',)
+
+
+def unread_cache_key(user_id):
+    return f"inbox-unread:{user_id}"
+
+
+def bump(user_ids, delta):
+    """Add `delta` to the unread count of every user in `user_ids`."""
+    user_ids = list(user_ids)
+    if not user_ids or not delta:
+        return
+    InboxCounter.objects.bulk_create([InboxCounter(user_id=pk) for pk in user_ids], ignore_conflicts=True)
+    InboxCounter.objects.filter(user_id__in=user_ids).update(unread=Greatest(F('unread') + delta, 0))
+    transaction.on_commit(lambda: cache.delete_many([unread_cache_key(pk) for pk in user_ids]))
+
+
+def notify_task(task, actor, recipients):
+    """One inbox row per {user id: verb} in `recipients` about `task`; returns how many."""
+    if not recipients:
+        return 0
+    now = timezone.now()
+    actor_type = ContentType.objects.get_for_model(User)
+    task_type = ContentType.objects.get_for_model(Task)
+    with transaction.atomic():
+        Notification.objects.bulk_create([
+            Notification(
+                recipient_id=user_id,
+                actor_content_type=actor_type,
+                actor_object_id=str(actor.pk),
+                verb=verb,
+                description=task.title,
+                target_content_type=task_type,
+                target_object_id=str(task.pk),
+                timestamp=now,
+            )
+            for user_id, verb in recipients.items()
+        ])
+        bump(recipients, 1)
+    return len(recipients)
+
+
+def form_recipients(form, previous_ids=()):
+    """
+    {student id: verb} for a saved ``TaskForm``: newly assigned students are
+    told they were assigned, the others only when something they see changed.
+    """
+    assigned = {user.pk for user in form.cleaned_data['assigned_to']}
+    recipients = dict.fromkeys(assigned - set(previous_ids), ASSIGNED)
+    if set(form.changed_data) - {'assigned_to'}:
+        recipients.update(dict.fromkeys(assigned & set(previous_ids), UPDATED))
+    return recipients
+
+
+def unread_count(user):
+    key = unread_cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = InboxCounter.objects.filter(pk=user.pk).values_list('unread', flat=True).first() or 0
+        cache.set(key, count, settings.INBOX_UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def unread_badge(request):
+    """Context processor: `inbox_unread`, looked up only when a template uses it."""
+    user = getattr(request, 'user', None)
+    return {
+        'inbox_unread': SimpleLazyObject(lambda: unread_count(user) if user and user.is_authenticated else 0),
+    }
+
+
+def notifications_for(user):
+    return Notification.objects.filter(recipient=user)
+
+
+def mark_read(user, notification_id):
+    with transaction.atomic():
+        if notifications_for(user).filter(pk=notification_id, unread=True).update(unread=False):
+            bump([user.pk], -1)
+
+
+def mark_all_read(user):
+    """Mark every unread notification of `user` read in one UPDATE; returns how many."""
+    with transaction.atomic():
+        changed = notifications_for(user).filter(unread=True).update(unread=False)
+        # Rows inserted concurrently were not updated and stay counted
+        bump([user.pk], -changed)
+    return changed
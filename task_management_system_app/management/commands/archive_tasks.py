@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from task_management_system_app import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed tasks untouched for --days (default ARCHIVE_AFTER_DAYS) to the "
+        "archive table in batches, or move archived tasks back with --restore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive completed tasks not updated for this many days.")
+        parser.add_argument('--batch-size', type=int, help="Tasks per transaction (default ARCHIVE_BATCH_SIZE).")
+        parser.add_argument('--pause', type=float, help="Seconds between batches (default ARCHIVE_PAUSE_SECONDS).")
+        parser.add_argument('--restore', type=int, nargs='+', metavar='TASK_ID',
+                            help="Move these archived tasks back to the active table instead.")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored = archive.restore(options['restore'])
+            missing = sorted(set(options['restore']) - set(restored))
+            self.stdout.write(self.style.SUCCESS(f"Restored {len(restored)} task(s)."))
+            if missing:
+                raise CommandError(f"Not in the archive: {', '.join(map(str, missing))}")
+            return
+
+        moved = archive.archive_completed(options['days'], options['batch_size'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} completed task(s)."))
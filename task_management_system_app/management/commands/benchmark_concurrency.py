@@ -0,0 +1,151 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from .benchmark_views import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare running servers under concurrency, e.g. the WSGI deployment "
+        "(gunicorn task_management.wsgi) and the ASGI one (uvicorn "
+        "task_management.asgi:application). While --slow-clients connections "
+        "trickle their request headers in over --slow-seconds, --clients "
+        "concurrent clients fetch the listing pages as the seeded teacher, and "
+        "their latency and throughput are printed as JSON per server. The "
+        "servers must use the same database as this command."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', required=True, metavar='NAME=URL',
+                            help="Server to measure, e.g. wsgi=http://127.0.0.1:8000 (repeatable).")
+        parser.add_argument('--path', action='append',
+                            help="Pages the clients cycle through (default: /task-list/ and /dashboard/).")
+        parser.add_argument('--prefix', default='seed', help="Username prefix used by seed_data.")
+        parser.add_argument('--clients', type=int, default=20, help="Concurrent measured clients.")
+        parser.add_argument('--requests', type=int, default=10, help="Requests per measured client.")
+        parser.add_argument('--slow-clients', type=int, default=50)
+        parser.add_argument('--slow-seconds', type=float, default=10,
+                            help="Time each slow client takes to send its request headers.")
+        parser.add_argument('--timeout', type=float, default=60, help="Seconds before a request counts as failed.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        targets = {}
+        for value in options['url']:
+            name, sep, url = value.partition('=')
+            if not sep or not urlsplit(url).hostname:
+                raise CommandError(f"Expected NAME=URL, got {value!r}")
+            targets[name] = url.rstrip('/')
+
+        report = {
+            'clients': options['clients'],
+            'requests_per_client': options['requests'],
+            'slow_clients': options['slow_clients'],
+            'slow_seconds': options['slow_seconds'],
+            'servers': {},
+        }
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.session_key(options['prefix'])}"
+        paths = options['path'] or ['/task-list/', '/dashboard/']
+        for name, url in targets.items():
+            self.stderr.write(f"{name} ({url})...")
+            report['servers'][name] = asyncio.run(self.measure(url, paths, cookie, options))
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def session_key(self, prefix):
+        user = User.objects.filter(username=f"{prefix}-teacher-0").first()
+        if user is None:
+            raise CommandError(f"No user {prefix}-teacher-0; run seed_data first.")
+        client = Client()
+        client.force_login(user)
+        return client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    async def measure(self, url, paths, cookie, options):
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+
+        def request_lines(path):
+            return [
+                f"GET {parts.path}{path} HTTP/1.1",
+                f"Host: {parts.netloc}",
+                f"Cookie: {cookie}",
+                "Connection: close",
+            ]
+
+        async def send(lines, pause=0):
+            """Status code of one request; headers are sent `pause` seconds apart."""
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                for line in lines:
+                    writer.write(f"{line}\r\n".encode())
+                    await writer.drain()
+                    if pause:
+                        await asyncio.sleep(pause)
+                writer.write(b"\r\n")
+                await writer.drain()
+                response = await reader.read()
+            finally:
+                writer.close()
+            return int(response.split(b' ', 2)[1])
+
+        statuses = Counter()
+        latencies = []
+
+        async def timed(lines, pause=0):
+            """(status or error name, milliseconds)"""
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(send(lines, pause), options['timeout'] + pause * len(lines))
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError) as e:
+                status = type(e).__name__
+            return status, (time.perf_counter() - start) * 1000
+
+        async def fast_client(n):
+            for i in range(options['requests']):
+                status, ms = await timed(request_lines(paths[(n + i) % len(paths)]))
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(ms)
+
+        # Slow clients: one header line at a time, like a poor mobile link
+        lines = request_lines(paths[0])
+        slow = [
+            asyncio.create_task(timed(lines, options['slow_seconds'] / len(lines)))
+            for _ in range(options['slow_clients'])
+        ]
+        await asyncio.sleep(0.5)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(fast_client(n) for n in range(options['clients'])))
+        elapsed = time.perf_counter() - started
+        slow_results = await asyncio.gather(*slow)
+
+        status_codes = {str(k): v for k, v in sorted(statuses.items(), key=str)}
+        if not latencies:
+            return {'error': "no request succeeded", 'status_codes': status_codes}
+        latencies.sort()
+        return {
+            'status_codes': status_codes,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'slow_clients_served': sum(1 for status, _ in slow_results if status == 200),
+        }
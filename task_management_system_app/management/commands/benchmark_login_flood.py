@@ -0,0 +1,130 @@
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from task_management_system_app import ratelimit
+from task_management_system_app.models import EmailVerification
+
+from .benchmark_views import percentile
+
+PASSWORD = 'flood-pass'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure a legitimate user's login latency alone, during a wrong-password "
+        "flood with rate limiting off, and during the same flood with it on. "
+        "Each measured login is a different temporary user from its own address; "
+        "the users are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=30, help="Measured legitimate logins per phase.")
+        parser.add_argument('--flooders', type=int, default=8, help="Threads posting bad passwords.")
+        parser.add_argument('--flood-rps', type=float, default=100,
+                            help="Offered flood rate, shared by the threads (an attacker's pace, not ours).")
+        parser.add_argument('--settle', type=float, default=5,
+                            help="Seconds the flood runs before measuring (past the allowed burst).")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        ratelimit.get_cache().clear()
+        users = self.make_users(['flood-victim'] + [f'flood-legit-{n}' for n in range(options['logins'])])
+        try:
+            report = {
+                'flooders': options['flooders'],
+                'offered_flood_rps': options['flood_rps'],
+                'phases': {
+                    'no_flood': self.phase(options['logins'], 0, settle=0),
+                    'flood_unlimited': self.phase(options['logins'], options['flooders'], options['flood_rps'], {}, options['settle']),
+                    'flood_limited': self.phase(options['logins'], options['flooders'], options['flood_rps'], None, options['settle']),
+                },
+                'limiter_stats': ratelimit.stats(),
+            }
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            ratelimit.get_cache().clear()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def make_users(self, usernames):
+        User.objects.filter(username__in=usernames).delete()
+        hashed = make_password(PASSWORD)
+        User.objects.bulk_create([User(username=name, password=hashed) for name in usernames])
+        users = list(User.objects.filter(username__in=usernames))
+        expires = timezone.now() + timedelta(hours=1)
+        EmailVerification.objects.bulk_create(
+            [EmailVerification(user=user, expires_at=expires, is_verified=True) for user in users]
+        )
+        return users
+
+    def phase(self, logins, flooders, flood_rps=0, limits=None, settle=0):
+        stop = threading.Event()
+        flood = Counter()
+        lock = threading.Lock()
+
+        def attack(n):
+            client = Client(REMOTE_ADDR=f'198.51.100.{n % 250 + 1}')
+            interval = flooders / flood_rps
+            next_at = time.perf_counter()
+            try:
+                while not stop.is_set():
+                    status = client.post('/login/', {'username': 'flood-victim', 'password': 'guess'}).status_code
+                    with lock:
+                        flood[status] += 1
+                    # Keep the offered pace; a slow server simply falls behind
+                    next_at = max(next_at + interval, time.perf_counter() - interval)
+                    stop.wait(max(0, next_at - time.perf_counter()))
+            finally:
+                connection.close()
+
+        settings_override = override_settings(RATE_LIMITS=limits) if limits is not None else override_settings()
+        with settings_override:
+            ratelimit.get_cache().clear()
+            threads = [threading.Thread(target=attack, args=(n,), daemon=True) for n in range(flooders)]
+            for thread in threads:
+                thread.start()
+            time.sleep(settle)
+            flood.clear()
+            started = time.perf_counter()
+
+            latencies = []
+            for n in range(logins):
+                client = Client(REMOTE_ADDR=f'192.0.2.{n % 250 + 1}')
+                start = time.perf_counter()
+                response = client.post('/login/', {'username': f'flood-legit-{n}', 'password': PASSWORD})
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 302:
+                    raise CommandError(f"Legitimate login answered {response.status_code}")
+            elapsed = time.perf_counter() - started
+
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        latencies.sort()
+        return {
+            'legit_p50_ms': round(percentile(latencies, 50), 2),
+            'legit_p95_ms': round(percentile(latencies, 95), 2),
+            'legit_mean_ms': round(statistics.fmean(latencies), 2),
+            'flood_requests': sum(flood.values()),
+            'flood_served_rps': round(sum(flood.values()) / elapsed, 1),
+            'flood_status_codes': {str(code): n for code, n in sorted(flood.items())},
+        }
@@ -0,0 +1,79 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+
+from task_management_system_app import fragments
+from task_management_system_app.models import Task, assignees_prefetch
+from task_management_system_app.roles import TEACHER
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rendering one page of task rows without the fragment cache, with "
+        "a cold cache and with a warm cache. Synthetic tasks are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--assignees', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        teacher = User.objects.create_user('bench-row-teacher')
+        students = User.objects.bulk_create(
+            [User(username=f'bench-row-student-{n}') for n in range(options['assignees'])]
+        )
+        tasks = Task.objects.bulk_create([
+            Task(title=f"Task {n}", description="", due_date=date.today() + timedelta(days=n % 30), created_by=teacher)
+            for n in range(options['rows'])
+        ])
+        Assignment = Task.assigned_to.through
+        Assignment.objects.bulk_create(
+            [Assignment(task_id=task.pk, user_id=student.pk) for task in tasks for student in students]
+        )
+        page = Task.objects.filter(created_by=teacher).for_listing().order_by('-created_at', 'id')
+
+        def uncached():
+            rows = list(page.all())
+            prefetch_related_objects(rows, assignees_prefetch())
+            for task in rows:
+                render_to_string(fragments.ROW_TEMPLATES['list'], {'task': task, 'role': TEACHER})
+
+        def cold():
+            fragments.row_cache().clear()
+            fragments.render_rows(page.all(), 'list', TEACHER)
+
+        def warm():
+            fragments.render_rows(page.all(), 'list', TEACHER)
+
+        self.stdout.write(f"{options['rows']} rows, {options['assignees']} assignees each")
+        self.stdout.write(f"{'mode':<10} {'median ms':>10}")
+        for name, fn in (('uncached', uncached), ('cold', cold), ('warm', warm)):
+            self.stdout.write(f"{name:<10} {self.measure(fn, options['repeat']):>10.1f}")
+        fragments.row_cache().clear()
+
+    def measure(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,96 @@
+import random
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from task_management_system_app.archive import delete_rows
+from task_management_system_app.models import Task
+from task_management_system_app.search import IcontainsSearchBackend, get_search_backend
+
+WORDS = (
+    "algebra essay reading chapter lab report project revise draft geometry history "
+    "biology chemistry physics poem summary outline worksheet practice quiz review "
+    "presentation research notes experiment analysis homework running writing "
+    "calculus grammar vocabulary timeline portfolio debate"
+).split()
+# Background vocabulary so subject words are as selective as in real task text
+FILLER = [f"topic{n}" for n in range(2000)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the full-text search backend with the old icontains scan. "
+        "Synthetic tasks are committed (InnoDB only indexes committed rows) "
+        "and deleted again when the run ends, even if it fails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--queries', nargs='+', default=['essay', 'lab report', 'revis', 'calculus homework'])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        # Synthetic rows are the ones past this id that carry this run's marker
+        self.first_id = Task.objects.aggregate(last=Max('id'))['last'] or 0
+        self.marker = f"benchmark-{uuid.uuid4().hex}"
+        try:
+            self.run(options)
+        finally:
+            self.stdout.write(f"Removed {self.cleanup(options['batch_size'])} synthetic tasks")
+            # Drop their index entries (SQLite) / purge them from the FULLTEXT index (MySQL)
+            get_search_backend().rebuild()
+
+    def run(self, options):
+        fulltext = get_search_backend()
+        icontains = IcontainsSearchBackend()
+        page_size = settings.TASK_PAGE_SIZE
+
+        self.stdout.write(f"{'tasks':>10} {'query':<20} {'icontains ms':>13} {'fulltext ms':>12} {'speedup':>8}")
+        for size in sorted(options['sizes']):
+            self.fill(size, options['batch_size'])
+            fulltext.rebuild()
+            for query in options['queries']:
+                slow = self.measure(icontains, query, page_size, options['repeat'])
+                fast = self.measure(fulltext, query, page_size, options['repeat'])
+                self.stdout.write(
+                    f"{size:>10} {query:<20} {slow:>13.2f} {fast:>12.2f} {slow / max(fast, 1e-6):>7.1f}x"
+                )
+
+    def fill(self, size, batch_size):
+        missing = size - Task.objects.count()
+        while missing > 0:
+            batch = min(batch_size, missing)
+            Task.objects.bulk_create([self.fake_task() for _ in range(batch)], batch_size=batch)
+            missing -= batch
+
+    def fake_task(self):
+        return Task(
+            title=' '.join(self.rng.sample(WORDS, 2) + self.rng.sample(FILLER, 2)).capitalize(),
+            description=' '.join([self.marker] + self.rng.choices(WORDS + FILLER, k=40)),
+            status=self.rng.choice(Task.STATUS_CHOICES)[0],
+        )
+
+    def cleanup(self, batch_size):
+        """Delete the synthetic tasks a batch at a time (plain DELETE: they were never counted or indexed)."""
+        synthetic = Task.objects.filter(id__gt=self.first_id, description__startswith=self.marker).order_by('id')
+        removed = 0
+        while ids := list(synthetic.values_list('id', flat=True)[:batch_size]):
+            delete_rows(Task, 'id', ids)
+            removed += len(ids)
+        return removed
+
+    def measure(self, backend, query, page_size, repeat):
+        """Median time (ms) to fetch the first page of results."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(backend.search(Task.objects.all(), query).order_by(*backend.ordering)[:page_size])
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,146 @@
+import json
+import platform
+import statistics
+import time
+from collections import Counter
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment
+from django.utils import timezone
+
+from task_management_system_app import fragments
+from task_management_system_app.models import Task
+from task_management_system_app.querystats import QueryStats
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main views through the Django test client against the current "
+        "database (e.g. data from seed_data) and print latency percentiles, "
+        "throughput and queries per request as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help="Username prefix used by seed_data.")
+        parser.add_argument('--password', default='seed-pass')
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--only', nargs='+', help="Run only these scenarios.")
+        parser.add_argument('--cold-row-cache', action='store_true',
+                            help="Clear the task row fragment cache before every request.")
+        parser.add_argument('--label', default='', help="Stored in the report, e.g. a commit hash.")
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+
+    def handle(self, *args, **options):
+        # Allows the 'testserver' host and keeps login emails in memory
+        try:
+            setup_test_environment()
+        except RuntimeError:
+            pass  # already set up, e.g. when run from the test suite
+        teacher = self.seeded_user(options['prefix'], 'teacher')
+        student = self.seeded_user(options['prefix'], 'student')
+        task = Task.objects.filter(assigned_to=student).order_by('id').first()
+        if task is None:
+            raise CommandError("The seeded student has no tasks; run seed_data first.")
+        word = task.title.split()[0].lower()
+        due = task.due_date.isoformat() if task.due_date else ''
+
+        scenarios = {
+            'task_list': (teacher, 'get', '/task-list/', None),
+            'task_list_search': (teacher, 'get', f'/task-list/?search={word}', None),
+            'task_list_status': (teacher, 'get', '/task-list/?status=in_progress', None),
+            'task_list_due_date': (teacher, 'get', f'/task-list/?due_date={due}', None),
+            'task_list_student': (student, 'get', '/task-list/', None),
+            'dashboard_teacher': (teacher, 'get', '/dashboard/', None),
+            'dashboard_student': (student, 'get', '/dashboard/', None),
+            'task_update': (student, 'get', f'/{task.pk}/edit/', None),
+            'login': (None, 'post', '/login/', {'username': student.username, 'password': options['password']}),
+        }
+        if options['only']:
+            unknown = set(options['only']) - scenarios.keys()
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = {name: scenarios[name] for name in options['only']}
+
+        report = {
+            'label': options['label'],
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {
+                'users': User.objects.count(),
+                'tasks': Task.objects.count(),
+                'assignments': Task.assigned_to.through.objects.count(),
+            },
+            'requests_per_scenario': options['requests'],
+            'cold_row_cache': options['cold_row_cache'],
+            'scenarios': {},
+        }
+        # Measure the views, not the rate limiter's 429 page: the login
+        # scenario posts far more often than RATE_LIMITS allow
+        with override_settings(RATE_LIMITS={}):
+            for name, scenario in scenarios.items():
+                self.stderr.write(f"{name}...")
+                report['scenarios'][name] = self.run(scenario, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def seeded_user(self, prefix, role):
+        user = User.objects.filter(username=f"{prefix}-{role}-0").first()
+        if user is None:
+            raise CommandError(f"No user {prefix}-{role}-0; run seed_data first.")
+        return user
+
+    def run(self, scenario, options):
+        user, method, url, data = scenario
+        client = Client()
+        if user:
+            client.force_login(user)
+
+        def request():
+            if options['cold_row_cache']:
+                fragments.row_cache().clear()
+            return getattr(client, method)(url, data) if data else getattr(client, method)(url)
+
+        for _ in range(options['warmup']):
+            request()
+
+        latencies, queries, statuses = [], [], Counter()
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            with QueryStats() as stats:
+                start = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(stats.count)
+            statuses[response.status_code] += 1
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'url': url,
+            'method': method.upper(),
+            'status_codes': {str(code): n for code, n in sorted(statuses.items())},
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'queries_per_request': round(statistics.fmean(queries), 2),
+        }
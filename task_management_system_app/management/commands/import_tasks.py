@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from task_management_system_app import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create tasks from a CSV (title,description,status,due_date,assigned_to) "
+        "or JSON / JSON Lines file. assigned_to holds student usernames (';'-separated in CSV)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--teacher', required=True, help="Username recorded as the tasks' creator.")
+        parser.add_argument('--format', choices=bulk.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=settings.BULK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            teacher = User.objects.get(username=options['teacher'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['teacher']!r}.")
+
+        try:
+            fmt = bulk.detect_format(options['path'], options['format'])
+            with open(options['path'], 'rb') as stream:
+                created, errors = bulk.import_tasks(bulk.iter_rows(stream, fmt), teacher, options['batch_size'])
+        except (OSError, bulk.BulkImportError) as e:
+            raise CommandError(str(e))
+
+        for number, problems in errors:
+            self.stderr.write(f"row {number}: {'; '.join(problems)}")
+        self.stdout.write(self.style.SUCCESS(f"Created {created} task(s); {len(errors)} row(s) rejected."))
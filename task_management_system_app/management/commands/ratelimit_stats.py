@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from task_management_system_app import ratelimit
+
+
+class Command(BaseCommand):
+    help = "Print allowed / blocked request totals per rate-limited scope as JSON."
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(ratelimit.stats(), indent=2))
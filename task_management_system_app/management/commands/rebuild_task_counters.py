@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from task_management_system_app import counters
+
+
+class Command(BaseCommand):
+    help = "Check the per-user task status counters against the task tables, or rebuild them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report counters that differ from the real data; exit non-zero if any do.",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            actual = counters.actual_counts()
+            stored = counters.stored_counts()
+            drift = {
+                key: (stored.get(key, 0), actual.get(key, 0))
+                for key in actual.keys() | stored.keys()
+                if stored.get(key, 0) != actual.get(key, 0)
+            }
+            for (user_id, scope, status), (have, want) in sorted(drift.items()):
+                self.stdout.write(f"user={user_id} {scope} {status}: stored {have}, actual {want}")
+            if drift:
+                raise CommandError(f"{len(drift)} counter(s) out of date; run without --check to rebuild.")
+            self.stdout.write(self.style.SUCCESS("All task counters match."))
+            return
+
+        with transaction.atomic():
+            counters.rebuild()
+        self.stdout.write(self.style.SUCCESS("Rebuilt task status counters."))
@@ -0,0 +1,27 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from task_management_system_app import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Print how many seconds each read replica in DATABASE_REPLICAS is behind the "
+        "primary, measured from the replication heartbeat, as JSON. Exits non-zero when "
+        "a replica is past REPLICA_MAX_LAG_SECONDS or its lag is unknown."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--beat', action='store_true',
+                            help="Stamp the heartbeat first (when Celery beat is not running).")
+
+    def handle(self, *args, **options):
+        if options['beat']:
+            replicas.beat()
+        report = {alias: replicas.measure_lag(alias) for alias in settings.DATABASE_REPLICAS}
+        self.stdout.write(json.dumps({'max_lag_seconds': settings.REPLICA_MAX_LAG_SECONDS, 'replicas': report}, indent=2))
+        behind = [alias for alias, lag in report.items() if lag is None or lag > settings.REPLICA_MAX_LAG_SECONDS]
+        if behind:
+            raise CommandError(f"Not usable: {', '.join(behind)}")
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from task_management_system_app import bulk, counters, uploads
+from task_management_system_app.models import EmailVerification, FileBlob, Task, TaskFile
+from task_management_system_app.search import get_search_backend
+
+from .benchmark_search import FILLER, WORDS
+
+# Share of tasks per status: most work is still open
+STATUS_WEIGHTS = {'pending': 45, 'in_progress': 30, 'completed': 25}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate teachers, students and tasks for load testing. Students are "
+        "grouped into classes; most tasks go to a whole class, some to one to "
+        "three students. Everything is written with bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=20)
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=10_000)
+        parser.add_argument('--class-size', type=int, default=25, help="Students per class.")
+        parser.add_argument('--individual', type=float, default=0.1,
+                            help="Share of tasks assigned to 1-3 students instead of a class.")
+        parser.add_argument('--files', type=float, default=0.2,
+                            help="Share of assignments with an uploaded file.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix; must not be in use yet.")
+        parser.add_argument('--password', default='seed-pass')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(f"Users named {prefix}-* already exist; pick another --prefix.")
+
+        with transaction.atomic():
+            teachers = self.create_users(f"{prefix}-teacher", options['teachers'], 'Teacher', options['password'])
+            students = self.create_users(f"{prefix}-student", options['students'], 'Student', options['password'])
+            classes = self.make_classes(teachers, students, options['class_size'])
+            assignments = self.create_tasks(teachers, classes, students, options['tasks'], options['individual'])
+            files = self.create_files(assignments, options['files'])
+            counters.rebuild()
+        get_search_backend().rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(teachers)} teachers, {len(students)} students, {options['tasks']} tasks, "
+            f"{len(assignments)} assignments and {files} files (password {options['password']!r})."
+        ))
+
+    def create_users(self, name, count, group_name, password):
+        group, _ = Group.objects.get_or_create(name=group_name)
+        hashed = make_password(password)  # hashing once keeps seeding fast
+        users = [
+            User(username=f"{name}-{n}", email=f"{name}-{n}@example.com", password=hashed)
+            for n in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        users = list(User.objects.filter(username__startswith=f"{name}-").order_by('id'))
+
+        Membership = User.groups.through
+        Membership.objects.bulk_create(
+            [Membership(user_id=user.pk, group_id=group.pk) for user in users], batch_size=self.batch_size
+        )
+        # login_view only admits verified addresses
+        expires = timezone.now() + timedelta(days=365)
+        EmailVerification.objects.bulk_create(
+            [EmailVerification(user=user, expires_at=expires, is_verified=True) for user in users],
+            batch_size=self.batch_size,
+        )
+        return users
+
+    def make_classes(self, teachers, students, class_size):
+        """{teacher: [classes]}, each class a list of student ids."""
+        ids = [student.pk for student in students]
+        self.rng.shuffle(ids)
+        classes = [ids[i:i + class_size] for i in range(0, len(ids), class_size)]
+        owned = {teacher: [] for teacher in teachers}
+        for n, members in enumerate(classes):
+            owned[teachers[n % len(teachers)]].append(members)
+        return owned
+
+    def text(self, words):
+        vocabulary = WORDS * 3 + FILLER
+        return ' '.join(self.rng.choice(vocabulary) for _ in range(words))
+
+    def create_tasks(self, teachers, classes, students, total, individual):
+        """Insert tasks per teacher and return [(task id, student id, status)]."""
+        student_ids = [student.pk for student in students]
+        statuses, weights = zip(*STATUS_WEIGHTS.items())
+        today = timezone.localdate()
+        Assignment = Task.assigned_to.through
+        assignments = []
+
+        per_teacher = [total // len(teachers) + (n < total % len(teachers)) for n in range(len(teachers))]
+        for teacher, count in zip(teachers, per_teacher):
+            for batch in bulk.chunked(range(count), self.batch_size):
+                tasks, targets = [], []
+                for _ in batch:
+                    tasks.append(Task(
+                        title=self.text(self.rng.randint(2, 6)).capitalize(),
+                        description=self.text(self.rng.randint(10, 60)),
+                        status=self.rng.choices(statuses, weights)[0],
+                        due_date=today + timedelta(days=self.rng.randint(-30, 60)),
+                    ))
+                    if classes[teacher] and self.rng.random() >= individual:
+                        targets.append(self.rng.choice(classes[teacher]))
+                    else:
+                        targets.append(self.rng.sample(student_ids, min(len(student_ids), self.rng.randint(1, 3))))
+
+                tasks = bulk.insert_tasks(tasks, teacher)
+                links = [(task.pk, user_id, task.status) for task, members in zip(tasks, targets) for user_id in members]
+                Assignment.objects.bulk_create(
+                    [Assignment(task_id=task_id, user_id=user_id) for task_id, user_id, _ in links],
+                    batch_size=self.batch_size,
+                )
+                assignments.extend(links)
+        return assignments
+
+    def create_files(self, assignments, share):
+        """Attach files to a share of the started / finished assignments, reusing a few blobs."""
+        candidates = [(task_id, user_id) for task_id, user_id, status in assignments if status != 'pending']
+        chosen = self.rng.sample(candidates, int(len(candidates) * share)) if candidates else []
+        if not chosen:
+            return 0
+        blobs = [self.make_blob(n) for n in range(20)]
+        files = [
+            TaskFile(task_id=task_id, uploaded_by_id=user_id, blob=blob, file=blob.file.name,
+                     original_name=f"submission-{task_id}-{user_id}.txt")
+            for (task_id, user_id), blob in ((pair, self.rng.choice(blobs)) for pair in chosen)
+        ]
+        TaskFile.objects.bulk_create(files, batch_size=self.batch_size)
+        return len(files)
+
+    def make_blob(self, n):
+        data = self.text(self.rng.randint(50, 2000)).encode()
+        sha256 = hashlib.sha256(data).hexdigest()
+        name = uploads.blob_name(sha256)
+        path = uploads.media_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        blob, _ = FileBlob.objects.get_or_create(sha256=sha256, defaults={'size': len(data), 'file': name})
+        return blob
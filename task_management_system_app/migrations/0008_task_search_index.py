@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS task_search "
+            "USING fts5(title, description, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO task_search (rowid, title, description) "
+            "SELECT id, title, description FROM task_management_system_app_task"
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE task_management_system_app_task "
+            "ADD FULLTEXT INDEX task_title_description_ft (title, description)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS task_search")
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            "ALTER TABLE task_management_system_app_task DROP INDEX task_title_description_ft"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_management_system_app', '0007_remove_task_assigned_to_task_assigned_to'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
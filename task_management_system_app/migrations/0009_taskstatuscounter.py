@@ -0,0 +1,44 @@
+# Generated by Django 4.2.25 on 2026-10-17 06:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_counters(apps, schema_editor):
+    Task = apps.get_model('task_management_system_app', 'Task')
+    TaskStatusCounter = apps.get_model('task_management_system_app', 'TaskStatusCounter')
+    rows = []
+    created = Task.objects.exclude(created_by=None).values('created_by_id', 'status').annotate(n=models.Count('id'))
+    for row in created.order_by():
+        rows.append(TaskStatusCounter(user_id=row['created_by_id'], scope='created', status=row['status'], count=row['n']))
+    assigned = Task.assigned_to.through.objects.values('user_id', 'task__status').annotate(n=models.Count('id'))
+    for row in assigned.order_by():
+        rows.append(TaskStatusCounter(user_id=row['user_id'], scope='assigned', status=row['task__status'], count=row['n']))
+    TaskStatusCounter.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('task_management_system_app', '0008_task_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('created', 'Created by user'), ('assigned', 'Assigned to user')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('in_progress', 'In Progress'), ('completed', 'Completed')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatuscounter',
+            constraint=models.UniqueConstraint(fields=('user', 'scope', 'status'), name='unique_task_counter'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.25 on 2026-10-17 06:06
+
+from django.db import migrations, models
+
+# The auto-created assigned_to table only has unique(task_id, user_id) and a
+# single-column user_id index. (user_id, task_id) answers "task ids of
+# student X" from the index alone before joining to task_recent_idx order.
+ASSIGNMENT_INDEX = models.Index(fields=['user', 'task'], name='task_assignee_task_idx')
+
+
+def add_assignment_index(apps, schema_editor):
+    through = apps.get_model('task_management_system_app', 'Task').assigned_to.through
+    schema_editor.add_index(through, ASSIGNMENT_INDEX)
+
+
+def remove_assignment_index(apps, schema_editor):
+    through = apps.get_model('task_management_system_app', 'Task').assigned_to.through
+    schema_editor.remove_index(through, ASSIGNMENT_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_management_system_app', '0009_taskstatuscounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', 'id'], name='task_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_by', '-created_at', 'id'], name='task_creator_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='task_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date', 'status'], name='task_due_date_idx'),
+        ),
+        migrations.RunPython(add_assignment_index, remove_assignment_index),
+    ]
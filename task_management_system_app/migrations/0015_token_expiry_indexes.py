@@ -0,0 +1,21 @@
+# Generated by Django 4.2.25 on 2026-10-17 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_management_system_app', '0014_task_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emailverification',
+            index=models.Index(fields=['is_verified', 'expires_at'], name='verification_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passwordresettoken',
+            index=models.Index(fields=['expires_at'], name='reset_token_expiry_idx'),
+        ),
+    ]
@@ -1,9 +1,28 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils import timezone
 import uuid
 from datetime import timedelta
 
+
+def assignees_prefetch():
+    """Assignee usernames for a batch of tasks in one query."""
+    return models.Prefetch('assigned_to', queryset=User.objects.only('id', 'username'))
+
+
+class TaskQuerySet(models.QuerySet):
+    # Columns rendered by the task tables; `description` is never loaded there.
+    LIST_FIELDS = ('id', 'title', 'status', 'due_date', 'created_at', 'updated_at', 'created_by__username')
+
+    def for_listing(self):
+        """Project only the listed columns (assignees are loaded per cache miss)."""
+        return self.select_related('created_by').only(*self.LIST_FIELDS)
+
+    def with_assignees(self):
+        return self.prefetch_related(assignees_prefetch())
+
+
 class Task(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -36,17 +55,251 @@ class Task(models.Model):
         User, null=True, blank=True, on_delete=models.SET_NULL, related_name='created_tasks'
     )
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        # Built around the list/dashboard queries: every listing pages on
+        # (-created_at, id), optionally narrowed by creator or status.
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='task_recent_idx'),
+            models.Index(fields=['created_by', '-created_at', 'id'], name='task_creator_recent_idx'),
+            models.Index(fields=['status', '-created_at', 'id'], name='task_status_recent_idx'),
+            models.Index(fields=['due_date', 'status'], name='task_due_date_idx'),
+            # MAX(updated_at) / COUNT(*) behind the listings' ETags
+            models.Index(fields=['updated_at'], name='task_updated_idx'),
+            models.Index(fields=['created_by', 'updated_at'], name='task_creator_updated_idx'),
+            # Completed tasks past the archive cutoff (archive.py)
+            models.Index(fields=['status', 'updated_at'], name='task_status_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so signal handlers can see what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+class TaskStatusCounter(models.Model):
+    """Number of tasks per status a teacher created / a student is assigned."""
+    CREATED = 'created'
+    ASSIGNED = 'assigned'
+    SCOPE_CHOICES = [
+        (CREATED, 'Created by user'),
+        (ASSIGNED, 'Assigned to user'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_counters')
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'status'], name='unique_task_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.scope} {self.status}: {self.count}"
+
+class InboxCounter(models.Model):
+    """Unread in-app notifications of `user`, kept in step by inbox.py."""
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='+')
+    unread = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+class TaskTombstone(models.Model):
+    """
+    A task that left someone's synced task set: deleted (one row with
+    user=None for teachers plus one per assignee) or unassigned from `user`.
+    """
+    task_id = models.BigIntegerField()
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_time_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"task {self.task_id} gone for {self.user_id or 'everyone'} at {self.deleted_at}"
+
+class FileBlob(models.Model):
+    """Uploaded bytes stored once under their SHA-256 (blobs/ab/cd/<sha256>)."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    file = models.FileField(upload_to='blobs/')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
 class TaskFile(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='files')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Points at the shared blob path for new uploads; legacy rows own their file
     file = models.FileField(upload_to='task_uploads/')
+    blob = models.ForeignKey(FileBlob, null=True, blank=True, on_delete=models.PROTECT, related_name='task_files')
+    original_name = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    @property
+    def display_name(self):
+        return self.original_name or self.file.name
+
+    def get_absolute_url(self):
+        return reverse('task_file_download', args=[self.pk])
+
     def __str__(self):
-        return f"{self.file.name} ({self.task.title})"
+        # Only use the title when the task is already loaded (no query per row)
+        task = self.task.title if TaskFile.task.is_cached(self) else f"task {self.task_id}"
+        return f"{self.display_name} ({task})"
+
+class ArchivedTask(models.Model):
+    """
+    A completed task moved out of the active table by ``archive.py``. It
+    keeps its id (and so its search index entry) and can be moved back.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    assigned_to = models.ManyToManyField(User, related_name='archived_tasks_assigned')
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    due_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    created_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name='archived_tasks_created'
+    )
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        # Same listing keys as Task, for the "include archived" listing
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='archived_recent_idx'),
+            models.Index(fields=['created_by', '-created_at', 'id'], name='archived_creator_recent_idx'),
+        ]
+
+    def get_absolute_url(self):
+        return reverse('archived_task_detail', args=[self.pk])
+
+    def __str__(self):
+        return f"{self.title} ({self.status}, archived)"
+
+class ArchivedTaskFile(models.Model):
+    """``TaskFile`` metadata of an archived task; the stored bytes are not moved."""
+    id = models.BigIntegerField(primary_key=True)
+    task = models.ForeignKey(ArchivedTask, on_delete=models.CASCADE, related_name='files')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    file = models.FileField(upload_to='task_uploads/')
+    blob = models.ForeignKey(FileBlob, null=True, blank=True, on_delete=models.PROTECT, related_name='archived_task_files')
+    original_name = models.CharField(max_length=255, blank=True)
+    uploaded_at = models.DateTimeField()
+
+    @property
+    def display_name(self):
+        return self.original_name or self.file.name
+
+    def get_absolute_url(self):
+        return reverse('archived_file_download', args=[self.pk])
+
+    def __str__(self):
+        return f"{self.display_name} (archived task {self.task_id})"
+
+class ReplicationHeartbeat(models.Model):
+    """One row, stamped on the primary every few seconds; its age on a replica is that replica's lag."""
+    beat_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"heartbeat {self.beat_at}"
+
+class TaskReminder(models.Model):
+    """A due-date reminder about `task` sent to `user` for one window; each is sent once."""
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    window = models.CharField(max_length=20)
+    sent_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'user', 'window'], name='unique_task_reminder'),
+        ]
+
+    def __str__(self):
+        return f"{self.window} reminder for task {self.task_id} to {self.user_id}"
+
+class TaskActivity(models.Model):
+    """
+    One entry of the append-only task activity log (see activity.py).
+    No foreign key constraints: entries outlive the task and the user.
+    """
+    CREATED = 'created'
+    STATUS_CHANGED = 'status_changed'
+    ASSIGNED = 'assigned'
+    UNASSIGNED = 'unassigned'
+    FILE_UPLOADED = 'file_uploaded'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (STATUS_CHANGED, 'Status changed'),
+        (ASSIGNED, 'Assigned'),
+        (UNASSIGNED, 'Unassigned'),
+        (FILE_UPLOADED, 'File uploaded'),
+        (DELETED, 'Deleted'),
+    ]
+
+    task_id = models.BigIntegerField()
+    actor = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    detail = models.JSONField(default=dict)
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Timelines are read newest first by id
+            models.Index(fields=['task_id', 'id'], name='activity_task_idx'),
+            models.Index(fields=['actor', 'id'], name='activity_actor_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("The task activity log is append-only.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("The task activity log is append-only.")
+
+    def __str__(self):
+        return f"{self.action} task {self.task_id} by {self.actor_id or 'system'} at {self.at}"
+
+class UploadSession(models.Model):
+    """A resumable chunked upload; bytes are appended to a .part file until complete."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='upload_sessions')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    task_file = models.OneToOneField(TaskFile, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.task_file_id is not None
+
+    def __str__(self):
+        return f"{self.filename} {self.received}/{self.size}"
     
 class EmailVerification(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -55,6 +308,12 @@ class EmailVerification(models.Model):
     expires_at = models.DateTimeField()
     is_verified = models.BooleanField(default=False)  # 👈 new field
 
+    class Meta:
+        indexes = [
+            # Expiry sweeper: unverified rows past their expiry
+            models.Index(fields=['is_verified', 'expires_at'], name='verification_expiry_idx'),
+        ]
+
     def is_expired(self):
         return timezone.now() > self.expires_at
 
@@ -68,6 +327,11 @@ class PasswordResetToken(models.Model):
     expires_at = models.DateTimeField()
     is_used = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='reset_token_expiry_idx'),
+        ]
+
     def is_expired(self):
         return timezone.now() > self.expires_at
 
@@ -78,4 +342,47 @@ class PasswordResetToken(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.user.username} - Reset token ({'used' if self.is_used else 'active'})"
\ No newline at end of file
+        return f"{self.user.username} - Reset token ({'used' if self.is_used else 'active'})"
+
+
+class OutboundEmail(models.Model):
+    """Email queued in the same transaction as the row that triggered it."""
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.to)} ({self.status})"
+
+
+class EmailDelivery(models.Model):
+    """One SMTP attempt for an OutboundEmail."""
+    email = models.ForeignKey(OutboundEmail, on_delete=models.CASCADE, related_name='deliveries')
+    attempted_at = models.DateTimeField(auto_now_add=True)
+    succeeded = models.BooleanField()
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.email_id} @ {self.attempted_at} ({'ok' if self.succeeded else 'failed'})"
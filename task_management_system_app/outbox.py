@@ -0,0 +1,141 @@
+"""
+Transactional email outbox.
+
+Views call ``enqueue()`` inside the transaction that creates the user or
+token row, so the email exists if and only if that row does. The
+``deliver_outbox`` Celery task sends due rows in batches over one SMTP
+connection, retries failures with exponential backoff and records every
+attempt as an ``EmailDelivery``.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailDelivery, OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(subject, body, to, html_body='', from_email=None):
+    email = OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+    transaction.on_commit(kick_worker)
+    return email
+
+
+def enqueue_many(messages, from_email=None):
+    """``enqueue()`` for many (subject, body, to, html_body) messages in one INSERT."""
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(to),
+        )
+        for subject, body, to, html_body in messages
+    ])
+    if emails:
+        transaction.on_commit(kick_worker)
+    return emails
+
+
+def kick_worker():
+    """Ask a worker to drain now; the beat schedule drains anyway if the broker is down."""
+    from .tasks import deliver_outbox
+
+    try:
+        deliver_outbox.delay()
+    except Exception as e:
+        logger.warning("Could not queue outbox delivery: %s", e)
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to `batch_size` due emails by pushing their next_attempt_at past
+    the lease window, so a concurrent worker skips them and a crashed worker's
+    emails become due again once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids))
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600))
+
+
+def record_attempt(email, error=''):
+    """Count one attempt at `email`: sent, retried after a backoff or failed for good."""
+    email.attempts += 1
+    if error:
+        if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            email.status = OutboundEmail.FAILED
+        else:
+            email.next_attempt_at = timezone.now() + backoff(email.attempts)
+        email.last_error = error
+        logger.warning("Email %s attempt %s failed: %s", email.pk, email.attempts, error)
+    else:
+        email.status = OutboundEmail.SENT
+        email.sent_at = timezone.now()
+
+    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    EmailDelivery.objects.create(email=email, succeeded=not error, error=error)
+    return not error
+
+
+def deliver(email, connection):
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.to, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    try:
+        message.send()
+    except Exception as e:
+        return record_attempt(email, str(e))
+    return record_attempt(email)
+
+
+def drain(batch_size=None):
+    """Send every due email, one batch (and one SMTP connection) at a time."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    sent = failed = 0
+    while True:
+        batch = claim_batch(batch_size)
+        if not batch:
+            return sent, failed
+        try:
+            connection = get_connection()
+            connection.open()
+        except Exception as e:
+            # Count the attempt for the claimed batch and leave the rest
+            # due for the next run instead of failing them all now
+            error = f"Could not connect to the mail server: {e}"
+            for email in batch:
+                record_attempt(email, error)
+            return sent, failed + len(batch)
+        try:
+            for email in batch:
+                if deliver(email, connection):
+                    sent += 1
+                else:
+                    failed += 1
+        finally:
+            connection.close()
@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import date, datetime
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.http import urlencode
+
+# Newest first; `id` breaks ties between rows created in the same instant.
+DEFAULT_ORDERING = ('-created_at', 'id')
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset."""
+
+    def __init__(self, object_list, next_cursor, params):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.params = params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def next_querystring(self):
+        """Current filters plus the cursor of the next page."""
+        if not self.has_next:
+            return ''
+        params = {k: v for k, v in self.params.items() if k != 'cursor' and v}
+        params['cursor'] = self.next_cursor
+        return urlencode(params)
+
+
+def _json_default(value):
+    # isoformat() keeps microseconds; DjangoJSONEncoder would round them to
+    # milliseconds and skip rows created within the same millisecond.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), default=_json_default).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Return the list of key values, or None for a missing / tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _after(ordering, values):
+    """WHERE clause selecting the rows that sort strictly after `values`."""
+    condition = Q()
+    for i, key in enumerate(ordering):
+        name = key.lstrip('-')
+        step = Q(**{f"{name}__{'lt' if key.startswith('-') else 'gt'}": values[i]})
+        for prev_key, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_key.lstrip('-'): prev_value})
+        condition |= step
+    return condition
+
+
+def keyset_paginate(queryset, cursor, page_size, params=None, ordering=DEFAULT_ORDERING):
+    """
+    Slice `queryset` on `ordering` starting after `cursor`.
+
+    No COUNT(*) and no OFFSET: every page is a single range scan of
+    `page_size + 1` rows, so latency does not depend on the table size.
+    """
+    queryset = _page_queryset(queryset, cursor, page_size, ordering)
+    return _page(list(queryset), page_size, params, ordering)
+
+
+async def akeyset_paginate(queryset, cursor, page_size, params=None, ordering=DEFAULT_ORDERING):
+    """``keyset_paginate`` for async views."""
+    queryset = _page_queryset(queryset, cursor, page_size, ordering)
+    return _page([row async for row in queryset], page_size, params, ordering)
+
+
+async def akeyset_paginate_merged(querysets, cursor, page_size, params=None, ordering=DEFAULT_ORDERING):
+    """
+    One keyset page over several querysets sharing the key columns (the
+    task and archive tables). Each is read as a page of its own from the
+    same cursor and the rows are merged, so a page costs one range scan per
+    queryset. The keys must be unique across all of them.
+    """
+    rows = []
+    for queryset in querysets:
+        rows += [row async for row in _page_queryset(queryset, cursor, page_size, ordering)]
+    # Stable sorts, least significant key first
+    for key in reversed(ordering):
+        rows.sort(key=attrgetter(key.lstrip('-')), reverse=key.startswith('-'))
+    return _page(rows, page_size, params, ordering)
+
+
+def _page_queryset(queryset, cursor, page_size, ordering):
+    queryset = queryset.order_by(*ordering)
+    position = decode_cursor(cursor, len(ordering))
+    if position:
+        try:
+            queryset = queryset.filter(_after(ordering, position))
+        except (ValidationError, ValueError, TypeError):
+            # A cursor whose values do not fit the key columns starts over.
+            pass
+    return queryset[:page_size + 1]
+
+
+def _page(rows, page_size, params, ordering):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, key.lstrip('-')) for key in ordering)
+    return KeysetPage(rows, next_cursor, params or {})
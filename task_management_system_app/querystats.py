@@ -0,0 +1,115 @@
+"""
+Per-request database statistics.
+
+``QueryStatsMiddleware`` counts the queries a view runs, their total time
+and the statements that ran more than once (same SQL with different or
+equal parameters, the usual N+1 signature). The numbers go to the
+``task_management_system_app.queries`` logger and, when
+``settings.QUERY_STATS_HEADERS`` is on, into ``X-DB-Queries``,
+``X-DB-Duplicates`` and a ``Server-Timing: db`` header for the browser's
+network panel. ``QueryStats`` is also what the query-budget tests use.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('task_management_system_app.queries')
+
+# "IN (%s, %s, %s)" and "IN (%s)" are the same statement
+IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+# Transaction control repeats by design (one per atomic block)
+TRANSACTION_RE = re.compile(r'(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE SAVEPOINT)\b', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    sql = IN_LIST_RE.sub('(%s)', sql)
+    return NUMBER_RE.sub('N', ' '.join(sql.split()))
+
+
+class QueryStats:
+    """Context manager recording every query on every database alias."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """{fingerprint: times run} for statements that ran more than once."""
+        return {
+            sql: n for sql, n in self.fingerprints.items()
+            if n > 1 and not TRANSACTION_RE.match(sql)
+        }
+
+    def summary(self):
+        return f"{self.count} queries in {self.duration * 1000:.1f} ms, {len(self.duplicates)} duplicated"
+
+
+class QueryStatsMiddleware:
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryStats() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        # Connections belong to the request's sync thread (where the async
+        # ORM runs its queries), so the wrappers are installed there.
+        stats = QueryStats()
+        await sync_to_async(stats.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stats.__exit__)(None, None, None)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        if stats.duplicates:
+            worst, times = max(stats.duplicates.items(), key=lambda item: item[1])
+            logger.warning("%s: %s; worst ran %d times: %s", view, stats.summary(), times, worst[:300])
+        else:
+            logger.info("%s: %s", view, stats.summary())
+
+        if settings.QUERY_STATS_HEADERS:
+            response['X-DB-Queries'] = str(stats.count)
+            response['X-DB-Duplicates'] = str(sum(stats.duplicates.values()))
+            response['Server-Timing'] = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+        return response
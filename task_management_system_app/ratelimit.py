@@ -0,0 +1,143 @@
+"""
+Rate limiting for the login, register and forgot-password forms.
+
+Each scope in ``settings.RATE_LIMITS`` maps a key kind (``ip``, ``username``,
+``email``) to ``(limit, period in seconds)``. Attempts are counted in a
+sliding window: the current fixed window's counter plus the previous
+window's, weighted by how much of it still overlaps. That behaves like a
+token bucket holding ``limit`` tokens refilled over ``period``, but every
+update is a single atomic ``cache.incr`` so concurrent workers cannot
+overspend it.
+
+Counters live in ``caches[settings.RATE_LIMIT_CACHE]`` (shared Redis /
+Memcached in production); when that alias is not configured an in-process
+LocMemCache is used, which is what tests get. The check runs before the
+form is validated, so rejected requests never reach PBKDF2 or the outbox.
+
+Allowed / blocked totals per scope are kept in the same cache; see
+``stats()`` and the ``ratelimit_stats`` command.
+"""
+import hashlib
+import logging
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('allowed', 'blocked')
+_fallback = LocMemCache('rate-limits', {})
+
+
+def get_cache():
+    alias = getattr(settings, 'RATE_LIMIT_CACHE', None)
+    return caches[alias] if alias in settings.CACHES else _fallback
+
+
+def client_ip(request):
+    header = getattr(settings, 'RATE_LIMIT_IP_HEADER', None)
+    if header and request.META.get(header):
+        # Each proxy appends the address it was connected from, so the client
+        # is the entry our own proxies added: the Nth from the right. Entries
+        # further left come from the client and can be anything.
+        addresses = [a.strip() for a in request.META[header].split(',')]
+        trusted = max(getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 1), 1)
+        return addresses[-min(trusted, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _incr(cache, key, timeout):
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def hit(scope, values, now=None):
+    """
+    Count one attempt for each configured key of `scope` ({kind: value}).
+    Returns 0 when allowed, otherwise the seconds until a retry can succeed.
+    """
+    rules = settings.RATE_LIMITS.get(scope, {})
+    cache = get_cache()
+    now = time.time() if now is None else now
+    wait = 0
+    for kind, (limit, period) in rules.items():
+        value = values.get(kind)
+        if not value:
+            continue
+        digest = hashlib.md5(str(value).lower().encode(), usedforsecurity=False).hexdigest()
+        window, offset = divmod(now, period)
+        prefix = f"rl:{scope}:{kind}:{digest}"
+        current = _incr(cache, f"{prefix}:{int(window)}", period * 2)
+        previous = cache.get(f"{prefix}:{int(window) - 1}", 0)
+        if previous * (1 - offset / period) + current > limit:
+            wait = max(wait, math.ceil(period - offset))
+    _count(cache, scope, 'blocked' if wait else 'allowed')
+    return wait
+
+
+def _count(cache, scope, outcome):
+    _incr(cache, f"rl-stats:{scope}:{outcome}", None)
+
+
+def stats():
+    """{scope: {'allowed': n, 'blocked': n}} since the cache was last cleared."""
+    cache = get_cache()
+    keys = [f"rl-stats:{scope}:{outcome}" for scope in settings.RATE_LIMITS for outcome in OUTCOMES]
+    counts = cache.get_many(keys)
+    return {
+        scope: {outcome: counts.get(f"rl-stats:{scope}:{outcome}", 0) for outcome in OUTCOMES}
+        for scope in settings.RATE_LIMITS
+    }
+
+
+def check(request, scope, fields):
+    """Count this POST; returns (key values, seconds to wait or 0)."""
+    values = {'ip': client_ip(request)}
+    values.update({kind: request.POST.get(field, '').strip() for kind, field in fields.items()})
+    return values, hit(scope, values)
+
+
+def rejected(request, scope, values, wait):
+    logger.warning("Rate limit hit for %s from %s", scope, values['ip'])
+    response = render(request, 'rate_limited.html', {'retry_after': wait}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+def rate_limited(scope, **fields):
+    """
+    Limit POSTs to a view by client IP plus the named form fields,
+    e.g. ``@rate_limited('login', username='username')``. Works on sync
+    and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                if request.method == 'POST':
+                    # The cache client is sync
+                    values, wait = await sync_to_async(check)(request, scope, fields)
+                    if wait:
+                        return await sync_to_async(rejected)(request, scope, values, wait)
+                return await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                if request.method == 'POST':
+                    values, wait = check(request, scope, fields)
+                    if wait:
+                        return rejected(request, scope, values, wait)
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
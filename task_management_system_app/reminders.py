@@ -0,0 +1,158 @@
+"""
+Due-date reminders.
+
+A task is due at the end of its ``due_date`` (local time). Every run of the
+``send_due_reminders`` Celery task looks at each window in
+``settings.REMINDER_WINDOWS`` ({name: hours before the deadline}) plus an
+``overdue`` window for tasks up to ``REMINDER_OVERDUE_DAYS`` late. A window
+is a ``due_date`` range, so it is one range scan on ``task_due_date_idx``
+(joined to the assignment rows by task id) whatever the table size.
+
+Each student gets one email per window, listing all their open tasks in
+it. ``TaskReminder`` records every (task, student, window) that was sent,
+so later runs, overlapping runs and restarted workers never send one twice.
+The log rows and the emails (``outbox.py``) are written in the same
+transaction, ``REMINDER_BATCH_SIZE`` students at a time. Windows are
+handled narrowest first and a task is only reminded of in the narrowest
+window it is in: a task due in an hour is not also announced as "due in
+two days".
+"""
+import logging
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from . import outbox
+from .models import Task, TaskReminder
+
+logger = logging.getLogger(__name__)
+
+OVERDUE = 'overdue'
+OPEN_STATUSES = ('pending', 'in_progress')
+
+Window = namedtuple('Window', 'name first last')
+# `due` is the formatted due date (a window holds only a few distinct dates)
+ReminderItem = namedtuple('ReminderItem', 'task_id title due')
+
+
+def windows(now):
+    """The windows to scan, narrowest first, as inclusive due_date ranges."""
+    today = timezone.localdate(now)
+    found = []
+    for name, hours in sorted(settings.REMINDER_WINDOWS.items(), key=lambda item: item[1]):
+        # Due by the end of `last`: the deadline (midnight after it) falls within `hours`
+        last = timezone.localdate(now + timedelta(hours=hours)) - timedelta(days=1)
+        if last >= today:
+            found.append(Window(name, today, last))
+    if settings.REMINDER_OVERDUE_DAYS:
+        found.append(Window(OVERDUE, today - timedelta(days=settings.REMINDER_OVERDUE_DAYS), today - timedelta(days=1)))
+    return found
+
+
+def due_assignments(window):
+    """(user id, task id, title, due date) of open tasks due in `window`, grouped by user."""
+    return (
+        Task.assigned_to.through.objects
+        .filter(task__due_date__range=(window.first, window.last), task__status__in=OPEN_STATUSES)
+        .order_by('user_id', 'task__due_date', 'task_id')
+        .values_list('user_id', 'task_id', 'task__title', 'task__due_date')
+    )
+
+
+def send_window(window, covered, batch_size):
+    """
+    Queue one reminder per student for `window`, skipping tasks already
+    reminded of in it or in one of the `covered` (narrower) windows.
+    Returns the number of emails queued.
+    """
+    queued = 0
+    pending = defaultdict(list)
+    dates = {}
+    for user_id, task_id, title, due_date in due_assignments(window).iterator(chunk_size=2000):
+        if user_id not in pending and len(pending) >= batch_size:
+            queued += send_batch(window, covered, pending)
+            pending = defaultdict(list)
+        if due_date not in dates:
+            dates[due_date] = date_format(due_date)
+        pending[user_id].append(ReminderItem(task_id, title, dates[due_date]))
+    if pending:
+        queued += send_batch(window, covered, pending)
+    return queued
+
+
+def send_batch(window, covered, items):
+    """Log and queue reminders for {user id: [ReminderItem]} in one transaction."""
+    task_ids = {item.task_id for user_items in items.values() for item in user_items}
+    try:
+        with transaction.atomic():
+            sent = set(
+                TaskReminder.objects.filter(
+                    user_id__in=items.keys(), task_id__in=task_ids, window__in=[window.name, *covered]
+                ).values_list('user_id', 'task_id')
+            )
+            students = User.objects.filter(pk__in=items.keys(), is_active=True).exclude(email='').only('id', 'username', 'email')
+            log, messages = [], []
+            for student in students:
+                due = [item for item in items[student.pk] if (student.pk, item.task_id) not in sent]
+                if not due:
+                    continue
+                log += [(item.task_id, student.pk) for item in due]
+                messages.append(reminder_message(student, window, due))
+            # A concurrent run that got here first makes this fail on the unique constraint
+            if log:
+                log_sent(log, window.name)
+            outbox.enqueue_many(messages)
+    except IntegrityError:
+        logger.warning("Reminders for %s students (%s) were sent by another run", len(items), window.name)
+        return 0
+    return len(messages)
+
+
+def log_sent(rows, window):
+    """Insert (task id, user id) rows into the sent-log (executemany: bulk_create costs more than the INSERT)."""
+    qn = connection.ops.quote_name
+    sent_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {qn(TaskReminder._meta.db_table)} ({qn('task_id')}, {qn('user_id')}, {qn('window')}, {qn('sent_at')}) "
+            f"VALUES (%s, %s, %s, %s)",
+            [(task_id, user_id, window, sent_at) for task_id, user_id in rows],
+        )
+
+
+def reminder_message(student, window, items):
+    limit = settings.REMINDER_MAX_ITEMS
+    overdue = window.name == OVERDUE
+    shown, truncated = items[:limit], max(0, len(items) - limit)
+    html = render_to_string('emails/task_reminder.html', {
+        'student': student,
+        'window': window.name,
+        'overdue': overdue,
+        'tasks': shown,
+        'truncated': truncated,
+    })
+    # The plain-text part is built directly; strip_tags() over every email costs more than the render
+    heading = "These tasks are past their due date:" if overdue else f"These tasks are due within {window.name}:"
+    lines = [f"Hello {student.username},", "", heading, *(f"- {item.title} (due {item.due})" for item in shown)]
+    if truncated:
+        lines.append(f"...and {truncated} more. Open your task list to see everything.")
+    subject = f"{len(items)} overdue task(s)" if overdue else f"{len(items)} task(s) due within {window.name}"
+    return subject, '\n'.join(lines) + '\n', [student.email], html
+
+
+def send_due_reminders(now=None, batch_size=None):
+    """Run every window; returns {window: emails queued}."""
+    now = now or timezone.now()
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    report = {}
+    covered = []
+    for window in windows(now):
+        report[window.name] = send_window(window, covered if window.name != OVERDUE else [], batch_size)
+        covered.append(window.name)
+    return report
@@ -0,0 +1,188 @@
+"""
+Read replicas for the heavy read-only views.
+
+Views wrapped in ``replica_reads`` (the task list and search, the dashboard,
+the export, the API's list and detail) read from one of the aliases in
+``settings.DATABASE_REPLICAS``. Those views only read; all other views and
+every write use ``default``. Rows loaded from a replica keep using it for
+their related lookups (Django routes those by the instance's database).
+
+* Read-your-writes: ``ReplicaPinMiddleware`` pins a session to the primary
+  for ``REPLICA_PIN_SECONDS`` after any successful POST / PUT / PATCH /
+  DELETE (``task_create``, ``task_update``, ``task_delete``, uploads, ...).
+  The user never sees the listing from before their own change.
+* Lag: Celery beat stamps the single ``ReplicationHeartbeat`` row on the
+  primary every ``REPLICA_HEARTBEAT_SECONDS``. Each process compares the
+  stamp on the primary with the one on a replica (at most every
+  ``REPLICA_LAG_CHECK_SECONDS``). A replica that is further behind than
+  ``REPLICA_MAX_LAG_SECONDS``, unreachable, or has no heartbeat yet is not
+  used until it catches up; with none left, reads go to the primary.
+  ``manage.py replica_lag`` prints the current figures.
+
+With ``DATABASE_REPLICAS`` empty (the default) everything reads from
+``default`` as before. Two SQLite files work as primary and replica for
+local testing; "replication" is then copying the primary's file over the
+replica's.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.utils import timezone
+
+from .models import ReplicationHeartbeat
+
+logger = logging.getLogger(__name__)
+
+# Session key: time.time() until which this session reads from the primary
+PIN_KEY = '_primary_until'
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# The alias reads go to in the current view, None outside replica_reads
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+# {alias: (lag in seconds or None if unusable, time.monotonic() when measured)}
+_lag = {}
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if 'instance' in hints:
+            # Related lookups stay on the database the instance came from
+            return None
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+# 💓 Lag tracking
+
+def beat():
+    """Stamp the heartbeat row on the primary (run by Celery beat)."""
+    now = timezone.now()
+    if not ReplicationHeartbeat.objects.filter(pk=1).update(beat_at=now):
+        ReplicationHeartbeat.objects.create(pk=1, beat_at=now)
+    return now
+
+
+def measure_lag(alias):
+    """Seconds `alias` is behind the primary, or None when that cannot be trusted."""
+    heartbeat = ReplicationHeartbeat.objects.filter(pk=1).values_list('beat_at', flat=True)
+    primary = heartbeat.using(DEFAULT_DB_ALIAS).first()
+    if primary is None or primary < timezone.now() - timedelta(seconds=settings.REPLICA_MAX_LAG_SECONDS):
+        # No heartbeat, or it stopped: the replica's position is unknown
+        return None
+    try:
+        replica = heartbeat.using(alias).first()
+    except DatabaseError:
+        logger.warning("Replica %s is unreachable", alias, exc_info=True)
+        return None
+    if replica is None:
+        return None
+    return max(0.0, (primary - replica).total_seconds())
+
+
+def record_lag(alias, lag):
+    _lag[alias] = (lag, time.monotonic())
+
+
+def replica_lag(alias):
+    """The last measured lag of `alias`, measured again when it is older than REPLICA_LAG_CHECK_SECONDS."""
+    lag, measured_at = _lag.get(alias, (None, None))
+    if measured_at is None or time.monotonic() - measured_at > settings.REPLICA_LAG_CHECK_SECONDS:
+        lag = measure_lag(alias)
+        record_lag(alias, lag)
+        if lag is None or lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Replica %s skipped: lag %s", alias, 'unknown' if lag is None else f"{lag:.1f}s")
+    return lag
+
+
+def healthy_replicas():
+    return [
+        alias for alias in settings.DATABASE_REPLICAS
+        if (lag := replica_lag(alias)) is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+    ]
+
+
+# 📌 Choosing the database per request
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PIN_KEY, 0) > time.time()
+
+
+def read_alias(request):
+    """Where this request's view reads from."""
+    if not settings.DATABASE_REPLICAS or is_pinned(request):
+        return DEFAULT_DB_ALIAS
+    replicas = healthy_replicas()
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+def replica_reads(view):
+    """Run a read-only view against a replica (sync and async views)."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # The lag check may query; keep it off the event loop
+            alias = await sync_to_async(read_alias)(request) if settings.DATABASE_REPLICAS else DEFAULT_DB_ALIAS
+            token = _read_alias.set(alias)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _read_alias.set(read_alias(request))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaPinMiddleware:
+    """Pin a session to the primary after it wrote something (after RoleMiddleware)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.pin(request, response)
+        return response
+
+    def pin(self, request, response):
+        # The session is already loaded (RoleMiddleware read request.user), so this is no query
+        if request.method in UNSAFE_METHODS and response.status_code < 400 and hasattr(request, 'session'):
+            if request.user.is_authenticated and settings.DATABASE_REPLICAS:
+                request.session[PIN_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
@@ -0,0 +1,100 @@
+"""
+Role lookup for Teacher / Student users.
+
+Group ids and each user's role are kept in the ``ROLE_CACHE`` cache, which
+every worker shares: a Group change drops the ids and a ``User.groups``
+change drops the user's role for all processes at once, so the next
+request sees the new role. A request costs at most one small query and
+usually none. ``RoleMiddleware`` stores the result on ``request.user.role``
+for views and templates.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+TEACHER = 'teacher'
+STUDENT = 'student'
+# When a user is in both groups the first match wins
+ROLE_ORDER = (TEACHER, STUDENT)
+
+GROUP_IDS_KEY = 'role-group-ids'
+
+# Used when ROLE_CACHE is not configured (single-process setups)
+_fallback = LocMemCache('roles', {})
+
+
+def get_cache():
+    alias = getattr(settings, 'ROLE_CACHE', None)
+    return caches[alias] if alias in settings.CACHES else _fallback
+
+
+def get_group_ids():
+    """{role: group id}, kept until a Group changes."""
+    group_ids = get_cache().get(GROUP_IDS_KEY)
+    if group_ids is None:
+        group_ids = {name.lower(): pk for pk, name in Group.objects.values_list('id', 'name')}
+        get_cache().set(GROUP_IDS_KEY, group_ids, None)
+    return group_ids
+
+
+def get_group_id(role):
+    return get_group_ids().get(role)
+
+
+def users_with_role(role):
+    """Users in the role's group (none at all if the group does not exist)."""
+    group_id = get_group_id(role)
+    if not group_id:
+        return User.objects.none()
+    return User.objects.filter(groups=group_id)
+
+
+def role_cache_key(user_id):
+    return f"user-role:{user_id}"
+
+
+def get_role(user):
+    """'teacher', 'student' or None for users outside both groups."""
+    if not user.is_authenticated:
+        return None
+    key = role_cache_key(user.pk)
+    role = get_cache().get(key)
+    if role is None:
+        member_of = set(user.groups.values_list('id', flat=True))
+        group_ids = get_group_ids()
+        role = next((r for r in ROLE_ORDER if group_ids.get(r) in member_of), '')
+        get_cache().set(key, role, settings.ROLE_CACHE_TIMEOUT)
+    return role or None
+
+
+class RoleMiddleware:
+    """Resolve the user's role once per request (after AuthenticationMiddleware)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.user.role = get_role(request.user)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Loading request.user (session + user row) is sync-only too
+        request.user.role = await sync_to_async(get_role)(request.user)
+        return await self.get_response(request)
+
+
+def reset_group_ids():
+    get_cache().delete(GROUP_IDS_KEY)
+
+
+def forget_roles(user_ids):
+    get_cache().delete_many([role_cache_key(pk) for pk in user_ids])
@@ -0,0 +1,166 @@
+"""
+Pluggable full-text search for tasks.
+
+The backend is chosen by ``settings.TASK_SEARCH_BACKEND`` (a dotted path) or,
+when unset, from the database vendor: MySQL FULLTEXT in production, SQLite
+FTS5 locally and in tests, and the old ``icontains`` scan anywhere else.
+Every backend returns the queryset annotated with ``search_rank`` plus the
+keyset ordering that puts the best matches first. Querysets over
+``ArchivedTask`` are searched the same way (see ``archive.py``).
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import ArchivedTask, Task
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Split user input into plain words; operators are never passed through."""
+    return WORD_RE.findall(query.lower())
+
+
+def no_matches(queryset):
+    # Still annotated: callers order by search_rank
+    return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class IcontainsSearchBackend:
+    """Leading-wildcard LIKE on title/description (full table scan, unranked)."""
+
+    ordering = ('-created_at', 'id')
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in search_terms(query) or [query]:
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition)
+
+    def index(self, task):
+        pass
+
+    def index_many(self, tasks):
+        pass
+
+    def remove(self, task_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTS5SearchBackend:
+    """
+    FTS5 shadow table keyed by task id, with the porter stemmer.
+
+    The table is created by migration 0008 and kept current by the
+    post_save / post_delete handlers in ``signals.py``. Archiving keeps the
+    task id, so one table serves the active and the archived tasks.
+    """
+
+    table = 'task_search'
+    # bm25() is lower-is-better
+    ordering = ('search_rank', 'id')
+
+    def match_expression(self, query):
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return no_matches(queryset)
+        # Join on rowid so SQLite drives the query from the FTS index
+        # instead of probing it once per task row.
+        return queryset.extra(
+            tables=[self.table],
+            where=[f"{self.table}.rowid = {queryset.model._meta.db_table}.id", f"{self.table} MATCH %s"],
+            params=[expression],
+        ).annotate(search_rank=RawSQL(f"{self.table}.rank", [], output_field=FloatField()))
+
+    def index(self, task):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [task.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)",
+                [task.pk, task.title, task.description],
+            )
+
+    def index_many(self, tasks):
+        """Index freshly bulk-created tasks (bulk_create sends no post_save)."""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)",
+                [(task.pk, task.title, task.description) for task in tasks],
+            )
+
+    def remove(self, task_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [task_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, description) "
+                f"SELECT id, title, description FROM {Task._meta.db_table} "
+                f"UNION ALL SELECT id, title, description FROM {ArchivedTask._meta.db_table}"
+            )
+
+
+class MySQLFullTextSearchBackend:
+    """
+    InnoDB FULLTEXT index on (title, description), queried in boolean mode.
+    The archive table has its own (migration 0016).
+
+    InnoDB maintains the index itself, so index()/remove() are no-ops.
+    MySQL has no stemmer; every term is matched as a prefix (``term*``),
+    which covers plural and -ing forms of the same stem.
+    """
+
+    ordering = ('-search_rank', 'id')
+
+    def match_expression(self, query):
+        return ' '.join(f'+{term}*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return no_matches(queryset)
+        match = "MATCH (title, description) AGAINST (%s IN BOOLEAN MODE)"
+        return queryset.annotate(
+            search_rank=RawSQL(match, [expression], output_field=FloatField())
+        ).filter(search_rank__gt=0)
+
+    def index(self, task):
+        pass
+
+    def index_many(self, tasks):
+        pass
+
+    def remove(self, task_id):
+        pass
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"OPTIMIZE TABLE {Task._meta.db_table}, {ArchivedTask._meta.db_table}")
+
+
+VENDOR_BACKENDS = {
+    'mysql': MySQLFullTextSearchBackend,
+    'sqlite': SQLiteFTS5SearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    path = getattr(settings, 'TASK_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, IcontainsSearchBackend)()
@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+from .models import Task
+
+
+class SparseFieldsMixin:
+    """Keep only the fields named in ``context['fields']`` (all when it is None)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested is not None:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.CharField(source='created_by.username', read_only=True, default=None)
+    assigned_to = serializers.SlugRelatedField(slug_field='username', many=True, read_only=True)
+
+    # Database columns each API field needs; `assigned_to` is prefetched instead
+    COLUMNS = {
+        'id': ('id',),
+        'title': ('title',),
+        'description': ('description',),
+        'status': ('status',),
+        'due_date': ('due_date',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+        'created_by': ('created_by__username',),
+        'assigned_to': (),
+    }
+
+    class Meta:
+        model = Task
+        fields = [
+            'id', 'title', 'description', 'status', 'due_date',
+            'created_at', 'updated_at', 'created_by', 'assigned_to',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,209 @@
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+from django.core.signals import request_finished
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import activity, counters, events, roles
+from .models import Task, TaskActivity, TaskFile, TaskTombstone
+from .search import get_search_backend
+
+
+# 🔎 Keep the full-text index in step with the task table
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, **kwargs):
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Task)
+def unindex_task(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+# 👥 Drop cached roles when group membership changes
+@receiver([post_save, post_delete], sender=Group)
+def reset_group_ids(sender, **kwargs):
+    roles.reset_group_ids()
+
+
+@receiver(pre_delete, sender=Group)
+def forget_member_roles(sender, instance, **kwargs):
+    # Deleting a group removes its memberships without m2m_changed
+    roles.forget_roles(User.objects.filter(groups=instance).values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        roles.forget_roles(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        roles.forget_roles([instance.pk])
+    elif action == 'pre_clear' and reverse:
+        # group.user_set.clear(): collect the members before they are gone
+        roles.forget_roles(User.objects.filter(groups=instance).values_list('id', flat=True))
+
+
+# 📊 Keep per-user status counters in step with tasks and assignments
+@receiver(pre_save, sender=Task)
+def load_previous_task_values(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if instance._state.adding or {'status', 'created_by_id'} <= loaded.keys():
+        return
+    instance._loaded_values = {
+        **loaded,
+        **Task.objects.filter(pk=instance.pk).values('status', 'created_by_id').first(),
+    }
+
+
+@receiver(post_save, sender=Task)
+def count_saved_task(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    counters.task_saved(instance, created, loaded.get('status'), loaded.get('created_by_id'))
+    instance._loaded_values = {**loaded, 'status': instance.status, 'created_by_id': instance.created_by_id}
+
+
+@receiver(pre_delete, sender=Task)
+def uncount_deleted_task(sender, instance, **kwargs):
+    counters.task_deleted(instance)
+
+
+def _linked_ids(through, instance, reverse, pk_set=None):
+    """Ids on the other side of the assignment rows that exist for `instance`."""
+    own, other = ('user_id', 'task_id') if reverse else ('task_id', 'user_id')
+    rows = through.objects.filter(**{own: instance.pk})
+    if pk_set is not None:
+        rows = rows.filter(**{f'{other}__in': pk_set})
+    return set(rows.values_list(other, flat=True))
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def count_assignments(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        sign, ids = 1, pk_set
+    elif action == 'pre_remove':
+        # remove() reports every requested id; only count rows that exist
+        sign, ids = -1, _linked_ids(sender, instance, reverse, pk_set)
+    elif action == 'pre_clear':
+        sign, ids = -1, _linked_ids(sender, instance, reverse)
+    else:
+        return
+    if reverse:
+        counters.assignments_changed(sign, task_ids=ids, user_id=instance.pk)
+    else:
+        counters.assignments_changed(sign, task=instance, user_ids=ids)
+
+
+# 🧩 Assignment changes do not save the task; bump updated_at so cached
+# rows (and anything else keyed on it) see a new version
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def touch_reassigned_tasks(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        tasks = Task.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear':
+        tasks = Task.objects.filter(assigned_to=instance)
+    else:
+        tasks = Task.objects.filter(pk__in=pk_set)
+    tasks.update(updated_at=timezone.now())
+
+
+# 🪦 Tombstones let API clients doing delta sync drop tasks they can no longer see
+@receiver(pre_delete, sender=Task)
+def bury_deleted_task(sender, instance, **kwargs):
+    assignees = Task.assigned_to.through.objects.filter(task_id=instance.pk).values_list('user_id', flat=True)
+    TaskTombstone.objects.bulk_create(
+        [TaskTombstone(task_id=instance.pk)]
+        + [TaskTombstone(task_id=instance.pk, user_id=user_id) for user_id in assignees]
+    )
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def bury_unassigned_task(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_remove':
+        ids = _linked_ids(sender, instance, reverse, pk_set)
+    elif action == 'pre_clear':
+        ids = _linked_ids(sender, instance, reverse)
+    else:
+        return
+    pairs = [(pk, instance.pk) for pk in ids] if reverse else [(instance.pk, pk) for pk in ids]
+    TaskTombstone.objects.bulk_create([TaskTombstone(task_id=task_id, user_id=user_id) for task_id, user_id in pairs])
+
+
+# 📡 Live updates for open task lists (sent after commit, see events.py)
+@receiver(post_save, sender=Task)
+def push_saved_task(sender, instance, created, **kwargs):
+    events.task_changed(instance.pk, created=created)
+
+
+@receiver(pre_delete, sender=Task)
+def push_deleted_task(sender, instance, **kwargs):
+    events.task_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def push_reassigned_task(sender, instance, action, reverse, pk_set, **kwargs):
+    if not events.get_broker().has_listeners():
+        return
+    if action == 'post_add':
+        key, ids = 'added', pk_set
+    elif action == 'pre_remove':
+        key, ids = 'removed', _linked_ids(sender, instance, reverse, pk_set)
+    elif action == 'pre_clear':
+        key, ids = 'removed', _linked_ids(sender, instance, reverse)
+    else:
+        return
+    if reverse:
+        # `instance` is the student; `ids` are tasks
+        for task_id in ids:
+            events.task_changed(task_id, **{key: [instance.pk]})
+    else:
+        events.task_changed(instance.pk, **{key: ids})
+
+
+# 📜 Activity log (written in batches once the request is over, see activity.py)
+@receiver(pre_save, sender=Task)
+def remember_previous_status(sender, instance, **kwargs):
+    # Runs after load_previous_task_values; count_saved_task overwrites it after the save
+    instance._status_before_save = getattr(instance, '_loaded_values', {}).get('status')
+
+
+@receiver(post_save, sender=Task)
+def log_saved_task(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance.pk, TaskActivity.CREATED, title=instance.title, status=instance.status)
+    elif instance._status_before_save != instance.status:
+        activity.record(instance.pk, TaskActivity.STATUS_CHANGED, old=instance._status_before_save, new=instance.status)
+
+
+@receiver(pre_delete, sender=Task)
+def log_deleted_task(sender, instance, **kwargs):
+    activity.record(instance.pk, TaskActivity.DELETED, title=instance.title)
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def log_reassigned_task(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        kind, ids = TaskActivity.ASSIGNED, pk_set
+    elif action == 'pre_remove':
+        kind, ids = TaskActivity.UNASSIGNED, _linked_ids(sender, instance, reverse, pk_set)
+    elif action == 'pre_clear':
+        kind, ids = TaskActivity.UNASSIGNED, _linked_ids(sender, instance, reverse)
+    else:
+        return
+    if reverse:
+        # `instance` is the student; `ids` are tasks
+        activity.record_many([activity.entry(task_id, kind, students=[instance.pk]) for task_id in sorted(ids)])
+    elif ids:
+        activity.record(instance.pk, kind, students=sorted(ids))
+
+
+@receiver(post_save, sender=TaskFile)
+def log_uploaded_file(sender, instance, created, **kwargs):
+    if created:
+        activity.record(instance.task_id, TaskActivity.FILE_UPLOADED, file=instance.pk, name=instance.display_name)
+
+
+@receiver(request_finished)
+def flush_activity(sender, **kwargs):
+    activity.flush()
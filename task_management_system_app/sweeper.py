@@ -0,0 +1,81 @@
+"""
+Removal of expired verification / password-reset tokens.
+
+Rows are selected by primary key a batch at a time (range scans on the
+``expires_at`` indexes) and each batch is deleted in its own short
+transaction, so the auth tables are never locked for the whole sweep.
+
+* ``PasswordResetToken`` – expired or already used.
+* ``EmailVerification`` – never verified and expired for longer than
+  ``UNVERIFIED_USER_GRACE_SECONDS``. The inactive, never-logged-in user who
+  registered with it is deleted too (which frees the username and email);
+  verified rows are kept because ``login_view`` requires them.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailVerification, PasswordResetToken
+
+
+def delete_in_batches(queryset, batch_size, pause=0):
+    """Delete what `queryset` matches, `batch_size` primary keys per transaction."""
+    model = queryset.model
+    removed = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        with transaction.atomic():
+            # Re-apply the conditions: a row may have changed since it was selected
+            _, per_model = queryset.filter(pk__in=ids).delete()
+        removed += per_model.get(model._meta.label, 0)
+        if len(ids) < batch_size:
+            return removed
+        if pause:
+            time.sleep(pause)
+
+
+def sweep_reset_tokens(now, batch_size, pause=0):
+    expired = delete_in_batches(
+        PasswordResetToken.objects.filter(expires_at__lt=now).order_by('expires_at'), batch_size, pause
+    )
+    # Used tokens that would otherwise live until they expire
+    used = delete_in_batches(
+        PasswordResetToken.objects.filter(expires_at__gte=now, is_used=True).order_by('expires_at'),
+        batch_size, pause,
+    )
+    return expired + used
+
+
+def sweep_unverified(now, batch_size, pause=0):
+    """Delete abandoned registrations. Returns (users removed, verifications removed)."""
+    cutoff = now - timedelta(seconds=settings.UNVERIFIED_USER_GRACE_SECONDS)
+    abandoned = EmailVerification.objects.filter(is_verified=False, expires_at__lt=cutoff)
+
+    users = delete_in_batches(
+        User.objects.filter(
+            emailverification__in=abandoned, is_active=False, last_login=None, is_staff=False, is_superuser=False,
+        ).order_by('pk'),
+        batch_size, pause,
+    )
+    # The users' rows went with them; what is left belongs to users who were activated some other way
+    leftovers = delete_in_batches(abandoned.order_by('expires_at'), batch_size, pause)
+    return users, users + leftovers
+
+
+def sweep_expired_tokens(batch_size=None, pause=None):
+    """Run every sweep; returns {what: rows removed}."""
+    batch_size = batch_size or settings.TOKEN_SWEEP_BATCH_SIZE
+    pause = settings.TOKEN_SWEEP_PAUSE_SECONDS if pause is None else pause
+    now = timezone.now()
+    users, verifications = sweep_unverified(now, batch_size, pause)
+    return {
+        'password_reset_tokens': sweep_reset_tokens(now, batch_size, pause),
+        'email_verifications': verifications,
+        'unverified_users': users,
+    }
@@ -1,16 +1,166 @@
+import logging
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+
 from celery import shared_task
-from django.core.mail import send_mail
+from celery.signals import task_postrun
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import render_to_string
 from django.utils import timezone
-from .models import Task
+from django.utils.html import strip_tags
+from .models import Task, TaskTombstone
+from .roles import STUDENT, users_with_role
+from . import activity, archive, outbox, reminders, replicas, sweeper, uploads
+
+logger = logging.getLogger(__name__)
+
+DigestItem = namedtuple('DigestItem', 'title due_date')
+
 
 @shared_task
 def send_weekly_summary_email():
-    tasks = Task.objects.filter(status="pending")
-    message = "\n".join([t.title for t in tasks])
-    send_mail(
-        subject="Weekly Task Summary",
-        message=f"Pending tasks:\n{message}",
-        from_email="noreply@taskapp.com",
-        recipient_list=["student@yopmail.com"],
+    """
+    Fan the weekly digest out to one subtask per chunk of students.
+    Only student ids are read here, a chunk at a time (keyset on id).
+    """
+    students = users_with_role(STUDENT).filter(is_active=True).exclude(email='')
+    last_id = 0
+    chunks = 0
+    while True:
+        ids = list(
+            students.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:settings.DIGEST_CHUNK_SIZE]
+        )
+        if not ids:
+            break
+        send_digest_batch.delay(ids)
+        last_id = ids[-1]
+        chunks += 1
+    logger.info("Queued weekly digest for %s chunk(s)", chunks)
+    return chunks
+
+
+@shared_task(bind=True, max_retries=5)
+def send_digest_batch(self, student_ids):
+    """
+    Build each student's pending / overdue list and send the chunk over one
+    SMTP connection, one message at a time. Only the students whose digest
+    could not be sent are retried (with backoff), so nobody gets it twice.
+    """
+    today = timezone.localdate()
+    limit = settings.DIGEST_MAX_ITEMS
+    items = defaultdict(lambda: {'overdue': [], 'pending': [], 'truncated': 0})
+
+    open_assignments = (
+        Task.assigned_to.through.objects
+        .filter(user_id__in=student_ids, task__status__in=['pending', 'in_progress'])
+        .order_by('user_id', 'task__due_date')
+        .values_list('user_id', 'task__title', 'task__due_date')
     )
-    print(f"Sent summary email at {timezone.now()}")
+    for user_id, title, due_date in open_assignments.iterator():
+        entry = items[user_id]
+        if len(entry['overdue']) + len(entry['pending']) >= limit:
+            entry['truncated'] += 1
+            continue
+        bucket = 'overdue' if due_date and due_date < today else 'pending'
+        entry[bucket].append(DigestItem(title, due_date))
+
+    messages = {}
+    for student in User.objects.filter(id__in=items.keys()).only('id', 'username', 'email'):
+        html_content = render_to_string('emails/weekly_digest.html', {'student': student, **items[student.id]})
+        message = EmailMultiAlternatives(
+            "Weekly Task Summary", strip_tags(html_content), settings.DEFAULT_FROM_EMAIL, [student.email]
+        )
+        message.attach_alternative(html_content, "text/html")
+        messages[student.id] = message
+
+    if not messages:
+        return 0
+    sent = 0
+    unsent, error = [], None
+    try:
+        connection = get_connection()
+        connection.open()
+    except OSError as e:
+        unsent, error = list(messages), e
+    else:
+        try:
+            for student_id, message in messages.items():
+                try:
+                    sent += connection.send_messages([message])
+                except SMTPRecipientsRefused as e:
+                    # The address itself is refused; sending again will not help
+                    logger.warning("Weekly digest for student %s refused: %s", student_id, e)
+                except OSError as e:
+                    # SMTP errors are OSErrors; a dropped connection fails the rest too
+                    unsent.append(student_id)
+                    error = e
+        finally:
+            connection.close()
+    if unsent:
+        logger.warning("Weekly digest not sent to %s student(s), retrying: %s", len(unsent), error)
+        raise self.retry(args=[unsent], exc=error, countdown=min(60 * 2 ** self.request.retries, 3600))
+    return sent
+
+
+@shared_task
+def send_due_reminders():
+    """Queue one email per student per reminder window (48h / 2h before, overdue)."""
+    report = reminders.send_due_reminders()
+    logger.info("Due-date reminders queued: %s", report)
+    return report
+
+
+@shared_task
+def deliver_outbox():
+    """Send queued emails in batches; failures are retried with backoff."""
+    sent, failed = outbox.drain()
+    return {'sent': sent, 'failed': failed}
+
+
+@shared_task
+def purge_stale_uploads():
+    """Remove resumable uploads that were abandoned part-way."""
+    return uploads.purge_stale_sessions()
+
+
+@shared_task
+def purge_task_tombstones():
+    """Drop tombstones older than the API's delta-sync history."""
+    cutoff = timezone.now() - timedelta(days=settings.API_TOMBSTONE_DAYS)
+    deleted, _ = TaskTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+@shared_task
+def sweep_expired_tokens():
+    """Delete expired / used tokens and abandoned registrations in small batches."""
+    removed = sweeper.sweep_expired_tokens()
+    logger.info("Token sweep removed %s", removed)
+    return removed
+
+
+@shared_task
+def archive_completed_tasks():
+    """Move old completed tasks to the archive table in small batches."""
+    moved = archive.archive_completed()
+    logger.info("Archived %s completed task(s)", moved)
+    return moved
+
+
+@shared_task
+def replication_heartbeat():
+    """Stamp the heartbeat on the primary and log how far each replica is behind."""
+    replicas.beat()
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replicas.measure_lag(alias)
+        if lag is None or lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Replica %s lag: %s", alias, 'unknown' if lag is None else f"{lag:.1f}s")
+
+
+@task_postrun.connect
+def flush_activity(**kwargs):
+    """Write the activity rows a task logged (web requests do this when they finish)."""
+    activity.flush()
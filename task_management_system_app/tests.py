@@ -1,3 +1,1639 @@
-from django.test import TestCase
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from datetime import date, datetime, time as clock, timedelta
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from celery.exceptions import Retry
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password
+from django.contrib.auth.models import Group, User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+
+from . import (
+    activity, aio, archive, bulk, counters, events, export, fragments, inbox, outbox, ratelimit, reminders, replicas, roles,
+    sweeper, tasks, uploads, urls,
+)
+from .models import (
+    ArchivedTask, ArchivedTaskFile, EmailDelivery, EmailVerification, FileBlob, OutboundEmail, PasswordResetToken,
+    Task, TaskActivity, TaskFile, TaskReminder, TaskTombstone, UploadSession,
+)
+from .querystats import QueryStats
+from .search import get_search_backend
+
+TASK_TABLES = ('task_management_system_app_task',)
+
+
+class SeededTestCase(TestCase):
+    """A teacher, two students and a few hundred tasks split between them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        teachers = Group.objects.create(name='Teacher')
+        students = Group.objects.create(name='Student')
+        cls.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass')
+        cls.teacher.groups.add(teachers)
+        cls.student = User.objects.create_user('student', 'student@example.com', 'pass')
+        cls.other_student = User.objects.create_user('other', 'other@example.com', 'pass')
+        for user in (cls.student, cls.other_student):
+            user.groups.add(students)
+
+        statuses = [value for value, _ in Task.STATUS_CHOICES]
+        for i in range(300):
+            task = Task.objects.create(
+                title=f"Essay {i}",
+                description="Write a short essay about the reading.",
+                status=statuses[i % 3],
+                due_date=date(2030, 1, 1) + timedelta(days=i % 30),
+                created_by=cls.teacher,
+            )
+            task.assigned_to.add(cls.student if i % 2 else cls.other_student)
+
+    def setUp(self):
+        # Roles are cached by user id, and ids are reused between test cases
+        cache.clear()
+        fragments.row_cache().clear()
+        ratelimit.get_cache().clear()
+        roles.get_cache().clear()
+
+
+class QueryPlanTests(SeededTestCase):
+    """
+    EXPLAIN every query a listing view runs against the task tables.
+    A plan that falls back to a full table scan fails the test.
+    """
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute(f"EXPLAIN {sql}")
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def full_scans(self, plan):
+        if connection.vendor == 'sqlite':
+            return [
+                line for line in plan
+                if re.match(r'SCAN \w+', line) and 'INDEX' not in line and 'VIRTUAL TABLE' not in line
+            ]
+        return [row for row in plan if row.get('type') == 'ALL']
+
+    def assertIndexedPlans(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(table in sql for table in TASK_TABLES):
+                continue
+            plan = self.explain(sql)
+            self.assertFalse(self.full_scans(plan), f"Full scan for {url}:\n{sql}\n" + "\n".join(map(str, plan)))
+            checked += 1
+        self.assertTrue(checked, f"No task queries captured for {url}")
+
+    def test_teacher_task_list(self):
+        self.assertIndexedPlans(self.teacher, '/task-list/')
+
+    def test_teacher_task_list_filtered(self):
+        self.assertIndexedPlans(self.teacher, '/task-list/?status=pending')
+        self.assertIndexedPlans(self.teacher, '/task-list/?due_date=2030-01-05')
+        self.assertIndexedPlans(self.teacher, '/task-list/?search=essay')
+
+    def test_teacher_task_list_next_page(self):
+        self.client.force_login(self.teacher)
+        cursor = self.client.get('/task-list/').context['page'].next_cursor
+        self.assertIndexedPlans(self.teacher, f'/task-list/?cursor={cursor}')
+
+    def test_student_task_list(self):
+        self.assertIndexedPlans(self.student, '/task-list/')
+        self.assertIndexedPlans(self.student, '/task-list/?status=completed')
+
+    def test_teacher_dashboard(self):
+        self.assertIndexedPlans(self.teacher, '/dashboard/')
+
+    def test_student_dashboard(self):
+        self.assertIndexedPlans(self.student, '/dashboard/')
+
+
+@override_settings(TASK_PAGE_SIZE=7)
+class KeysetPaginationTests(SeededTestCase):
+    """Cursor pages keep the filters, never repeat or skip rows, and survive ties and inserts."""
+
+    def walk(self, url):
+        """Ids of every row reached by following the cursors from `url`."""
+        ids = []
+        while url:
+            page = self.client.get(url).context['page']
+            ids += [task.pk for task in page]
+            url = page.has_next and f"/task-list/?{page.next_querystring()}"
+        return ids
+
+    def test_filters_and_ties(self):
+        # Every row shares one created_at, so only the id tie-breaker orders them
+        Task.objects.update(created_at=timezone.now())
+        self.client.force_login(self.teacher)
+        ids = self.walk('/task-list/?status=pending')
+        expected = list(Task.objects.filter(status='pending').order_by('id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_insert_between_pages_does_not_shift_the_next_page(self):
+        self.client.force_login(self.student)
+        first = self.client.get('/task-list/').context['page']
+        second_before = [task.pk for task in self.client.get(f"/task-list/?{first.next_querystring()}").context['page']]
+        new = Task.objects.create(title="Newest", created_by=self.teacher)
+        new.assigned_to.add(self.student)
+        second_after = [task.pk for task in self.client.get(f"/task-list/?{first.next_querystring()}").context['page']]
+        self.assertEqual(second_after, second_before)
+        self.assertNotIn(new.pk, second_after)
+
+    def test_tampered_cursor_starts_over(self):
+        self.client.force_login(self.teacher)
+        first = [task.pk for task in self.client.get('/task-list/').context['page']]
+        for cursor in ('not-base64!', 'WyJ4Il0', 'WyJub3QtYS1kYXRlIiwgMV0'):
+            self.assertEqual([task.pk for task in self.client.get(f'/task-list/?cursor={cursor}').context['page']], first)
+
+
+class SearchTests(TestCase):
+    """Full-text search ranks the best match first and follows task saves and deletes."""
+
+    def setUp(self):
+        self.backend = get_search_backend()
+
+    def found(self, query):
+        tasks = self.backend.search(Task.objects.all(), query).order_by(*self.backend.ordering)
+        return [task.title for task in tasks]
+
+    def test_ranking_and_prefixes(self):
+        Task.objects.create(title="Reading notes", description="Mention the lab report from last week.")
+        Task.objects.create(title="Lab report", description="Write up the lab report for the titration lab.")
+        Task.objects.create(title="Poem", description="Revise the poem.")
+        self.assertEqual(self.found('lab report'), ["Lab report", "Reading notes"])
+        self.assertEqual(self.found('revis'), ["Poem"])
+        # Operators in user input are treated as plain words
+        self.assertEqual(self.found('lab OR "poem'), [])
+        self.assertEqual(self.found('***'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        task = Task.objects.create(title="Geometry worksheet")
+        self.assertEqual(self.found('geometry'), ["Geometry worksheet"])
+        task.title = "Algebra worksheet"
+        task.save()
+        self.assertEqual(self.found('geometry'), [])
+        self.assertEqual(self.found('algebra'), ["Algebra worksheet"])
+        task.delete()
+        self.assertEqual(self.found('worksheet'), [])
+
+
+class RowCacheTests(SeededTestCase):
+    """Cached task rows are reused until the task or its assignees change."""
+
+    def rows_for(self, user):
+        self.client.force_login(user)
+        return {row for row in self.client.get('/task-list/').context['rows']}
+
+    def test_warm_page_skips_assignee_query(self):
+        self.client.force_login(self.teacher)
+        self.client.get('/task-list/')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/task-list/')
+        self.assertFalse([q for q in ctx.captured_queries if 'auth_user' in q['sql'] and '_task_assigned_to' in q['sql']])
+
+    def test_reassignment_invalidates_row(self):
+        task = Task.objects.order_by('-created_at', 'id').first()
+        before = self.rows_for(self.teacher)
+        task.assigned_to.add(self.student, self.other_student)
+        after = self.rows_for(self.teacher)
+        changed = after - before
+        self.assertEqual(len(changed), 1)
+        row = changed.pop()
+        self.assertIn('student', row)
+        self.assertIn('other', row)
+
+
+@override_settings(EXPORT_BATCH_SIZE=40)
+class ExportTests(SeededTestCase):
+    """The export streams every filtered row a page at a time."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.teacher)
+
+    def export(self, **params):
+        response = self.client.get('/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_matches_filters_with_constant_queries_per_batch(self):
+        task = Task.objects.filter(status='completed').order_by('id').first()
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            uploads.store_upload(SimpleUploadedFile('a.txt', b'a'), task, self.student)
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(csv.DictReader(io.StringIO(self.export(status='completed'))))
+        self.assertEqual(len(rows), Task.objects.filter(status='completed').count())
+        self.assertEqual({row['status'] for row in rows}, {'completed'})
+        exported = next(row for row in rows if row['id'] == str(task.pk))
+        self.assertEqual(exported['file_count'], '1')
+        self.assertEqual(exported['assigned_to'], ';'.join(u.username for u in task.assigned_to.all()))
+        # A task page and an assignee query per batch of 40, plus session, user and role lookups
+        batches = len(rows) // 40 + 1
+        self.assertLessEqual(len(queries), 2 * batches + 4)
+
+    def test_json_formats_and_search(self):
+        rows = json.loads(self.export(format='json', search='essay 7'))
+        self.assertIn('Essay 7', [row['title'] for row in rows])
+        lines = self.export(format='jsonl').splitlines()
+        self.assertEqual(len(lines), Task.objects.count())
+        self.assertEqual(set(json.loads(lines[0])), set(export.COLUMNS))
+
+    def test_students_cannot_export(self):
+        self.client.logout()
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get('/export/').status_code, 403)
+
+
+class ConditionalGetTests(SeededTestCase):
+    """Unchanged listings answer 304; edits, deletes and reassignments do not."""
+
+    def revalidate(self, url, user):
+        self.client.force_login(user)
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return first['ETag']
+
+    def status_with(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_listing_is_not_modified(self):
+        for url in ('/task-list/', '/dashboard/', '/task-list/?status=pending'):
+            etag = self.revalidate(url, self.teacher)
+            self.assertEqual(self.status_with(url, etag), 304)
+
+    def test_filters_and_viewer_change_etag(self):
+        etag = self.revalidate('/task-list/', self.teacher)
+        self.assertEqual(self.status_with('/task-list/?status=pending', etag), 200)
+        self.client.force_login(self.student)
+        self.assertEqual(self.status_with('/task-list/', etag), 200)
+
+    def test_delete_changes_etag(self):
+        etag = self.revalidate('/task-list/', self.teacher)
+        task = Task.objects.order_by('updated_at').first()
+        # Follow the redirect so the flash message is shown and cleared
+        self.client.get(f'/{task.pk}/delete/', follow=True)
+        self.assertEqual(self.status_with('/task-list/', etag), 200)
+
+    def test_assignment_changes_etag(self):
+        etag = self.revalidate('/dashboard/', self.student)
+        task = Task.objects.exclude(assigned_to=self.student).order_by('updated_at').first()
+        task.assigned_to.add(self.student)
+        self.assertEqual(self.status_with('/dashboard/', etag), 200)
+
+    def test_unassignment_and_archiving_change_etag(self):
+        etag = self.revalidate('/task-list/', self.student)
+        # Not the newest task, so MAX(updated_at) of what is left does not move by itself
+        task = self.student.tasks_assigned.order_by('updated_at').first()
+        Task.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        etag = self.revalidate('/task-list/', self.student)
+        task.assigned_to.remove(self.student)
+        Task.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.status_with('/task-list/', etag), 200)
+
+        etag = self.revalidate('/task-list/', self.teacher)
+        Task.objects.filter(pk=task.pk).update(status='completed', updated_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(archive.archive_completed(older_than_days=180, batch_size=10, pause=0), 1)
+        self.assertEqual(self.status_with('/task-list/', etag), 200)
+
+    def test_revalidating_counts_nothing(self):
+        etag = self.revalidate('/task-list/', self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.status_with('/task-list/', etag), 304)
+        self.assertFalse([q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()])
+
+
+@override_settings(API_SYNC_LAG_SECONDS=0)
+class TaskApiTests(SeededTestCase):
+    """Token auth, sparse fields, keyset pages and delta sync with tombstones."""
+
+    def login(self, user):
+        response = self.client.post('/api/v1/auth/login/', HTTP_AUTHORIZATION=self.basic(user))
+        self.assertEqual(response.status_code, 200)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f"Token {response.json()['token']}"
+
+    def basic(self, user):
+        return 'Basic ' + base64.b64encode(f"{user.username}:pass".encode()).decode()
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/v1/tasks/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/v1/tasks/').status_code, 401)
+
+    def test_sparse_fields_and_pages(self):
+        self.login(self.student)
+        seen = []
+        url = '/api/v1/tasks/?fields=id,title&page_size=100'
+        while url:
+            body = self.client.get(url).json()
+            self.assertTrue(all(set(row) == {'id', 'title'} for row in body['results']))
+            seen += [row['id'] for row in body['results']]
+            url = body['next']
+        self.assertEqual(len(seen), 150)
+        self.assertEqual(len(set(seen)), 150)
+        self.assertEqual(self.client.get('/api/v1/tasks/?fields=secret').status_code, 400)
+
+    def test_delta_sync_reports_changes_and_deletes(self):
+        self.login(self.teacher)
+        since, synced = None, 0
+        while True:
+            body = self.sync(since, page_size=200)
+            synced += len(body['changed'])
+            since = body['next_since']
+            if not body['has_more']:
+                break
+        self.assertEqual(synced, 300)
+
+        changed, removed = Task.objects.order_by('id')[:2]
+        changed.status = 'completed'
+        changed.save()
+        removed_id = removed.pk
+        removed.delete()
+
+        body = self.sync(since, fields='id,status')
+        self.assertEqual(body['changed'], [{'id': changed.pk, 'status': 'completed'}])
+        self.assertEqual(body['deleted'], [removed_id])
+        self.assertEqual(self.sync(body['next_since'])['changed'], [])
+
+    def test_unassignment_is_a_tombstone_for_the_student(self):
+        self.login(self.student)
+        since = self.sync(page_size=200)['next_since']
+        task = self.student.tasks_assigned.first()
+        task.assigned_to.remove(self.student)
+        body = self.sync(since)
+        self.assertEqual(body['deleted'], [task.pk])
+        self.assertEqual(body['changed'], [])
+
+
+def named_routes(patterns, params=()):
+    """(url name, URL kwarg names) for every named route, following include()."""
+    for pattern in patterns:
+        names = (*params, *pattern.pattern.regex.groupindex)
+        if isinstance(pattern, URLResolver):
+            yield from named_routes(pattern.url_patterns, names)
+        elif pattern.name:
+            yield pattern.name, names
+
+
+# url name: (who requests it, most queries a GET may run with cold role and
+# unread-count caches; pages with the navbar read the inbox badge once)
+QUERY_BUDGETS = {
+    'home': (None, 0),
+    'dashboard_view': ('teacher', 10),
+    'register_view': (None, 0),
+    'login_view': (None, 0),
+    'logout_view': ('student', 5),
+    'task_list': ('teacher', 7),
+    'task_events': ('student', 3),
+    'task_export': ('teacher', 3),
+    'task_create': ('teacher', 5),
+    'task_bulk_create': ('teacher', 3),
+    'task_update': ('student', 7),
+    'task_delete': ('student', 3),
+    'task_assign': ('teacher', 3),
+    'task_activity': ('teacher', 6),
+    'user_activity': ('teacher', 6),
+    'upload_start': ('student', 3),
+    'upload_chunk': ('student', 4),
+    'task_file_download': ('student', 5),
+    'archived_task_detail': ('student', 4),
+    'archived_task_restore': ('teacher', 3),
+    'archived_file_download': ('student', 4),
+    'inbox': ('student', 5),
+    'inbox_open': ('student', 5),
+    'inbox_mark_all_read': ('student', 3),
+    'verify_email': (None, 7),
+    'forgot_password': (None, 0),
+    'reset_password': (None, 1),
+    'api_login': (None, 0),
+    'api_logout': ('student', 3),
+    'api_logout_all': ('student', 3),
+    'api_task_list': ('student', 5),
+    'api_task_changes': ('student', 5),
+    'api_task_detail': ('student', 5),
+}
+
+
+@override_settings(API_SYNC_LAG_SECONDS=0)  # otherwise fresh seed rows are held back and skip the prefetch
+class QueryBudgetTests(SeededTestCase):
+    """
+    GET every named URL in urls.py against the seeded data and fail when a
+    view runs more queries than its budget in QUERY_BUDGETS. New URLs must
+    declare a budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.media = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.task = cls.student.tasks_assigned.first()
+        with override_settings(MEDIA_ROOT=cls.media):
+            cls.task_file = uploads.store_upload(SimpleUploadedFile('notes.txt', b'notes'), cls.task, cls.student)
+            cls.upload = uploads.start_session(cls.task, cls.student, 'essay.pdf', 1024)
+        newcomer = User.objects.create_user('newcomer', 'new@example.com', 'pass', is_active=False)
+        cls.verification = EmailVerification.objects.create(
+            user=newcomer, expires_at=timezone.now() + timedelta(hours=1)
+        )
+        cls.reset_token = PasswordResetToken.objects.create(user=cls.student)
+
+    def url_kwargs(self, name, params):
+        values = {'pk': self.task.pk, 'upload_id': self.upload.pk, 'version': 'v1'}
+        if name == 'task_file_download':
+            values['pk'] = self.task_file.pk
+        elif name == 'verify_email':
+            values['token'] = self.verification.token
+        elif name == 'reset_password':
+            values['token'] = self.reset_token.token
+        return {param: values[param] for param in params}
+
+    def test_every_view_within_budget(self):
+        routes = dict(named_routes(urls.urlpatterns))
+        self.assertFalse(routes.keys() - QUERY_BUDGETS.keys(), "Declare a query budget for these URLs")
+
+        over = []
+        for name, params in routes.items():
+            username, budget = QUERY_BUDGETS[name]
+            self.client.logout()
+            cache.clear()  # measure with cold role / unread-count caches
+            roles.forget_roles(User.objects.values_list('id', flat=True))
+            if username:
+                self.client.force_login(getattr(self, username))
+            url = reverse(name, kwargs=self.url_kwargs(name, params))
+            with self.settings(MEDIA_ROOT=self.media), QueryStats() as stats:
+                response = self.client.get(url)
+            self.assertLess(response.status_code, 500, url)
+            if stats.count > budget:
+                over.append(f"{name} ({url}): {stats.summary()}, budget {budget}")
+        self.assertFalse(over, "\n".join(over))
+
+
+class CounterTests(SeededTestCase):
+    """Every signal path keeps the status counters equal to a recount."""
+
+    def assertInStep(self):
+        self.assertEqual(counters.stored_counts(), counters.actual_counts())
+
+    def test_seeded_counts(self):
+        self.assertInStep()
+        self.assertEqual(counters.summary(self.teacher, counters.CREATED)['total'], 300)
+        self.assertEqual(counters.summary(self.student, counters.ASSIGNED)['total'], 150)
+
+    def test_create_status_change_and_delete(self):
+        task = Task.objects.create(title="New", description="x", due_date=date(2030, 1, 1), created_by=self.teacher)
+        task.assigned_to.add(self.student)
+        self.assertInStep()
+
+        task.status = 'completed'
+        task.save()
+        self.assertInStep()
+        # Saving again without a change moves nothing
+        Task.objects.get(pk=task.pk).save()
+        self.assertInStep()
+
+        task.delete()
+        self.assertInStep()
+
+    def test_reassigning_the_creator(self):
+        task = Task.objects.filter(created_by=self.teacher).first()
+        task.created_by = self.other_student
+        task.save()
+        self.assertInStep()
+
+    def test_assign_remove_and_clear(self):
+        task = Task.objects.filter(assigned_to=self.student).first()
+        task.assigned_to.add(self.other_student)
+        self.assertInStep()
+        # Removing someone who is not assigned changes nothing
+        task.assigned_to.remove(self.teacher)
+        self.assertInStep()
+        task.assigned_to.remove(self.student)
+        self.assertInStep()
+        task.assigned_to.set([self.student, self.other_student])
+        self.assertInStep()
+        task.assigned_to.clear()
+        self.assertInStep()
+
+    def test_reverse_side_changes(self):
+        tasks = list(Task.objects.filter(assigned_to=self.other_student).values_list('id', flat=True)[:10])
+        self.student.tasks_assigned.add(*tasks)
+        self.assertInStep()
+        self.student.tasks_assigned.remove(*tasks[:5])
+        self.assertInStep()
+        self.student.tasks_assigned.clear()
+        self.assertInStep()
+        self.assertEqual(counters.summary(self.student, counters.ASSIGNED)['total'], 0)
+
+    def test_rebuild_repairs_bulk_updates(self):
+        # QuerySet.update() skips the signals
+        Task.objects.filter(status='pending').update(status='completed')
+        self.assertNotEqual(counters.stored_counts(), counters.actual_counts())
+        counters.rebuild()
+        self.assertInStep()
+
+
+class BulkImportTests(SeededTestCase):
+    """Batched inserts, per-row errors and mass assignment keep counters and the index in step."""
+
+    def row(self, i, **extra):
+        return {'title': f"Imported {i}", 'description': f"Bulk row {i}", 'assigned_to': ['student'], **extra}
+
+    def test_rows_are_inserted_in_batches(self):
+        rows = [self.row(i) for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            created, errors = bulk.import_tasks(rows, self.teacher, batch_size=2)
+        self.assertEqual((created, errors), (5, []))
+        insert = 'INSERT INTO "task_management_system_app_task"'
+        self.assertEqual(sum(q['sql'].startswith(insert) for q in queries.captured_queries), 3)
+
+        imported = Task.objects.filter(title__startswith="Imported")
+        self.assertEqual(imported.count(), 5)
+        self.assertEqual(imported.filter(assigned_to=self.student).count(), 5)
+        self.assertEqual(counters.stored_counts(), counters.actual_counts())
+        self.assertEqual(len(get_search_backend().search(Task.objects.all(), "Bulk")), 5)
+
+    def test_bad_rows_are_reported_by_number(self):
+        rows = [
+            self.row(1),
+            self.row(2, title=''),
+            self.row(3, status='someday'),
+            self.row(4, assigned_to=['student', 'nobody', 'teacher']),
+            ["not", "an", "object"],
+            bulk.parse_json_row('{"title": '),
+            self.row(7, assigned_to='student'),
+            self.row(8, due_date='2030-02-30'),
+            self.row(9, status='completed'),
+        ]
+        created, errors = bulk.import_tasks(rows, self.teacher, batch_size=4)
+        self.assertEqual(created, 2)
+        self.assertEqual([number for number, _ in errors], [2, 3, 4, 5, 6, 7, 8])
+        problems = dict(errors)
+        self.assertIn("unknown student(s) nobody, teacher", problems[4][0])
+        self.assertTrue(problems[6][0].startswith("Invalid JSON"))
+        self.assertEqual(Task.objects.get(title="Imported 9").status, 'completed')
+
+    def test_csv_assignees(self):
+        stream = io.BytesIO(b"title,status,assigned_to\nCSV task,pending,student; other\n")
+        created, errors = bulk.import_tasks(bulk.iter_rows(stream, 'csv'), self.teacher)
+        self.assertEqual((created, errors), (1, []))
+        self.assertEqual(Task.objects.get(title="CSV task").assigned_to.count(), 2)
+
+    def test_undecodable_and_malformed_files_end_with_an_error_row(self):
+        self.client.force_login(self.teacher)
+        for name, content, message in (
+            ('tasks.csv', b"title\nFirst\nSecond \xff\xfe\n", "not valid UTF-8"),
+            ('tasks.jsonl', b'{"title": "First"}\n{"title": "\xff"}\n', "not valid UTF-8"),
+            ('tasks.csv', b'title,description\nFirst,"' + b'x' * 200_000 + b'"\n', "Malformed CSV"),
+        ):
+            response = self.client.post(reverse('task_bulk_create'), {'file': SimpleUploadedFile(name, content)})
+            self.assertEqual(response.status_code, 200, name)
+            errors = response.json()['errors']
+            self.assertEqual(len(errors), 1, name)
+            self.assertIn(message, errors[0]['errors'][0])
+
+    def test_inserted_tasks_get_their_own_ids(self):
+        tasks = [Task(title=f"Inserted {i}", description=f"Text {i}") for i in range(3)]
+        with transaction.atomic():
+            bulk.insert_tasks(tasks, self.teacher)
+        for task in tasks:
+            stored = Task.objects.get(pk=task.pk)
+            self.assertEqual(
+                (stored.title, stored.description, stored.created_by), (task.title, task.description, self.teacher)
+            )
+
+    def test_assign_students(self):
+        task = Task.objects.filter(assigned_to=self.student).first()
+        before = task.updated_at
+        extra = [User.objects.create_user(f"extra{i}").pk for i in range(5)]
+        added = bulk.assign_students(task, [self.student.pk, self.other_student.pk, *extra, extra[0]], batch_size=3)
+        # The student was assigned already and extra[0] is listed twice
+        self.assertEqual(added, 6)
+        self.assertEqual(task.assigned_to.count(), 7)
+        self.assertEqual(counters.stored_counts(), counters.actual_counts())
+        task.refresh_from_db()
+        self.assertGreater(task.updated_at, before)
+        self.assertEqual(bulk.assign_students(task, extra), 0)
+
+
+@override_settings(UPLOAD_MAX_BYTES=1000, UPLOAD_CHUNK_MAX_BYTES=100)
+class UploadTests(SeededTestCase):
+    """Resumable sessions: limits, offsets, recovery after a dropped chunk, dedupe and purging."""
+
+    data = bytes(range(250))
+
+    def setUp(self):
+        super().setUp()
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media))
+        self.task = Task.objects.filter(assigned_to=self.student).first()
+        self.client.force_login(self.student)
+
+    def start(self, size, filename='essay.pdf', task=None):
+        url = reverse('upload_start', args=[(task or self.task).pk])
+        return self.client.post(url, json.dumps({'filename': filename, 'size': size}), content_type='application/json')
+
+    def send(self, url, offset, data):
+        return self.client.patch(
+            url, data, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def test_session_limits(self):
+        self.assertEqual(self.start(0).status_code, 400)
+        self.assertEqual(self.start(1001).status_code, 400)
+        url = reverse('upload_start', args=[self.task.pk])
+        self.assertEqual(self.client.post(url, '{}', content_type='application/json').status_code, 400)
+        other = Task.objects.exclude(assigned_to=self.student).first()
+        self.assertEqual(self.start(10, task=other).status_code, 403)
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.start(10).status_code, 403)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunks_offsets_and_completion(self):
+        started = self.start(len(self.data), filename='../../essay.pdf')
+        self.assertEqual(started.status_code, 201)
+        url = started.json()['url']
+        self.assertEqual(self.send(url, 0, self.data[:101]).status_code, 400)  # over the chunk limit
+
+        self.assertEqual(self.send(url, 0, self.data[:100]).json()['offset'], 100)
+        # A repeated or skipped offset is refused and says where to carry on
+        for offset in (0, 150):
+            response = self.send(url, offset, self.data[100:200])
+            self.assertEqual(response.status_code, 409)
+            self.assertIn("Expected offset 100", response.json()['error'])
+        self.assertEqual(self.send(url, 100, self.data[100:200] + self.data[:60]).status_code, 400)  # past the size
+
+        self.assertEqual(self.client.get(url).json()['offset'], 100)
+        self.send(url, 100, self.data[100:200])
+        done = self.send(url, 200, self.data[200:]).json()
+        self.assertTrue(done['complete'])
+        self.assertEqual(self.send(url, 250, b'x').status_code, 409)
+
+        task_file = TaskFile.objects.get(pk=done['file_id'])
+        self.assertEqual(task_file.original_name, 'essay.pdf')
+        self.assertEqual(task_file.blob.sha256, hashlib.sha256(self.data).hexdigest())
+        with task_file.blob.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(os.listdir(os.path.join(self.media, 'upload_parts')), [])
+
+        # Sessions are private to their uploader
+        self.client.force_login(self.other_student)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.send(url, 250, b'x').status_code, 404)
+
+    def test_resume_after_a_dropped_chunk(self):
+        url = self.start(len(self.data)).json()['url']
+        self.send(url, 0, self.data[:100])
+        session = UploadSession.objects.get()
+        # A request died after writing part of a chunk but before recording it,
+        # and the next chunk lands on a worker without the running hash
+        with open(uploads.part_path(session), 'ab') as part:
+            part.write(b'garbage' * 40)  # runs past the declared size
+        uploads._hashers.clear()
+
+        self.assertEqual(self.client.get(url).json()['offset'], 100)
+        self.send(url, 100, self.data[100:200])
+        self.send(url, 200, self.data[200:])
+        session.refresh_from_db()
+        self.assertEqual(session.task_file.blob.sha256, hashlib.sha256(self.data).hexdigest())
+        with session.task_file.blob.file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_same_bytes_are_stored_once(self):
+        first = uploads.store_upload(SimpleUploadedFile('a.bin', self.data), self.task, self.student)
+        url = self.start(len(self.data), filename='b.bin').json()['url']
+        self.send(url, 0, self.data[:100])
+        self.send(url, 100, self.data[100:200])
+        second = TaskFile.objects.get(pk=self.send(url, 200, self.data[200:]).json()['file_id'])
+
+        self.assertEqual(FileBlob.objects.count(), 1)
+        self.assertEqual(second.blob_id, first.blob_id)
+        self.assertEqual((first.original_name, second.original_name), ('a.bin', 'b.bin'))
+
+        path = os.path.join(self.media, 'copy.part')
+        with open(path, 'wb') as f:
+            f.write(self.data)
+        blob, created = uploads.adopt_blob(path, hashlib.sha256(self.data).hexdigest(), len(self.data))
+        self.assertEqual((blob.pk, created), (first.blob_id, False))
+        self.assertFalse(os.path.exists(path))
+
+    def test_purge_stale_sessions(self):
+        stale = uploads.start_session(self.task, self.student, 'stale.pdf', 10)
+        fresh = uploads.start_session(self.task, self.student, 'fresh.pdf', 10)
+        finished = uploads.start_session(self.task, self.student, 'done.pdf', 3)
+        uploads.append_chunk(finished.pk, self.student, 0, io.BytesIO(b'abc'), 3)
+        UploadSession.objects.exclude(pk=fresh.pk).update(updated_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(uploads.purge_stale_sessions(), 1)
+        self.assertEqual(set(UploadSession.objects.values_list('pk', flat=True)), {fresh.pk, finished.pk})
+        self.assertFalse(os.path.exists(uploads.part_path(stale)))
+        self.assertTrue(os.path.exists(uploads.part_path(fresh)))
+
+
+class DownloadTests(SeededTestCase):
+    """Access checks, ranges and validators for task files, and the proxy hand-offs."""
+
+    data = bytes(range(250))
+
+    def setUp(self):
+        super().setUp()
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media, MEDIA_DELIVERY='python'))
+        self.task = Task.objects.filter(assigned_to=self.student).first()
+        self.task_file = uploads.store_upload(SimpleUploadedFile('notes.txt', self.data), self.task, self.student)
+        self.url = reverse('task_file_download', args=[self.task_file.pk])
+        self.etag = f'"{self.task_file.blob.sha256}"'
+        self.client.force_login(self.student)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        # Reading streaming_content to the end also closes the file
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_permissions(self):
+        for user in (self.student, self.teacher):
+            self.client.force_login(user)
+            self.assertEqual(self.get()[0].status_code, 200)
+        self.client.force_login(self.other_student)
+        self.assertEqual(self.get()[0].status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.get()[0].status_code, 302)
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(body, self.data)
+        self.assertEqual(response['Content-Length'], '250')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertIn('notes.txt', response['Content-Disposition'])
+
+    def test_ranges(self):
+        for header, start, end in (('bytes=10-19', 10, 19), ('bytes=-5', 245, 249), ('bytes=240-', 240, 249),
+                                   ('bytes=240-999', 240, 249)):
+            response, body = self.get(Range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response['Content-Range'], f"bytes {start}-{end}/250")
+            self.assertEqual(response['Content-Length'], str(end - start + 1))
+            self.assertEqual(body, self.data[start:end + 1])
+        # Several ranges are not supported; the whole file is sent
+        self.assertEqual(self.get(Range='bytes=0-1,5-6')[0].status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=250-', 'bytes=20-10', 'bytes=-'):
+            response, _ = self.get(Range=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response['Content-Range'], "bytes */250")
+
+    def test_if_range(self):
+        response, body = self.get(Range='bytes=0-9', **{'If-Range': self.etag})
+        self.assertEqual((response.status_code, body), (206, self.data[:10]))
+        # The client's partial copy is of another version: send everything
+        response, body = self.get(Range='bytes=0-9', **{'If-Range': '"stale"'})
+        self.assertEqual((response.status_code, body), (200, self.data))
+        last_modified = self.get()[0]['Last-Modified']
+        self.assertEqual(self.get(Range='bytes=0-9', **{'If-Range': last_modified})[0].status_code, 206)
+
+    def test_if_none_match(self):
+        response, body = self.get(**{'If-None-Match': f'"other", {self.etag}'})
+        self.assertEqual((response.status_code, body), (304, b''))
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(self.get(**{'If-None-Match': '"other"'})[0].status_code, 200)
+
+    def test_proxy_hand_offs(self):
+        name = self.task_file.file.name
+        with self.settings(MEDIA_DELIVERY='x-accel', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response, body = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f"/protected-media/{name}")
+        self.assertEqual(body, b'')
+        with self.settings(MEDIA_DELIVERY='x-sendfile'):
+            response, body = self.get()
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media, name))
+        self.assertEqual(body, b'')
+        self.assertIn('notes.txt', response['Content-Disposition'])
+        # Access is checked before any hand-off
+        self.client.force_login(self.other_student)
+        with self.settings(MEDIA_DELIVERY='x-accel'):
+            self.assertEqual(self.get()[0].status_code, 404)
+
+    def test_legacy_names_are_quoted_for_nginx(self):
+        name = 'task_uploads/rapport final #1?ü%.pdf'
+        os.makedirs(os.path.join(self.media, 'task_uploads'))
+        with open(os.path.join(self.media, name), 'wb') as f:
+            f.write(b'%PDF')
+        legacy = TaskFile.objects.create(task=self.task, uploaded_by=self.student, file=name)
+        with self.settings(MEDIA_DELIVERY='x-accel', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(reverse('task_file_download', args=[legacy.pk]))
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/task_uploads/rapport%20final%20%231%3F%C3%BC%25.pdf'
+        )
+
+    def test_only_safe_types_are_inline(self):
+        for filename, inline in (('page.html', False), ('drawing.svg', False), ('notes.txt', False),
+                                 ('photo.png', True), ('essay.pdf', True)):
+            upload = SimpleUploadedFile(filename, b'<script>x</script>')
+            task_file = uploads.store_upload(upload, self.task, self.student)
+            for mode in ('python', 'x-accel', 'x-sendfile'):
+                with self.settings(MEDIA_DELIVERY=mode):
+                    response = self.client.get(reverse('task_file_download', args=[task_file.pk]))
+                disposition = response['Content-Disposition']
+                self.assertEqual(disposition.startswith('inline'), inline, (filename, mode))
+                self.assertEqual(disposition.startswith('attachment'), not inline, (filename, mode))
+                self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        self.assertEqual(self.get(**{'If-None-Match': self.etag})[0]['X-Content-Type-Options'], 'nosniff')
+
+
+class SeedAndBenchmarkTests(TransactionTestCase):
+    """
+    seed_data builds a consistent dataset and benchmark_views reports on it.
+    The login scenario authenticates on aio.hash_pool's own connections, so
+    the seeded rows are committed.
+    """
+
+    def setUp(self):
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media))
+        cache.clear()
+        roles.get_cache().clear()
+        out = io.StringIO()
+        call_command(
+            'seed_data', teachers=2, students=9, tasks=40, class_size=3, files=0.5, prefix='t', batch_size=7,
+            stdout=out,
+        )
+        self.output = out.getvalue()
+
+    def test_seed_data(self):
+        assignments = Task.assigned_to.through.objects.count()
+        files = TaskFile.objects.count()
+        self.assertIn(
+            f"Created 2 teachers, 9 students, 40 tasks, {assignments} assignments and {files} files "
+            "(password 'seed-pass').",
+            self.output,
+        )
+        self.assertEqual(Task.objects.count(), 40)
+        self.assertEqual(roles.get_role(User.objects.get(username='t-teacher-1')), roles.TEACHER)
+        self.assertEqual(User.objects.filter(username__startswith='t-student-', groups__name='Student').count(), 9)
+        self.assertTrue(self.client.login(username='t-student-0', password='seed-pass'))
+        self.assertGreater(files, 0)
+        self.assertLessEqual(FileBlob.objects.count(), 20)
+        self.assertEqual(counters.stored_counts(), counters.actual_counts())
+        word = Task.objects.first().title.split()[0]
+        self.assertTrue(get_search_backend().search(Task.objects.all(), word).exists())
+
+        with self.assertRaisesMessage(CommandError, "Users named t-* already exist"):
+            call_command('seed_data', prefix='t', stdout=io.StringIO())
+
+    def test_benchmark_report(self):
+        out = io.StringIO()
+        scenarios = ['task_list', 'task_list_search', 'dashboard_student', 'task_update']
+        call_command('benchmark_views', prefix='t', requests=4, warmup=1, only=scenarios, label='abc',
+                     stdout=out, stderr=io.StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['label'], 'abc')
+        self.assertEqual(report['dataset']['tasks'], 40)
+        self.assertEqual(list(report['scenarios']), scenarios)
+        for name, result in report['scenarios'].items():
+            self.assertEqual(result['status_codes'], {'200': 4}, name)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_per_request'], 0)
+
+        path = os.path.join(self.media, 'report.json')
+        call_command('benchmark_views', prefix='t', requests=1, warmup=0, only=['task_list'], output=path,
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        with open(path) as f:
+            self.assertEqual(list(json.load(f)['scenarios']), ['task_list'])
+
+        # The login scenario posts far more often than RATE_LIMITS allow
+        with self.settings(RATE_LIMITS={'login': {'ip': (2, 60), 'username': (2, 60)}}):
+            call_command('benchmark_views', prefix='t', requests=3, warmup=1, only=['login'], output=path,
+                         stdout=io.StringIO(), stderr=io.StringIO())
+        with open(path) as f:
+            self.assertEqual(json.load(f)['scenarios']['login']['status_codes'], {'302': 3})
+
+        with self.assertRaisesMessage(CommandError, "Unknown scenario(s): nope"):
+            call_command('benchmark_views', prefix='t', only=['nope'], stderr=io.StringIO())
+        with self.assertRaisesMessage(CommandError, "No user other-teacher-0"):
+            call_command('benchmark_views', prefix='other', stderr=io.StringIO())
+
+
+class RoleCacheTests(SeededTestCase):
+    """Role changes reach the next request; nothing is kept per process."""
+
+    def test_role_change_is_seen_on_the_next_request(self):
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(reverse('task_create')).status_code, 200)
+
+        self.teacher.groups.clear()
+        self.assertNotEqual(self.client.get(reverse('task_create')).status_code, 200)
+
+        Group.objects.get(name='Student').user_set.add(self.teacher)
+        self.assertEqual(roles.get_role(self.teacher), roles.STUDENT)
+
+    def test_group_ids_live_in_the_shared_cache(self):
+        teachers = roles.get_group_id(roles.TEACHER)
+        self.assertEqual(roles.get_role(self.teacher), roles.TEACHER)
+        self.assertEqual(roles.get_cache().get(roles.GROUP_IDS_KEY)[roles.TEACHER], teachers)
+
+        # Recreating the group drops the ids for every worker
+        Group.objects.filter(pk=teachers).delete()
+        self.assertIsNone(roles.get_cache().get(roles.GROUP_IDS_KEY))
+        self.assertIsNone(roles.get_role(self.teacher))
+        recreated = Group.objects.create(name='Teacher')
+        self.assertEqual(roles.get_group_id(roles.TEACHER), recreated.pk)
+
+
+class RejectingBackend(BaseEmailBackend):
+    """Connects, then every send fails."""
+
+    def send_messages(self, messages):
+        raise OSError("550 mailbox unavailable")
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise OSError("Connection refused")
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_BATCH_SIZE=2, OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_SECONDS=30, OUTBOX_LEASE_SECONDS=300,
+)
+class OutboxTests(TestCase):
+    """Leases, retries with backoff, giving up and one EmailDelivery per attempt."""
+
+    def setUp(self):
+        self.emails = outbox.enqueue_many([(f"Subject {i}", "Body", [f"s{i}@example.com"], '') for i in range(3)])
+
+    def due_later(self):
+        # Move every pending email's next attempt to now, as if the backoff had passed
+        OutboundEmail.objects.filter(status=OutboundEmail.PENDING).update(next_attempt_at=timezone.now())
+
+    def test_claim_batch_leases_emails(self):
+        claimed = outbox.claim_batch(2)
+        self.assertEqual(len(claimed), 2)
+        self.assertGreater(claimed[0].next_attempt_at, timezone.now() + timedelta(seconds=290))
+        # Leased emails are skipped until the lease runs out
+        self.assertEqual([e.pk for e in outbox.claim_batch(5)], [self.emails[2].pk])
+        self.assertEqual(outbox.claim_batch(5), [])
+
+    def test_drain_sends_every_batch(self):
+        self.assertEqual(outbox.drain(), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.SENT).count(), 3)
+        self.assertEqual(EmailDelivery.objects.filter(succeeded=True).count(), 3)
+
+    @override_settings(EMAIL_BACKEND='task_management_system_app.tests.RejectingBackend')
+    def test_backoff_then_failed(self):
+        start = timezone.now()
+        self.assertEqual(outbox.drain(), (0, 3))
+        email = OutboundEmail.objects.get(pk=self.emails[0].pk)
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.PENDING, 1))
+        self.assertIn("550", email.last_error)
+        self.assertAlmostEqual((email.next_attempt_at - start).total_seconds(), 30, delta=5)
+
+        self.due_later()
+        start = timezone.now()
+        outbox.drain()
+        email.refresh_from_db()
+        self.assertAlmostEqual((email.next_attempt_at - start).total_seconds(), 60, delta=5)
+
+        self.due_later()
+        outbox.drain()
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.FAILED, attempts=3).count(), 3)
+        self.assertEqual(EmailDelivery.objects.filter(succeeded=False).count(), 9)
+        # Failed emails are never claimed again
+        self.due_later()
+        self.assertEqual(outbox.drain(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='task_management_system_app.tests.UnreachableBackend')
+    def test_unreachable_server_is_an_attempt(self):
+        self.assertEqual(outbox.drain(), (0, 2))
+        attempted = OutboundEmail.objects.filter(attempts=1)
+        self.assertEqual(attempted.count(), 2)
+        self.assertTrue(all(e.next_attempt_at > timezone.now() for e in attempted))
+        self.assertIn("Connection refused", EmailDelivery.objects.first().error)
+        # The rest of the queue waits for the next run
+        self.assertEqual(OutboundEmail.objects.filter(attempts=0).count(), 1)
+
+
+class DroppingBackend(LocMemEmailBackend):
+    """Delivers the first message of each connection, then loses the connection."""
+
+    def send_messages(self, messages):
+        if getattr(self, 'delivered', False):
+            raise SMTPServerDisconnected("Connection unexpectedly closed")
+        self.delivered = True
+        return super().send_messages(messages)
+
+
+class RefusingBackend(LocMemEmailBackend):
+    def send_messages(self, messages):
+        if messages[0].to == ['other@example.com']:
+            raise SMTPRecipientsRefused({'other@example.com': (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', DIGEST_CHUNK_SIZE=2, DIGEST_MAX_ITEMS=5)
+class WeeklyDigestTests(SeededTestCase):
+    """One subtask per DIGEST_CHUNK_SIZE students, one email per student, nobody twice."""
+
+    def setUp(self):
+        super().setUp()
+        # Run subtasks in-process without touching the broker
+        self.enterContext(mock.patch.object(tasks.send_digest_batch, 'delay', tasks.send_digest_batch))
+        third = User.objects.create_user('third', 'third@example.com', 'pass')
+        third.groups.add(Group.objects.get(name='Student'))
+        Task.objects.filter(status='pending').first().assigned_to.add(third)
+        self.student_ids = [self.student.pk, self.other_student.pk, third.pk]
+        # Neither inactive students nor students without an address are read
+        User.objects.create_user('gone', 'gone@example.com', 'pass', is_active=False).groups.add(third.groups.get())
+        User.objects.create_user('noaddress', '', 'pass').groups.add(third.groups.get())
+
+    def recipients(self):
+        return sorted(message.to[0] for message in mail.outbox)
+
+    def test_chunks(self):
+        self.assertEqual(tasks.send_weekly_summary_email(), 2)
+        self.assertEqual(self.recipients(), ['other@example.com', 'student@example.com', 'third@example.com'])
+        digest = next(message for message in mail.outbox if message.to == ['student@example.com'])
+        self.assertEqual(digest.body.count("Essay"), 5)
+
+    def test_chunk_size_one(self):
+        with self.settings(DIGEST_CHUNK_SIZE=1):
+            self.assertEqual(tasks.send_weekly_summary_email(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_retry_only_the_undelivered(self):
+        with self.settings(EMAIL_BACKEND='task_management_system_app.tests.DroppingBackend'), \
+                mock.patch.object(tasks.send_digest_batch, 'retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                tasks.send_digest_batch(self.student_ids)
+        self.assertEqual(len(mail.outbox), 1)
+        undelivered = retry.call_args.kwargs['args'][0]
+        self.assertEqual(len(undelivered), 2)
+        self.assertIsInstance(retry.call_args.kwargs['exc'], SMTPServerDisconnected)
+
+        # The retry sends the rest; every student has exactly one digest
+        self.assertEqual(tasks.send_digest_batch(undelivered), 2)
+        self.assertEqual(self.recipients(), ['other@example.com', 'student@example.com', 'third@example.com'])
+
+    @override_settings(EMAIL_BACKEND='task_management_system_app.tests.RefusingBackend')
+    def test_refused_address_is_not_retried(self):
+        with mock.patch.object(tasks.send_digest_batch, 'retry') as retry:
+            self.assertEqual(tasks.send_digest_batch(self.student_ids), 2)
+        retry.assert_not_called()
+        self.assertEqual(self.recipients(), ['student@example.com', 'third@example.com'])
+
+
+class TokenSweeperTests(TestCase):
+    """Expired / used tokens and abandoned sign-ups go; everything live stays."""
+
+    def register(self, username, expires_in, verified=False, active=False):
+        user = User.objects.create_user(username, f"{username}@example.com", 'pass', is_active=active)
+        EmailVerification.objects.create(
+            user=user, expires_at=timezone.now() + expires_in, is_verified=verified
+        )
+        return user
+
+    def test_sweep(self):
+        past, future = timedelta(days=-2), timedelta(hours=1)
+        abandoned = [self.register(f"gone{n}", past) for n in range(5)]
+        verified = self.register('verified', past, verified=True, active=True)
+        pending = self.register('pending', future)
+        activated = self.register('activated', past, active=True)
+
+        live = PasswordResetToken.objects.create(user=verified)
+        PasswordResetToken.objects.create(user=verified, expires_at=timezone.now() + past)
+        PasswordResetToken.objects.create(user=verified, is_used=True)
+
+        removed = sweeper.sweep_expired_tokens(batch_size=2, pause=0)
+
+        self.assertEqual(removed, {'password_reset_tokens': 2, 'email_verifications': 6, 'unverified_users': 5})
+        self.assertFalse(User.objects.filter(pk__in=[u.pk for u in abandoned]).exists())
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'verified', 'pending', 'activated'})
+        self.assertEqual(set(EmailVerification.objects.values_list('user__username', flat=True)), {'verified', 'pending'})
+        self.assertEqual(list(PasswordResetToken.objects.all()), [live])
+
+
+class ArchiveTests(SeededTestCase):
+    """Old completed tasks move to the archive and back without losing anything."""
+
+    def setUp(self):
+        super().setUp()
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media))
+        self.done = Task.objects.filter(status='completed').order_by('id')
+        self.task = self.done.first()
+        self.task_file = uploads.store_upload(SimpleUploadedFile('notes.txt', b'notes'), self.task, self.student)
+        # update() skips auto_now, so the tasks really look untouched for 200 days
+        self.done.update(updated_at=timezone.now() - timedelta(days=200))
+
+    def test_archive_and_restore(self):
+        recent = self.done.last()
+        recent.save()
+        assignees = set(self.task.assigned_to.values_list('id', flat=True))
+        before = counters.stored_counts()
+
+        moved = archive.archive_completed(older_than_days=180, batch_size=30, pause=0)
+
+        self.assertEqual(moved, 99)
+        self.assertEqual(list(Task.objects.filter(status='completed')), [recent])
+        archived = ArchivedTask.objects.get(pk=self.task.pk)
+        self.assertEqual((archived.title, archived.created_at), (self.task.title, self.task.created_at))
+        self.assertEqual(set(archived.assigned_to.values_list('id', flat=True)), assignees)
+        self.assertEqual(ArchivedTaskFile.objects.get().pk, self.task_file.pk)
+        self.assertEqual(TaskTombstone.objects.filter(task_id=self.task.pk).count(), 1 + len(assignees))
+        # Still counted, and the counters agree with a rebuild
+        self.assertEqual(counters.stored_counts(), before)
+        self.assertEqual(counters.actual_counts(), before)
+
+        self.assertEqual(archive.restore([self.task.pk, 0]), [self.task.pk])
+        task = Task.objects.get(pk=self.task.pk)
+        self.assertEqual(task.created_at, self.task.created_at)
+        self.assertGreater(task.updated_at, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(set(task.assigned_to.values_list('id', flat=True)), assignees)
+        self.assertEqual(list(task.files.all()), [self.task_file])
+        self.assertFalse(ArchivedTask.objects.filter(pk=task.pk).exists())
+        self.assertEqual(counters.actual_counts(), before)
+
+    def test_include_archived_listing(self):
+        archive.archive_completed(pause=0)
+        self.client.force_login(self.teacher)
+        active = self.client.get('/task-list/').context['page']
+        self.assertNotIn(self.task.pk, [task.pk for task in active])
+
+        seen, cursor = [], None
+        while True:
+            params = {'archived': '1', **({'cursor': cursor} if cursor else {})}
+            page = self.client.get('/task-list/', params).context['page']
+            seen += [task.pk for task in page]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = Task.objects.order_by('-created_at', 'id').values_list('id', flat=True)
+        self.assertEqual(len(seen), 300)
+        self.assertEqual(set(seen), set(expected) | set(ArchivedTask.objects.values_list('id', flat=True)))
+
+        found = self.client.get('/task-list/', {'archived': '1', 'search': self.task.title})
+        self.assertIn(self.task.pk, [task.pk for task in found.context['page']])
+        self.assertContains(found, reverse('archived_task_detail', args=[self.task.pk]))
+
+    def test_archived_task_access(self):
+        assignee = self.task.assigned_to.get()
+        archive.archive_completed(pause=0)
+        outsider = self.other_student if assignee == self.student else self.student
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(reverse('archived_task_detail', args=[self.task.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('archived_file_download', args=[self.task_file.pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('archived_task_restore', args=[self.task.pk])).status_code, 302)
+        self.assertTrue(ArchivedTask.objects.filter(pk=self.task.pk).exists())
+
+        self.client.force_login(assignee)
+        self.assertContains(self.client.get(reverse('archived_task_detail', args=[self.task.pk])), 'notes.txt')
+        response = self.client.get(reverse('archived_file_download', args=[self.task_file.pk]))
+        self.assertEqual(b''.join(response.streaming_content), b'notes')
+
+        self.client.force_login(self.teacher)
+        self.client.post(reverse('archived_task_restore', args=[self.task.pk]))
+        self.assertTrue(Task.objects.filter(pk=self.task.pk).exists())
+
+
+class ActivityTests(SeededTestCase):
+    """Committed changes land in the activity log after the request, in batches."""
+
+    def setUp(self):
+        super().setUp()
+        self.media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=self.media))
+
+    def post(self, user, url, data):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data)
+
+    def test_timelines(self):
+        self.post(self.teacher, reverse('task_create'), {
+            'title': 'Lab report', 'description': '', 'status': 'pending', 'due_date': '2030-02-01',
+            'assigned_to': [self.student.pk],
+        })
+        task = Task.objects.latest('id')
+        # The test runs commit hooks after the request finished, so its rows wait in the buffer
+        self.assertFalse(TaskActivity.objects.exists())
+        self.post(self.student, reverse('task_update', args=[task.pk]), {
+            'status': 'completed', 'file': SimpleUploadedFile('report.pdf', b'%PDF'),
+        })
+        # ...until the next request finished; then one INSERT per flush
+        self.assertEqual(TaskActivity.objects.count(), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(activity.flush(), 2)
+
+        self.post(self.teacher, reverse('task_delete', args=[task.pk]), {})
+        activity.flush()
+        self.assertEqual(
+            [(e.action, e.actor_id) for e in activity.task_timeline(task.pk).order_by(*activity.ORDERING)],
+            [
+                (TaskActivity.DELETED, self.teacher.pk),
+                (TaskActivity.FILE_UPLOADED, self.student.pk),
+                (TaskActivity.STATUS_CHANGED, self.student.pk),
+                (TaskActivity.ASSIGNED, self.teacher.pk),
+                (TaskActivity.CREATED, self.teacher.pk),
+            ],
+        )
+        status = activity.user_timeline(self.student.pk).get(action=TaskActivity.STATUS_CHANGED)
+        self.assertEqual(status.detail, {'old': 'pending', 'new': 'completed'})
+        with self.assertRaises(ValueError):
+            status.save()
+
+        plan = str(activity.task_timeline(task.pk).order_by(*activity.ORDERING)[:50].explain())
+        self.assertIn('activity_task_idx', plan)
+
+        self.client.force_login(self.teacher)
+        page = self.client.get(reverse('user_activity', args=[self.teacher.pk])).context['page']
+        assigned = next(e for e in page if e.action == TaskActivity.ASSIGNED)
+        self.assertEqual(assigned.students, ['student'])
+
+    def test_rolled_back_changes_are_not_logged(self):
+        task = self.student.tasks_assigned.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                task.status = 'completed'
+                task.save()
+                raise RuntimeError
+        self.assertEqual(activity.flush(), 0)
+
+
+class InboxTests(SeededTestCase):
+    """Saving a TaskForm fans out inbox rows; the unread badge follows without counting rows."""
+
+    def save_task(self, url, **data):
+        self.client.force_login(self.teacher)
+        form = {'title': 'Lab report', 'description': '', 'status': 'pending', 'due_date': '2030-02-01', **data}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, form)
+
+    def inbox_of(self, user):
+        return list(inbox.notifications_for(user).order_by('id').values_list('verb', 'unread'))
+
+    def test_fan_out_and_unread_counts(self):
+        both = [self.student.pk, self.other_student.pk]
+        self.save_task(reverse('task_create'), assigned_to=both)
+        task = Task.objects.latest('id')
+        self.assertEqual(self.inbox_of(self.other_student), [(inbox.ASSIGNED, True)])
+
+        # Only a reassignment: the student who stays assigned hears nothing
+        self.save_task(reverse('task_update', args=[task.pk]), assigned_to=[self.student.pk])
+        self.save_task(reverse('task_update', args=[task.pk]), assigned_to=[self.student.pk], title='Lab report v2')
+        self.assertEqual(self.inbox_of(self.student), [(inbox.ASSIGNED, True), (inbox.UPDATED, True)])
+        self.assertEqual(len(self.inbox_of(self.other_student)), 1)
+
+        self.assertEqual(inbox.unread_count(self.student), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(inbox.unread_count(self.student), 2)
+
+        self.client.force_login(self.student)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('inbox_mark_all_read'))
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE') and 'notifications_notification' in q['sql']]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(inbox.unread_count(self.student), 0)
+        self.assertEqual(inbox.unread_count(self.other_student), 1)
+
+    def test_badge_change_revalidates_listing(self):
+        inbox.notify_task(Task.objects.first(), self.teacher, {self.student.pk: inbox.ASSIGNED})
+        self.client.force_login(self.student)
+        etag = self.client.get('/task-list/')['ETag']
+        self.assertEqual(self.client.get('/task-list/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # Follow the redirect so the flash message is shown and cleared
+            self.client.post(reverse('inbox_mark_all_read'), follow=True)
+        # No task changed, but the page's unread badge did
+        self.assertEqual(self.client.get('/task-list/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(INBOX_PAGE_SIZE=2)
+    def test_pages_and_open(self):
+        tasks = self.student.tasks_assigned.order_by('id')[:3]
+        for task in tasks:
+            inbox.notify_task(task, self.teacher, {self.student.pk: inbox.ASSIGNED})
+        self.client.force_login(self.student)
+
+        first = self.client.get(reverse('inbox'))
+        self.assertEqual([n.description for n in first.context['page']], [tasks[2].title, tasks[1].title])
+        second = self.client.get(reverse('inbox'), {'cursor': first.context['page'].next_cursor})
+        self.assertEqual([n.description for n in second.context['page']], [tasks[0].title])
+        self.assertFalse(second.context['page'].has_next)
+
+        notification = second.context['page'].object_list[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(reverse('inbox_open', args=[notification.pk]))
+        self.assertRedirects(response, reverse('task_update', args=[tasks[0].pk]), fetch_redirect_response=False)
+        self.assertEqual(inbox.unread_count(self.student), 2)
+        # Someone else's notification is not found
+        self.client.force_login(self.other_student)
+        self.assertEqual(self.client.get(reverse('inbox_open', args=[notification.pk])).status_code, 404)
+
+
+@override_settings(REMINDER_WINDOWS={'48h': 48, '2h': 2}, REMINDER_OVERDUE_DAYS=7)
+class ReminderTests(TestCase):
+    """One email per student per window, each task reminded of once."""
+
+    def setUp(self):
+        self.today = date(2031, 3, 10)
+        self.student = User.objects.create_user('student', 'student@example.com', 'pass')
+        no_email = User.objects.create_user('noemail', '', 'pass')
+        self.tasks = {}
+        for name, days, status in [
+            ('today', 0, 'pending'), ('tomorrow', 1, 'in_progress'), ('later', 5, 'pending'),
+            ('late', -2, 'pending'), ('long_late', -30, 'pending'), ('done', 1, 'completed'),
+        ]:
+            task = Task.objects.create(title=name, status=status, due_date=self.today + timedelta(days=days))
+            task.assigned_to.add(self.student, no_email)
+            self.tasks[name] = task
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, clock(hour, minute)))
+
+    def reminded(self):
+        names = {task.pk: name for name, task in self.tasks.items()}
+        return {
+            (window, names[task_id])
+            for task_id, window in TaskReminder.objects.filter(user=self.student).values_list('task_id', 'window')
+        }
+
+    def test_windows_and_dedupe(self):
+        self.assertEqual(reminders.send_due_reminders(self.at(self.today, 22, 30)), {'2h': 1, '48h': 1, 'overdue': 1})
+        self.assertEqual(self.reminded(), {('2h', 'today'), ('48h', 'tomorrow'), ('overdue', 'late')})
+        self.assertEqual(list(OutboundEmail.objects.values_list('to', flat=True)), [['student@example.com']] * 3)
+
+        # Nothing new later that night
+        self.assertEqual(reminders.send_due_reminders(self.at(self.today, 23, 45)), {'2h': 0, '48h': 0, 'overdue': 0})
+        # The next evening "tomorrow" is within 2h and "today" has become overdue
+        report = reminders.send_due_reminders(self.at(self.today + timedelta(days=1), 22, 15))
+        self.assertEqual(report, {'2h': 1, '48h': 0, 'overdue': 1})
+        self.assertIn(('2h', 'tomorrow'), self.reminded())
+        self.assertIn(('overdue', 'today'), self.reminded())
+        self.assertEqual(OutboundEmail.objects.count(), 5)
+
+    def test_one_scan_per_window(self):
+        with CaptureQueriesContext(connection) as queries:
+            reminders.send_due_reminders(self.at(self.today, 22, 30))
+        scans = [q['sql'] for q in queries.captured_queries if 'BETWEEN' in q['sql']]
+        self.assertEqual(len(scans), 3)
+
+
+@override_settings(DATABASE_REPLICAS=['replica-a', 'replica-b'], REPLICA_MAX_LAG_SECONDS=10)
+class ReplicaRouterTests(SeededTestCase):
+    """Reads in replica_reads views go to a fresh replica unless the session just wrote."""
+
+    def setUp(self):
+        super().setUp()
+        replicas.record_lag('replica-a', 2.0)
+        replicas.record_lag('replica-b', 60.0)
+        self.addCleanup(replicas._lag.clear)
+        self.router = replicas.ReplicaRouter()
+
+    def read_db(self, request):
+        return replicas.replica_reads(lambda request: self.router.db_for_read(Task))(request)
+
+    def test_routing(self):
+        request = RequestFactory().get('/task-list/')
+        request.session = {}
+        self.assertEqual(self.read_db(request), 'replica-a')
+        # Outside those views and for writes: the primary
+        self.assertIsNone(self.router.db_for_read(Task))
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+
+        request.session[replicas.PIN_KEY] = time.time() + 5
+        self.assertEqual(self.read_db(request), 'default')
+        replicas.record_lag('replica-a', None)
+        request.session = {}
+        self.assertEqual(self.read_db(request), 'default')
+
+    def test_writes_pin_the_session(self):
+        self.client.force_login(self.teacher)
+        self.assertNotIn(replicas.PIN_KEY, self.client.session)
+        response = self.client.post('/create/', {'title': 'New', 'status': 'pending', 'assigned_to': [self.student.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertGreater(self.client.session[replicas.PIN_KEY], time.time())
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_lag_from_heartbeat(self):
+        # Unknown until the first heartbeat
+        self.assertIsNone(replicas.measure_lag('default'))
+        replicas.beat()
+        self.assertEqual(replicas.measure_lag('default'), 0.0)
+
+
+@override_settings(RATE_LIMITS={'login': {'ip': (100, 60), 'username': (3, 60)}, 'forgot_password': {'ip': (2, 60)}})
+class RateLimitTests(TestCase):
+    """Requests over the limit are turned away before any hashing or lookups."""
+
+    def setUp(self):
+        ratelimit.get_cache().clear()
+
+    def test_login_limited_per_username(self):
+        User.objects.create_user('victim', 'victim@example.com', 'right')
+        for _ in range(3):
+            self.assertEqual(self.client.post('/login/', {'username': 'victim', 'password': 'wrong'}).status_code, 200)
+        with QueryStats() as stats:
+            response = self.client.post('/login/', {'username': 'Victim', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(stats.count, 0)
+        # Other accounts from the same address are unaffected
+        self.assertEqual(self.client.post('/login/', {'username': 'someone', 'password': 'x'}).status_code, 200)
+        self.assertEqual(ratelimit.stats()['login'], {'allowed': 4, 'blocked': 1})
+
+    def test_forgot_password_limited_per_ip(self):
+        statuses = [
+            self.client.post('/forgot-password/', {'email': 'a@example.com'}, REMOTE_ADDR=address).status_code
+            for address in ('10.0.0.1', '10.0.0.1', '10.0.0.1', '10.0.0.2')
+        ]
+        self.assertEqual(statuses, [200, 200, 429, 200])
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_spoofed_forwarded_for_is_still_limited(self):
+        # Our proxy appends the real address; the client makes up the rest
+        statuses = [
+            self.client.post(
+                '/forgot-password/', {'email': f'{n}@example.com'},
+                HTTP_X_FORWARDED_FOR=f'10.9.9.{n}, 203.0.113.7', REMOTE_ADDR='127.0.0.1',
+            ).status_code
+            for n in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_TRUSTED_PROXIES=2)
+    def test_client_ip_behind_two_proxies(self):
+        factory = RequestFactory()
+        for header, expected in (('1.1.1.1, 203.0.113.7, 10.0.0.2', '203.0.113.7'), ('203.0.113.7', '203.0.113.7')):
+            self.assertEqual(ratelimit.client_ip(factory.get('/', HTTP_X_FORWARDED_FOR=header)), expected)
+        self.assertEqual(ratelimit.client_ip(factory.get('/', REMOTE_ADDR='10.0.0.3')), '10.0.0.3')
+
+    def test_sliding_window_weights_previous_window(self):
+        values = {'ip': '10.0.0.9'}
+        for _ in range(3):
+            ratelimit.hit('login', {'username': 'bob', **values}, now=59)
+        # Half of the previous minute still counts: 3 * 0.5 + 1 <= 3
+        self.assertEqual(ratelimit.hit('login', {'username': 'bob', **values}, now=90), 0)
+        self.assertTrue(ratelimit.hit('login', {'username': 'bob', **values}, now=90))
+
+
+class AsyncAuthTests(TransactionTestCase):
+    """
+    The async auth views end to end, with hashing in aio.hash_pool. Logins
+    read users on the pool threads' own connections, so the rows are committed.
+    """
+
+    def test_register_verify_login(self):
+        group = Group.objects.create(name='Student')
+        response = self.client.post('/register/', {
+            'username': 'newbie', 'email': 'newbie@example.com', 'group': group.pk,
+            'password1': 'correct-horse-42', 'password2': 'correct-horse-42',
+        })
+        self.assertRedirects(response, '/login/', fetch_redirect_response=False)
+        user = User.objects.get(username='newbie')
+        self.assertFalse(user.is_active)
+        self.assertTrue(check_password('correct-horse-42', user.password))
+        self.assertEqual(list(user.groups.all()), [group])
+
+        token = EmailVerification.objects.get(user=user).token
+        self.client.get(f'/verify/{token}/')
+        response = self.client.post('/login/', {'username': 'newbie', 'password': 'correct-horse-42'})
+        self.assertRedirects(response, '/task-list/', fetch_redirect_response=False)
+        self.assertEqual(self.client.get('/task-list/').status_code, 200)
+
+    def test_authenticate_upgrades_weak_hash(self):
+        weak = PBKDF2PasswordHasher().encode('secret', 'salt', iterations=1000)
+        user = User.objects.create(username='old', password=weak)
+        self.assertIsNone(async_to_sync(aio.authenticate)(None, 'old', 'wrong'))
+        self.assertIsNone(async_to_sync(aio.authenticate)(None, 'nobody', 'secret'))
+        self.assertEqual(async_to_sync(aio.authenticate)(None, 'old', 'secret'), user)
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, weak)
+        self.assertTrue(check_password('secret', user.password))
+
+    def test_failed_logins_are_signalled(self):
+        User.objects.create_user('victim', 'victim@example.com', 'right')
+        failures = []
+
+        def handler(sender, credentials, request, **kwargs):
+            failures.append((credentials['username'], request))
+
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+        self.client.post('/login/', {'username': 'victim', 'password': 'wrong'})
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0][0], 'victim')
+        self.assertEqual(failures[0][1].path, '/login/')
+
+    @override_settings(AUTHENTICATION_BACKENDS=['django.contrib.auth.backends.AllowAllUsersModelBackend'])
+    def test_configured_backends_are_used(self):
+        User.objects.create_user('dormant', 'dormant@example.com', 'pass', is_active=False)
+        user = async_to_sync(aio.authenticate)(None, 'dormant', 'pass')
+        self.assertEqual(user.backend, 'django.contrib.auth.backends.AllowAllUsersModelBackend')
+
+
+class LiveEventsTests(SeededTestCase):
+    """Committed task changes reach the teacher's and the students' event channels."""
+
+    def commit(self, change):
+        with self.captureOnCommitCallbacks(execute=True), transaction.atomic():
+            change()
+
+    async def next_event(self, subscription):
+        message = await subscription.get(1)
+        self.assertIsNotNone(message)
+        return json.loads(message)
+
+    async def test_update_unassign_and_delete(self):
+        broker = events.get_broker()
+        teacher = await broker.subscribe([events.user_channel(self.teacher.pk)])
+        student = await broker.subscribe([events.user_channel(self.student.pk)])
+        other = await broker.subscribe([events.user_channel(self.other_student.pk)])
+        try:
+            task = await self.student.tasks_assigned.afirst()
+
+            task.status = 'completed'
+            await sync_to_async(self.commit)(task.save)
+            for subscription in (teacher, student):
+                event = await self.next_event(subscription)
+                self.assertEqual((event['type'], event['id']), ('updated', task.pk))
+                self.assertIn(f'data-task-id="{task.pk}"', event['html'])
+                self.assertIn('Completed', event['html'])
+
+            await sync_to_async(self.commit)(lambda: task.assigned_to.set([self.other_student]))
+            self.assertEqual((await self.next_event(student))['type'], 'deleted')
+            self.assertEqual((await self.next_event(other))['type'], 'created')
+            self.assertEqual((await self.next_event(teacher))['type'], 'updated')
+
+            task_id = task.pk
+            await sync_to_async(self.commit)(task.delete)
+            for subscription in (teacher, other):
+                self.assertEqual(await self.next_event(subscription), {'type': 'deleted', 'id': task_id})
+            self.assertIsNone(await student.get(0.05))
+        finally:
+            for subscription in (teacher, student, other):
+                await subscription.close()
+
+    async def test_stream_and_rolled_back_changes(self):
+        subscription = await events.get_broker().subscribe([events.user_channel(self.student.pk)])
+        first, second = [task async for task in self.student.tasks_assigned.order_by('id')[:2]]
+
+        def rolled_back():
+            with transaction.atomic():
+                first.title = "Never happened"
+                first.save()
+                transaction.set_rollback(True)
+        await sync_to_async(rolled_back)()
+        # The queued change goes out with the next commit, re-read from the rows
+        await sync_to_async(self.commit)(second.save)
+        with self.settings(TASK_EVENTS_HEARTBEAT_SECONDS=0.05):
+            chunks = [chunk async for chunk in events.stream(subscription, max_seconds=0.12)]
+
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        sent = [json.loads(chunk.split('data: ')[1]) for chunk in chunks if chunk.startswith('event: task.updated')]
+        self.assertEqual({event['id'] for event in sent}, {first.pk, second.pk})
+        self.assertFalse(any("Never happened" in event['html'] for event in sent))
+        self.assertIn(': keep-alive\n\n', chunks)
+        self.assertFalse(events.get_broker().has_listeners())
+
+    def test_wsgi_requests_are_told_not_to_reconnect(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get('/events/tasks/').status_code, 204)
@@ -0,0 +1,188 @@
+"""
+Content-addressed storage for task uploads.
+
+Every upload is hashed (SHA-256) while it is written to disk and then
+stored once as ``blobs/<aa>/<bb>/<sha256>``; a second upload of the same
+bytes only adds a ``TaskFile`` row pointing at the existing ``FileBlob``.
+
+Large files use the resumable protocol in ``views.py``: the client opens an
+``UploadSession``, sends chunks with an ``Upload-Offset`` header and, after
+a dropped connection, asks for the current offset and carries on from there.
+"""
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import FileBlob, TaskFile, UploadSession
+
+READ_SIZE = 64 * 1024
+# Running hashes of in-progress sessions handled by this process. A chunk
+# that lands on another worker (or after a restart) falls back to hashing
+# the part file once when the upload completes.
+_hashers = OrderedDict()
+MAX_HASHERS = 256
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def blob_name(sha256):
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def media_path(name):
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def part_path(session):
+    return media_path(f"upload_parts/{session.pk}.part")
+
+
+def adopt_blob(path, sha256, size):
+    """Move a fully written file into blob storage, or drop it if the blob exists."""
+    blob = FileBlob.objects.filter(sha256=sha256).first()
+    if blob:
+        os.remove(path)
+        return blob, False
+
+    name = blob_name(sha256)
+    os.makedirs(os.path.dirname(media_path(name)), exist_ok=True)
+    os.replace(path, media_path(name))
+    try:
+        with transaction.atomic():
+            return FileBlob.objects.create(sha256=sha256, size=size, file=name), True
+    except IntegrityError:
+        # Same bytes finished at the same moment elsewhere; both wrote the same file
+        return FileBlob.objects.get(sha256=sha256), False
+
+
+def store_upload(uploaded_file, task, user):
+    """Hash a regular (non-chunked) upload while spooling it to disk, then dedupe."""
+    directory = media_path('upload_parts')
+    os.makedirs(directory, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as tmp:
+        for chunk in uploaded_file.chunks(READ_SIZE):
+            hasher.update(chunk)
+            tmp.write(chunk)
+            size += len(chunk)
+    blob, _ = adopt_blob(tmp.name, hasher.hexdigest(), size)
+    return TaskFile.objects.create(
+        task=task, uploaded_by=user, blob=blob, file=blob.file.name, original_name=uploaded_file.name
+    )
+
+
+def start_session(task, user, filename, size):
+    if size <= 0 or size > settings.UPLOAD_MAX_BYTES:
+        raise UploadError(f"File size must be between 1 and {settings.UPLOAD_MAX_BYTES} bytes.")
+    session = UploadSession.objects.create(
+        task=task, uploaded_by=user, filename=os.path.basename(filename)[:255], size=size
+    )
+    os.makedirs(os.path.dirname(part_path(session)), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    _hashers[session.pk] = (0, hashlib.sha256())
+    return session
+
+
+def _hasher_for(session):
+    offset, hasher = _hashers.get(session.pk, (None, None))
+    return hasher if offset == session.received else None
+
+
+def append_chunk(session_id, user, offset, stream, length):
+    """
+    Append `length` bytes from `stream` at `offset`. The session row is locked
+    for the duration so two requests cannot interleave their writes.
+    """
+    if length <= 0 or length > settings.UPLOAD_CHUNK_MAX_BYTES:
+        raise UploadError(f"Chunks must be between 1 and {settings.UPLOAD_CHUNK_MAX_BYTES} bytes.")
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(pk=session_id, uploaded_by=user).first()
+        if session is None:
+            raise UploadError("Upload not found.", status=404)
+        if session.is_complete:
+            raise UploadError("Upload already complete.", status=409)
+        if offset != session.received:
+            raise UploadError(f"Expected offset {session.received}.", status=409)
+        if session.received + length > session.size:
+            raise UploadError("Chunk runs past the declared file size.")
+
+        hasher = _hasher_for(session)
+        written = 0
+        with open(part_path(session), 'r+b') as part:
+            # Drop bytes left behind by a request that died before it was recorded
+            part.truncate(session.received)
+            part.seek(session.received)
+            while written < length:
+                data = stream.read(min(READ_SIZE, length - written))
+                if not data:
+                    break
+                part.write(data)
+                if hasher:
+                    hasher.update(data)
+                written += len(data)
+
+        session.received += written
+        session.save(update_fields=['received', 'updated_at'])
+        if hasher:
+            _remember(session.pk, session.received, hasher)
+        else:
+            _hashers.pop(session.pk, None)
+
+        if session.received == session.size:
+            finish(session, hasher)
+    return session
+
+
+def _remember(session_id, offset, hasher):
+    _hashers[session_id] = (offset, hasher)
+    _hashers.move_to_end(session_id)
+    while len(_hashers) > MAX_HASHERS:
+        _hashers.popitem(last=False)
+
+
+def finish(session, hasher=None):
+    if hasher is None:
+        hasher = hashlib.sha256()
+        with open(part_path(session), 'rb') as part:
+            while data := part.read(READ_SIZE):
+                hasher.update(data)
+    _hashers.pop(session.pk, None)
+
+    blob, _ = adopt_blob(part_path(session), hasher.hexdigest(), session.size)
+    session.task_file = TaskFile.objects.create(
+        task=session.task, uploaded_by=session.uploaded_by, blob=blob,
+        file=blob.file.name, original_name=session.filename,
+    )
+    session.save(update_fields=['task_file', 'updated_at'])
+
+
+def purge_stale_sessions():
+    """Delete unfinished sessions (and their .part files) idle past UPLOAD_SESSION_TTL."""
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    return discard_sessions(UploadSession.objects.filter(task_file=None, updated_at__lt=cutoff))
+
+
+def discard_sessions(sessions):
+    """Delete upload sessions and the .part files of unfinished ones; returns how many."""
+    removed = 0
+    for session in sessions.iterator():
+        if not session.is_complete:
+            try:
+                os.remove(part_path(session))
+            except FileNotFoundError:
+                pass
+        removed += 1
+    sessions.delete()
+    return removed
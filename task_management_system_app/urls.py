@@ -1,7 +1,14 @@
-from django.urls import path
-from . import views
-from django.conf import settings
-from django.conf.urls.static import static
+from django.urls import include, path, re_path
+from . import api, views
+
+api_urlpatterns = [
+    path('auth/login/', api.LoginView.as_view(), name='api_login'),
+    path('auth/logout/', api.LogoutView.as_view(), name='api_logout'),
+    path('auth/logoutall/', api.LogoutAllView.as_view(), name='api_logout_all'),
+    path('tasks/', api.TaskListView.as_view(), name='api_task_list'),
+    path('tasks/changes/', api.TaskChangesView.as_view(), name='api_task_changes'),
+    path('tasks/<int:pk>/', api.TaskDetailView.as_view(), name='api_task_detail'),
+]
 
 urlpatterns = [
     path('', views.home_view, name='home'),
@@ -13,12 +20,30 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout_view'),
 
     path('task-list/', views.task_list, name='task_list'),
+    path('events/tasks/', views.task_events, name='task_events'),
+    path('export/', views.task_export, name='task_export'),
     path('create/', views.task_create, name='task_create'),
+    path('bulk-create/', views.task_bulk_create, name='task_bulk_create'),
     path('<int:pk>/edit/', views.task_update, name='task_update'),
     path('<int:pk>/delete/', views.task_delete, name='task_delete'),
+    path('<int:pk>/assign/', views.task_assign, name='task_assign'),
+    path('<int:pk>/activity/', views.task_activity, name='task_activity'),
+    path('users/<int:pk>/activity/', views.user_activity, name='user_activity'),
+    path('<int:pk>/uploads/', views.upload_start, name='upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('files/<int:pk>/', views.task_file_download, name='task_file_download'),
+    path('archive/<int:pk>/', views.archived_task_detail, name='archived_task_detail'),
+    path('archive/<int:pk>/restore/', views.archived_task_restore, name='archived_task_restore'),
+    path('archive/files/<int:pk>/', views.archived_file_download, name='archived_file_download'),
+    path('inbox/', views.inbox_view, name='inbox'),
+    path('inbox/<int:pk>/', views.inbox_open, name='inbox_open'),
+    path('inbox/read/', views.inbox_mark_all_read, name='inbox_mark_all_read'),
     path('verify/<uuid:token>/', views.verify_email, name='verify_email'),
 
     path('forgot-password/', views.forgot_password_view, name='forgot_password'),
     path('reset-password/<uuid:token>/', views.reset_password_view, name='reset_password'),
-    
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+    # Versioned JSON API
+    re_path(r'^api/(?P<version>v1)/', include(api_urlpatterns)),
+
+]
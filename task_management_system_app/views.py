@@ -1,144 +1,196 @@
+import json
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth import authenticate, login, logout
+from asgiref.sync import sync_to_async
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from .forms import *
 from .models import *
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from datetime import timedelta
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import send_mail
-from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date
+from . import activity, aio, archive, bulk, counters, downloads, events, export, fragments, inbox, outbox, uploads
+from .conditional import conditional_listing
+from .roles import STUDENT, TEACHER
+from .pagination import DEFAULT_ORDERING, akeyset_paginate, akeyset_paginate_merged, keyset_paginate
+from .ratelimit import rate_limited
+from .replicas import replica_reads
+from .search import get_search_backend
 
 
 def home_view(request):
     return render(request, 'base.html')
 
-@login_required
-def dashboard_view(request):
-    """Dashboard for Teacher or Student"""
-    user = request.user
-
-    if user_in_group(user, 'Teacher'):
+# ✅ Task sets behind each listing (also what the conditional-GET validators cover)
+def dashboard_tasks(user):
+    if user.role == TEACHER:
         # Show tasks created by this teacher
-        tasks = Task.objects.filter(created_by=user).select_related('assigned_to')
-        dashboard_type = 'teacher'
-    elif user_in_group(user, 'Student'):
+        return Task.objects.filter(created_by=user)
+    if user.role == STUDENT:
         # Show tasks assigned to this student
-        tasks = Task.objects.filter(assigned_to=user).select_related('created_by')
-        dashboard_type = 'student'
-    else:
-        tasks = Task.objects.none()
-        dashboard_type = 'none'
-
-    return render(request, 'dashboard.html', {
-        'tasks': tasks,
-        'dashboard_type': dashboard_type,
-    })
+        return Task.objects.filter(assigned_to=user)
+    return Task.objects.none()
+
+
+def listed_tasks(user):
+    # Teachers see every task, students only their assigned ones
+    if user.role == TEACHER:
+        return Task.objects.all()
+    if user.role == STUDENT:
+        return Task.objects.filter(assigned_to=user)
+    return Task.objects.none()
+
+
+def archived_tasks(user):
+    # The archived counterpart of listed_tasks (see archive.py)
+    if user.role == TEACHER:
+        return ArchivedTask.objects.all()
+    if user.role == STUDENT:
+        return ArchivedTask.objects.filter(assigned_to=user)
+    return ArchivedTask.objects.none()
+
+
+# ⚡ Async views (dashboard, task list, auth): the ORM is awaited; templates,
+# the row cache and transaction blocks run via sync_to_async and password
+# hashing in aio.hash_pool. See aio.py.
+@aio.login_required
+@replica_reads
+@conditional_listing(dashboard_tasks)
+async def dashboard_view(request):
+    """Dashboard for Teacher or Student"""
+    user = request.user
+    tasks = dashboard_tasks(user)
+
+    page = await akeyset_paginate(
+        tasks.for_listing(), request.GET.get('cursor'), settings.TASK_PAGE_SIZE, request.GET
+    )
+    context = {
+        'rows': await sync_to_async(fragments.render_rows)(page, 'dashboard', user.role),
+        'page': page,
+        'dashboard_type': user.role or 'none',
+    }
+    if is_fragment_request(request):
+        return await aio.arender(request, 'partials/dashboard_rows.html', context)
+
+    # Totals / overdue / completion % from the per-user counter rows
+    if user.role:
+        context['stats'] = await sync_to_async(counters.summary)(
+            user, counters.CREATED if user.role == TEACHER else counters.ASSIGNED
+        )
+    return await aio.arender(request, 'dashboard.html', context)
 
 
-def register_view(request):
+@rate_limited('register', email='email')
+async def register_view(request):
     """User registration with group selection + HTML email verification"""
     if request.method == 'POST':
         form = RegisterForm(request.POST)
-        if form.is_valid():
-            user = form.save(commit=False)
-            user.is_active = False
-            user.save()
-
-            # Add group manually (commit=False skips form.save() group logic)
-            group = form.cleaned_data['group']
-            user.groups.add(group)
-
-            # Create verification token (2-hour expiry)
-            token_obj = EmailVerification.objects.create(
-                user=user,
-                expires_at=timezone.now() + timedelta(minutes=5)
-            )
-
-            # Build verification link safely
-            verify_link = request.build_absolute_uri(
-                reverse('verify_email', args=[str(token_obj.token)])
-            )
-
-            # Render HTML email template
-            context = {
-                'user': user,
-                'verify_link': verify_link,
-                'current_year': timezone.now().year,
-            }
-            html_content = render_to_string('emails/verify_email.html', context)
-            text_content = strip_tags(html_content)
-
-            subject = "Verify your email - Task Management"
-            email = EmailMultiAlternatives(
-                subject,
-                text_content,
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-            )
-            email.attach_alternative(html_content, "text/html")
-
-            try:
-                email.send()
-                messages.success(request, "Registration successful! Please check your email to verify your account.")
-            except Exception as e:
-                messages.error(request, "Could not send verification email. Please try again later.")
-                print("Email error:", e)
-
+        # Validation loads the group choices and runs the password validators
+        if await sync_to_async(form.is_valid)():
+            password_hash = await aio.hash_password(form.cleaned_data['password1'])
+            await sync_to_async(create_inactive_user)(request, form, password_hash)
+            messages.success(request, "Registration successful! Please check your email to verify your account.")
             return redirect('login_view')
     else:
         form = RegisterForm()
 
-    return render(request, 'register.html', {'form': form})
+    return await aio.arender(request, 'register.html', {'form': form})
 
-def verify_email(request, token):
-    token_obj = get_object_or_404(EmailVerification, token=token)
 
-    # 1️⃣ Check expiry
-    if token_obj.is_expired():
-        messages.error(request, "Verification link has expired. Please register again.")
-        token_obj.delete()
-        return redirect('register_view')
+def create_inactive_user(request, form, password_hash):
+    with transaction.atomic():
+        user = form.save(commit=False, password_hash=password_hash)
+        user.is_active = False
+        user.save()
 
-    # 2️⃣ Activate user
-    user = token_obj.user
-    user.is_active = True
-    user.save()
+        # Add group manually (commit=False skips form.save() group logic)
+        group = form.cleaned_data['group']
+        user.groups.add(group)
 
-    # 3️⃣ Mark token as verified
-    token_obj.is_verified = True
-    token_obj.save()
+        # Create verification token (2-hour expiry)
+        token_obj = EmailVerification.objects.create(
+            user=user,
+            expires_at=timezone.now() + timedelta(minutes=5)
+        )
 
-    # 4️⃣ Send welcome email using send_mail()
-    try:
-        subject = "Welcome to Task Management!"
-        message = (
-            f"Hi {user.username},\n\n"
-            "🎉 Your email has been successfully verified!\n\n"
-            "Welcome to Task Management — you can now log in and start organizing your work.\n\n"
-            "Login here: http://127.0.0.1:8000/login/\n\n"
-            "Best regards,\n"
-            "The Task Management Team"
+        # Build verification link safely
+        verify_link = request.build_absolute_uri(
+            reverse('verify_email', args=[str(token_obj.token)])
+        )
+
+        # Render HTML email template
+        context = {
+            'user': user,
+            'verify_link': verify_link,
+            'current_year': timezone.now().year,
+        }
+        html_content = render_to_string('emails/verify_email.html', context)
+
+        # 📬 Queued with the user row; a Celery worker sends it after commit
+        outbox.enqueue(
+            "Verify your email - Task Management",
+            strip_tags(html_content),
+            [user.email],
+            html_body=html_content,
         )
-        from_email = settings.DEFAULT_FROM_EMAIL
-        recipient_list = [user.email]
 
-        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
-        print(f"✅ Welcome email sent to {user.email}")
+async def verify_email(request, token):
+    token_obj = await EmailVerification.objects.select_related('user').filter(token=token).afirst()
+    if token_obj is None:
+        raise Http404("Verification link not found")
+
+    if token_obj.is_verified:
+        messages.info(request, "Your email is already verified. You can log in.")
+        return redirect('login_view')
+
+    # 1️⃣ Check expiry (the sweeper removes the unverified account later)
+    if token_obj.is_expired():
+        messages.error(request, "Verification link has expired. Please register again.")
+        return redirect('register_view')
 
-    except Exception as e:
-        print("⚠️ Error sending welcome email:", e)
+    # 2️⃣–4️⃣ in one transaction
+    await sync_to_async(activate_user)(request, token_obj)
 
     # 5️⃣ Show success message & redirect
     messages.success(request, "Email verified successfully! You can now log in.")
     return redirect('login_view')
 
-def login_view(request):
+
+def activate_user(request, token_obj):
+    user = token_obj.user
+    with transaction.atomic():
+        # 2️⃣ Activate user
+        user.is_active = True
+        user.save()
+
+        # 3️⃣ Mark token as verified
+        token_obj.is_verified = True
+        token_obj.save()
+
+        # 4️⃣ Queue the welcome email
+        outbox.enqueue(
+            "Welcome to Task Management!",
+            (
+                f"Hi {user.username},\n\n"
+                "🎉 Your email has been successfully verified!\n\n"
+                "Welcome to Task Management — you can now log in and start organizing your work.\n\n"
+                f"Login here: {request.build_absolute_uri(reverse('login_view'))}\n\n"
+                "Best regards,\n"
+                "The Task Management Team"
+            ),
+            [user.email],
+        )
+
+@rate_limited('login', username='username')
+async def login_view(request):
     """Custom login using username and password with email verification check"""
 
     if request.method == 'POST':
@@ -147,19 +199,16 @@ def login_view(request):
             username = form.cleaned_data['username']
             password = form.cleaned_data['password']
 
-            user = authenticate(request, username=username, password=password)
+            user = await aio.authenticate(request, username, password)
 
             if user is not None:
-                try:
-                    verification = EmailVerification.objects.get(user=user)
-                except EmailVerification.DoesNotExist:
-                    verification = None
+                verification = await EmailVerification.objects.filter(user=user).afirst()
 
                 # 1️⃣ Check if email verified
                 if verification and verification.is_verified:
                     # 2️⃣ Check if user active
                     if user.is_active:
-                        login(request, user)
+                        await sync_to_async(login)(request, user)
                         messages.success(request, f"Welcome back, {user.username}!")
                         return redirect('task_list')
                     else:
@@ -173,73 +222,139 @@ def login_view(request):
     else:
         form = LoginForm()
 
-    return render(request, 'login.html', {'form': form})
+    return await aio.arender(request, 'login.html', {'form': form})
 
-@login_required
-def logout_view(request):
+@aio.login_required
+async def logout_view(request):
     """Logs the user out and redirects to login"""
-    logout(request)
+    await sync_to_async(logout)(request)
     messages.info(request, "You have been logged out.")
     return redirect('login_view')
 
 
-# ✅ Helper to check group membership
-def user_in_group(user, group_name):
-    return user.groups.filter(name=group_name).exists()
+# ✅ Helper for infinite-scroll requests that only need the table rows
+def is_fragment_request(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
 
 
-# 📄 LIST VIEW
-@login_required
-def task_list(request):
-    """
-    Teachers → see all tasks
-    Students → see only their assigned tasks
-    Search + Filter by status
-    """
-    user = request.user
-    search_query = request.GET.get('search', '').strip()
-    status_filter = request.GET.get('status', '').strip()
-
-    # Base queryset by user role
-    if user_in_group(user, 'Teacher'):
-        tasks = Task.objects.all().order_by('-created_at')
-    elif user_in_group(user, 'Student'):
-        tasks = Task.objects.filter(assigned_to=user).order_by('-created_at')
-    else:
-        tasks = Task.objects.none()
+# ✅ Helper shared by every task listing (search / status / due date)
+# Returns the filtered queryset and the keyset ordering to page it with:
+# newest first, or best match first while searching.
+def filter_tasks(tasks, params):
+    search_query = params.get('search', '').strip()
+    status_filter = params.get('status', '').strip()
+    try:
+        due_date_filter = parse_date(params.get('due_date', '').strip())
+    except ValueError:
+        due_date_filter = None
+
+    ordering = DEFAULT_ORDERING
 
-    # Apply search filter (search by title or description)
+    # Apply full-text search (title + description, relevance ranked)
     if search_query:
-        tasks = tasks.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
+        backend = get_search_backend()
+        tasks = backend.search(tasks, search_query)
+        ordering = backend.ordering
 
     # Apply status filter if selected
     if status_filter:
         tasks = tasks.filter(status=status_filter)
-        
-    due_date_filter = request.GET.get('due_date')
+
     if due_date_filter:
         tasks = tasks.filter(due_date=due_date_filter)
 
-    return render(request, 'tasks.html', {
-        'tasks': tasks,
-        'search_query': search_query,
-        'status_filter': status_filter,
-    })
+    return tasks, ordering
+
+
+# 📄 LIST VIEW
+@aio.login_required
+@replica_reads
+@conditional_listing(listed_tasks)
+async def task_list(request):
+    """
+    Teachers → see all tasks
+    Students → see only their assigned tasks
+    Search + Filter by status, paginated by cursor
+    ?archived=1 → archived tasks are listed (and searched) too
+    """
+    user = request.user
+    include_archived = request.GET.get('archived') == '1'
+    tasks, ordering = filter_tasks(listed_tasks(user), request.GET)
+    if include_archived:
+        # Archiving and restoring change the active set, so the ETag still moves
+        archived, _ = filter_tasks(archived_tasks(user), request.GET)
+        page = await akeyset_paginate_merged(
+            [tasks.for_listing(), archived.for_listing()],
+            request.GET.get('cursor'), settings.TASK_PAGE_SIZE, request.GET, ordering,
+        )
+    else:
+        page = await akeyset_paginate(
+            tasks.for_listing(), request.GET.get('cursor'), settings.TASK_PAGE_SIZE, request.GET, ordering
+        )
+
+    context = {
+        'rows': await sync_to_async(fragments.render_rows)(page, 'list', user.role),
+        'page': page,
+        'search_query': request.GET.get('search', '').strip(),
+        'status_filter': request.GET.get('status', '').strip(),
+        'status_choices': Task.STATUS_CHOICES,
+        'include_archived': include_archived,
+    }
+    if is_fragment_request(request):
+        return await aio.arender(request, 'partials/task_rows.html', context)
+    return await aio.arender(request, 'tasks.html', context)
+
+# 📤 EXPORT (Teacher only) – the filtered task list as CSV / JSON / JSON Lines, streamed
+@login_required
+@replica_reads
+def task_export(request):
+    if request.user.role != TEACHER:
+        return JsonResponse({'error': "You are not authorized to export tasks."}, status=403)
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return JsonResponse({'error': f"Unsupported format; use one of {', '.join(export.FORMATS)}."}, status=400)
+
+    tasks, _ = filter_tasks(listed_tasks(request.user), request.GET)
+    # The rows are read after the view returns; keep the database chosen for this request
+    tasks = tasks.using(tasks.db)
+    chunks = export.render(export.iter_batches(tasks, settings.EXPORT_BATCH_SIZE), fmt)
+    if isinstance(request, ASGIRequest):
+        chunks = aio.iterate_in_thread(chunks)
+    response = StreamingHttpResponse(chunks, content_type=f"{export.FORMATS[fmt]}; charset=utf-8")
+    response['Content-Disposition'] = f'attachment; filename="tasks-{timezone.localdate():%Y%m%d}.{fmt}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# 📡 LIVE UPDATES – task created / updated / deleted events for the open list
+@aio.login_required
+async def task_events(request):
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be tied up for the whole stream; 204 stops EventSource retrying
+        return HttpResponse(status=204)
+    subscription = await events.get_broker().subscribe([events.user_channel(request.user.pk)])
+    response = StreamingHttpResponse(events.stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx: pass each event on as soon as it is written
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 # ➕ CREATE VIEW (Teacher only)
 @login_required
 def task_create(request):
-    if not user_in_group(request.user, 'Teacher'):
+    if request.user.role != TEACHER:
         messages.error(request, "You are not authorized to create tasks.")
         return redirect('task_list')
 
     if request.method == 'POST':
         form = TaskForm(request.POST)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                task = form.save(commit=False)
+                task.created_by = request.user
+                task.save()
+                form.save_m2m()
+                inbox.notify_task(task, request.user, inbox.form_recipients(form))
             messages.success(request, "Task created successfully.")
             return redirect('task_list')
     else:
@@ -248,17 +363,75 @@ def task_create(request):
     return render(request, 'task_form.html', {'form': form, 'title': 'Create Task'})
 
 
+# 📦 BULK CREATE (Teacher only) – CSV / JSON / JSON Lines upload
+@login_required
+@require_POST
+def task_bulk_create(request):
+    if request.user.role != TEACHER:
+        return JsonResponse({'error': "You are not authorized to create tasks."}, status=403)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': "Upload a CSV or JSON file as 'file'."}, status=400)
+
+    try:
+        fmt = bulk.detect_format(upload.name, request.POST.get('format'))
+        created, errors = bulk.import_tasks(
+            bulk.iter_rows(upload.file, fmt), request.user, settings.BULK_BATCH_SIZE
+        )
+    except bulk.BulkImportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({
+        'created': created,
+        'errors': [{'row': number, 'errors': problems} for number, problems in errors],
+    })
+
+
+# 👥 MASS ASSIGN (Teacher only) – {"usernames": [...]} or {"all_students": true}
+@login_required
+@require_POST
+def task_assign(request, pk):
+    if request.user.role != TEACHER:
+        return JsonResponse({'error': "You are not authorized to assign tasks."}, status=403)
+
+    task = get_object_or_404(Task, pk=pk)
+    try:
+        payload = json.loads(request.body or '{}')
+    except ValueError:
+        return JsonResponse({'error': "Request body must be JSON."}, status=400)
+
+    unknown = []
+    if payload.get('all_students'):
+        student_ids = bulk.all_student_ids()
+    elif isinstance(payload.get('usernames'), list):
+        student_ids = []
+        for usernames in bulk.chunked(map(str, payload['usernames']), settings.BULK_BATCH_SIZE):
+            found = bulk.student_ids_by_username(usernames)
+            student_ids.extend(found.values())
+            unknown.extend(u for u in usernames if u not in found)
+    else:
+        return JsonResponse({'error': "Send 'usernames' (a list) or 'all_students': true."}, status=400)
+
+    added = bulk.assign_students(task, student_ids, settings.BULK_BATCH_SIZE)
+    return JsonResponse({'task': task.pk, 'assigned': added, 'unknown': unknown})
+
+
 # ✏️ UPDATE VIEW
 @login_required
 def task_update(request, pk):
     task = get_object_or_404(Task, pk=pk)
 
     # 🧠 Teacher → full edit form
-    if user_in_group(request.user, 'Teacher'):
+    if request.user.role == TEACHER:
         if request.method == 'POST':
             form = TaskForm(request.POST, instance=task)
             if form.is_valid():
-                form.save()
+                # Loaded by the form already: the students assigned before this edit
+                previous_ids = [student.pk for student in form.initial['assigned_to']]
+                with transaction.atomic():
+                    form.save()
+                    inbox.notify_task(task, request.user, inbox.form_recipients(form, previous_ids))
                 messages.success(request, "Task updated successfully.")
                 return redirect('task_list')
         else:
@@ -266,18 +439,19 @@ def task_update(request, pk):
         return render(request, 'task_form.html', {'form': form, 'title': 'Edit Task'})
 
     # 🧠 Student → can only upload file & change status
-    elif user_in_group(request.user, 'Student') and task.assigned_to == request.user:
+    elif request.user.role == STUDENT and task.assigned_to.filter(pk=request.user.pk).exists():
         if request.method == 'POST':
             task_form = StudentTaskForm(request.POST, instance=task)
             file_form = TaskFileForm(request.POST, request.FILES)
 
-            if task_form.is_valid():
-                task_form.save()
+            with transaction.atomic():
+                if task_form.is_valid():
+                    task_form.save()
 
-            # Handle uploaded files
-            files = request.FILES.getlist('file')
-            for f in files:
-                TaskFile.objects.create(task=task, uploaded_by=request.user, file=f)
+                # Handle uploaded files (stored once per distinct content)
+                files = request.FILES.getlist('file')
+                for f in files:
+                    uploads.store_upload(f, task, request.user)
 
             messages.success(request, "Status updated and files uploaded.")
             return redirect('task_list')
@@ -296,6 +470,7 @@ def task_update(request, pk):
                 'task_form': task_form,
                 'file_form': file_form,
                 'uploaded_files': uploaded_files,
+                'upload_chunk_size': settings.UPLOAD_CHUNK_SIZE,
             }
         )
 
@@ -304,45 +479,182 @@ def task_update(request, pk):
         return redirect('task_list')
 
 
+# ⏫ RESUMABLE UPLOAD – start a session for one file (assigned students only)
+@login_required
+@require_POST
+def upload_start(request, pk):
+    task = get_object_or_404(Task, pk=pk)
+    if request.user.role != STUDENT or not task.assigned_to.filter(pk=request.user.pk).exists():
+        return JsonResponse({'error': "You are not authorized to upload to this task."}, status=403)
+
+    try:
+        payload = json.loads(request.body or '{}')
+        session = uploads.start_session(task, request.user, str(payload['filename']), int(payload['size']))
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Send JSON with 'filename' and 'size'."}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+    return JsonResponse(upload_status(session), status=201)
+
+
+# ⏫ RESUMABLE UPLOAD – GET the offset to resume from, PATCH the next chunk
+@login_required
+def upload_chunk(request, upload_id):
+    if request.method == 'GET':
+        session = get_object_or_404(UploadSession, pk=upload_id, uploaded_by=request.user)
+        return JsonResponse(upload_status(session))
+    if request.method != 'PATCH':
+        return HttpResponseNotAllowed(['GET', 'PATCH'])
+
+    try:
+        offset = int(request.headers['Upload-Offset'])
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        session = uploads.append_chunk(upload_id, request.user, offset, request, length)
+    except (KeyError, ValueError):
+        return JsonResponse({'error': "Upload-Offset and Content-Length headers are required."}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+    return JsonResponse(upload_status(session))
+
+
+def upload_status(session):
+    return {
+        'upload_id': str(session.pk),
+        'url': reverse('upload_chunk', args=[session.pk]),
+        'offset': session.received,
+        'size': session.size,
+        'complete': session.is_complete,
+        'file_id': session.task_file_id,
+    }
+
+
+# 📎 DOWNLOAD – teachers, the task's creator and assigned students only
+@login_required
+def task_file_download(request, pk):
+    task_file = get_object_or_404(TaskFile.objects.select_related('task', 'blob'), pk=pk)
+    if not downloads.can_download(request.user, task_file):
+        raise Http404("File not found")
+    return downloads.serve(request, task_file)
+
+
+# 🗄️ ARCHIVED TASK – read-only; teachers, its creator and assigned students
+@login_required
+def archived_task_detail(request, pk):
+    task = get_object_or_404(ArchivedTask.objects.select_related('created_by'), pk=pk)
+    user = request.user
+    if not (user.role == TEACHER or task.created_by_id == user.pk or task.assigned_to.filter(pk=user.pk).exists()):
+        raise Http404("Task not found")
+    return render(request, 'archived_task.html', {
+        'task': task,
+        'assignees': task.assigned_to.only('username'),
+        'files': task.files.all(),
+    })
+
+
+# 🗄️ RESTORE (Teacher only) – move an archived task back to the active list
+@login_required
+@require_POST
+def archived_task_restore(request, pk):
+    if request.user.role != TEACHER:
+        messages.error(request, "You are not authorized to restore tasks.")
+        return redirect('task_list')
+    if not archive.restore([pk]):
+        raise Http404("Task not found")
+    messages.success(request, "Task restored from the archive.")
+    return redirect('task_update', pk=pk)
+
+
+# 📎 DOWNLOAD – a file of an archived task, same access rules
+@login_required
+def archived_file_download(request, pk):
+    task_file = get_object_or_404(ArchivedTaskFile.objects.select_related('task', 'blob'), pk=pk)
+    if not downloads.can_download(request.user, task_file):
+        raise Http404("File not found")
+    return downloads.serve(request, task_file)
+
+
+# 📜 ACTIVITY (Teacher only) – a task's history, kept after it is deleted
+@login_required
+def task_activity(request, pk):
+    if request.user.role != TEACHER:
+        messages.error(request, "You are not authorized to view task activity.")
+        return redirect('task_list')
+    task = Task.objects.only('title').filter(pk=pk).first()
+    return activity_page(request, activity.task_timeline(pk), f"Task: {task.title}" if task else f"Task #{pk}")
+
+
+# 📜 ACTIVITY (Teacher only) – everything one user did
+@login_required
+def user_activity(request, pk):
+    if request.user.role != TEACHER:
+        messages.error(request, "You are not authorized to view user activity.")
+        return redirect('task_list')
+    user = get_object_or_404(User.objects.only('username'), pk=pk)
+    return activity_page(request, activity.user_timeline(pk), f"User: {user.username}")
+
+
+def activity_page(request, entries, heading):
+    page = keyset_paginate(entries, request.GET.get('cursor'), settings.ACTIVITY_PAGE_SIZE, request.GET, activity.ORDERING)
+    activity.with_usernames(page.object_list)
+    return render(request, 'activity.html', {'page': page, 'heading': heading})
+
+
+# 🔔 INBOX – the user's notifications, newest first, a keyset page at a time
+@login_required
+def inbox_view(request):
+    page = keyset_paginate(
+        inbox.notifications_for(request.user).only(
+            'id', 'verb', 'description', 'target_object_id', 'unread', 'timestamp'
+        ),
+        request.GET.get('cursor'), settings.INBOX_PAGE_SIZE, request.GET, inbox.ORDERING,
+    )
+    return render(request, 'inbox.html', {'page': page})
+
+
+# 🔔 OPEN – mark one notification read and go to its task
+@login_required
+def inbox_open(request, pk):
+    notification = get_object_or_404(inbox.notifications_for(request.user).only('id', 'target_object_id'), pk=pk)
+    inbox.mark_read(request.user, notification.pk)
+    return redirect('task_update', pk=notification.target_object_id)
+
+
+# 🔔 MARK ALL READ – one UPDATE however many there are
+@login_required
+@require_POST
+def inbox_mark_all_read(request):
+    changed = inbox.mark_all_read(request.user)
+    messages.success(request, f"Marked {changed} notification(s) as read.")
+    return redirect('inbox')
+
+
 # ❌ DELETE VIEW (Teacher only)
 @login_required
 def task_delete(request, pk):
-    if not user_in_group(request.user, 'Teacher'):
+    if request.user.role != TEACHER:
         messages.error(request, "You are not authorized to delete tasks.")
         return redirect('task_list')
 
     task = get_object_or_404(Task, pk=pk)
-    task.delete()
+    with transaction.atomic():
+        task.delete()
     messages.success(request, "Task deleted successfully.")
     return redirect('task_list')
 
 
 # 1️⃣ Forgot Password View
-def forgot_password_view(request):
+@rate_limited('forgot_password', email='email')
+async def forgot_password_view(request):
     if request.method == "POST":
         form = ForgotPasswordForm(request.POST)
         if form.is_valid():
             email = form.cleaned_data['email']
-            user = User.objects.filter(email=email).first()
+            user = await User.objects.filter(email=email).afirst()
 
             if user:
-                token = PasswordResetToken.objects.create(user=user)
-                reset_link = request.build_absolute_uri(
-                    reverse('reset_password', args=[str(token.token)])
-                )
-
-                # Render HTML email
-                context = {'user': user, 'reset_link': reset_link}
-                html_content = render_to_string('emails/reset_password.html', context)
-                text_content = strip_tags(html_content)
-
-                subject = "Reset your password - Task Management"
-                email_msg = EmailMultiAlternatives(
-                    subject, text_content, settings.DEFAULT_FROM_EMAIL, [email]
-                )
-                email_msg.attach_alternative(html_content, "text/html")
-                email_msg.send()
-
+                await sync_to_async(send_reset_link)(request, user, email)
                 messages.success(request, "Password reset link has been sent to your email.")
                 return redirect('login_view')
             else:
@@ -350,14 +662,31 @@ def forgot_password_view(request):
     else:
         form = ForgotPasswordForm()
 
-    return render(request, 'forgot_password.html', {'form': form})
+    return await aio.arender(request, 'forgot_password.html', {'form': form})
+
+
+def send_reset_link(request, user, email):
+    with transaction.atomic():
+        token = PasswordResetToken.objects.create(user=user)
+        reset_link = request.build_absolute_uri(
+            reverse('reset_password', args=[str(token.token)])
+        )
+
+        # Render HTML email
+        context = {'user': user, 'reset_link': reset_link}
+        html_content = render_to_string('emails/reset_password.html', context)
+        outbox.enqueue(
+            "Reset your password - Task Management",
+            strip_tags(html_content),
+            [email],
+            html_body=html_content,
+        )
 
 
 # 2️⃣ Reset Password View
-def reset_password_view(request, token):
-    try:
-        reset_token = PasswordResetToken.objects.get(token=token)
-    except PasswordResetToken.DoesNotExist:
+async def reset_password_view(request, token):
+    reset_token = await PasswordResetToken.objects.select_related('user').filter(token=token).afirst()
+    if reset_token is None:
         messages.error(request, "Invalid or expired reset link.")
         return redirect('forgot_password')
 
@@ -369,15 +698,15 @@ def reset_password_view(request, token):
         form = ResetPasswordForm(request.POST)
         if form.is_valid():
             new_password = form.cleaned_data['new_password']
-            reset_token.user.password = make_password(new_password)
-            reset_token.user.save()
+            reset_token.user.password = await aio.hash_password(new_password)
+            await reset_token.user.asave()
 
             reset_token.is_used = True
-            reset_token.save()
+            await reset_token.asave()
 
             messages.success(request, "Password reset successful! You can now log in.")
             return redirect('login_view')
     else:
         form = ResetPasswordForm()
 
-    return render(request, 'reset_password.html', {'form': form})
\ No newline at end of file
+    return await aio.arender(request, 'reset_password.html', {'form': form})